@@ -0,0 +1,102 @@
+"""
+Стоимость сериализации 1000 постов для JSON API: объекты моделей с
+select_related против кортежей values_list() из blog.api, полный набор
+полей и разреженный (?fields=id,title).
+
+Посты создаются во временной тестовой базе. Запуск из корня репозитория:
+    python benchmarks/api_serialization.py
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from blog.api import (  # noqa: E402
+    POST_FIELDS, POST_LIST_FIELDS, json_response, serialize,
+)
+from blog.models import Category, Location, Post  # noqa: E402
+from blog.queries import post_query_default  # noqa: E402
+
+POSTS = 1000
+ROUNDS = 20
+
+
+def create_posts():
+    author = get_user_model().objects.create(username='benchmark')
+    category = Category.objects.create(
+        title='Категория', description='Описание', slug='benchmark'
+    )
+    location = Location.objects.create(name='Планета Земля')
+    now = timezone.now()
+    posts = []
+    for number in range(POSTS):
+        post = Post(
+            title=f'Пост номер {number}',
+            text='Текст публикации. ' * 50,
+            pub_date=now - timedelta(minutes=number),
+            author=author,
+            category=category,
+            location=location,
+        )
+        post.render_text()
+        posts.append(post)
+    Post.objects.bulk_create(posts)
+
+
+def from_instances():
+    posts = post_query_default(filters=True).order_by('-pub_date', '-id')
+    return [
+        {
+            'id': post.id,
+            'title': post.title,
+            'excerpt': post.excerpt,
+            'pub_date': post.pub_date.isoformat(),
+            'image': post.image.url if post.image else None,
+            'author': post.author.username,
+            'category': post.category.slug,
+            'location': (
+                post.location.name if post.location.is_published else None
+            ),
+        }
+        for post in posts[:POSTS]
+    ]
+
+
+def from_rows(fields):
+    posts = post_query_default(filters=True).order_by('-pub_date', '-id')
+    return serialize(posts[:POSTS], POST_FIELDS, fields)[0]
+
+
+def measure(name, build):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        json_response({'results': build()})
+    elapsed = (time.perf_counter() - started) / ROUNDS
+    print(f'{name:>22}: {elapsed * 1000:7.2f} мс на {POSTS} постов')
+
+
+def main():
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        create_posts()
+        measure('объекты моделей', from_instances)
+        measure('values_list', lambda: from_rows(POST_LIST_FIELDS))
+        measure('values_list, id,title', lambda: from_rows(('id', 'title')))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
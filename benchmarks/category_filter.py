@@ -0,0 +1,110 @@
+"""
+Запросы главной ленты с проверкой публикации категории соединением с
+таблицей категорий и по закешированному списку id опубликованных
+категорий (post_query_default(filters=True)): подсчёт постов и выборка
+первой страницы.
+
+Посты создаются во временной тестовой базе. Запуск из корня репозитория:
+    python benchmarks/category_filter.py
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from blog.models import Category, Post  # noqa: E402
+from blog.queries import post_query_default  # noqa: E402
+
+POSTS = 50000
+CATEGORIES = 50
+ROUNDS = 20
+
+
+def create_posts():
+    author = get_user_model().objects.create(username='benchmark')
+    Category.objects.bulk_create(
+        Category(
+            title=f'Категория {number}',
+            description='Описание',
+            slug=f'category-{number}',
+            # Каждая пятая категория снята с публикации.
+            is_published=number % 5 != 0,
+        )
+        for number in range(CATEGORIES)
+    )
+    categories = list(Category.objects.all())
+    now = timezone.now()
+    posts = []
+    for number in range(POSTS):
+        post = Post(
+            title=f'Пост {number}',
+            text='Текст публикации.',
+            pub_date=now - timedelta(minutes=number),
+            author=author,
+            category=categories[number % len(categories)],
+        )
+        post.render_text()
+        posts.append(post)
+    Post.objects.bulk_create(posts, batch_size=1000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def joined():
+    return post_query_default().filter(
+        pub_date__lte=timezone.now(),
+        is_published=True,
+        category__is_published=True,
+    )
+
+
+def cached():
+    return post_query_default(filters=True)
+
+
+def measure(name, build):
+    results = {}
+    for label, run in (
+        ('подсчёт', lambda: build().count()),
+        ('страница', lambda: list(
+            build().order_by('-pub_date', '-id')[:settings.POSTS_ON_PAGE]
+        )),
+    ):
+        timings = []
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        results[label] = min(timings)
+    print(
+        f'{name:>18}: подсчёт {results["подсчёт"] * 1000:7.2f} мс, '
+        f'первая страница {results["страница"] * 1000:6.2f} мс'
+    )
+
+
+def main():
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        create_posts()
+        assert joined().count() == cached().count()
+        measure('соединение', joined)
+        measure('список id из кеша', cached)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Время рендеринга страницы поста для авторизованного пользователя с
+формой комментария, построенной один раз на процесс
+({% cached_bootstrap_form %}), и с формой, которая строится заново при
+каждом показе.
+
+Пост создаётся во временной тестовой базе. Запуск из корня репозитория:
+    python benchmarks/comment_form.py
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from blog.models import Category, Comment, Post  # noqa: E402
+from blog.templatetags import blog_forms  # noqa: E402
+
+COMMENTS = 5
+ROUNDS = 500
+
+
+def create_post():
+    author = get_user_model().objects.create(username='benchmark')
+    category = Category.objects.create(
+        title='Категория', description='Описание', slug='benchmark'
+    )
+    post = Post(
+        title='Пост',
+        text='Текст публикации. ' * 50,
+        pub_date=timezone.now(),
+        author=author,
+        category=category,
+    )
+    post.render_text()
+    post.save()
+    Comment.objects.bulk_create(
+        Comment(text=f'Комментарий {number}', post=post, author=author)
+        for number in range(COMMENTS)
+    )
+    return author, post
+
+
+def measure(name, context, request, cached):
+    timings = []
+    for _ in range(ROUNDS):
+        if not cached:
+            blog_forms.rendered_forms.clear()
+        started = time.perf_counter()
+        render_to_string('blog/detail.html', context, request)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(
+        f'{name:>16}: медиана {timings[len(timings) // 2] * 1000:6.3f} мс, '
+        f'минимум {timings[0] * 1000:6.3f} мс'
+    )
+
+
+@override_settings(DEBUG=False)
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        author, post = create_post()
+        client = Client()
+        client.force_login(author)
+        response = client.get(f'/posts/{post.id}/')
+        assert response.status_code == 200
+        context = response.context[0].flatten()
+        # Комментарии выбираются один раз, замеряется только рендеринг.
+        context['comments'] = list(context['comments'])
+        request = response.wsgi_request
+        measure('без кеша формы', context, request, cached=False)
+        measure('с кешем формы', context, request, cached=True)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Пропускная способность и пиковая память при загрузке картинки поста:
+стандартные обработчики и forms.ImageField (полная проверка Pillow)
+против PostImageUploadHandler и PostImageField (проверка по заголовку).
+
+Запуск из корня репозитория:
+    python benchmarks/image_uploads.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django import forms  # noqa: E402
+from django.core.exceptions import ValidationError  # noqa: E402
+from django.core.files.uploadhandler import (  # noqa: E402
+    MemoryFileUploadHandler, TemporaryFileUploadHandler,
+)
+from django.http.multipartparser import MultiPartParser  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.client import encode_multipart  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from blog.uploads import PostImageField, PostImageUploadHandler  # noqa
+
+BOUNDARY = 'BenchmarkBoundary'
+ROUNDS = 5
+SIDES = (1000, 2500, 4000)
+
+
+def make_body(side):
+    image = Image.effect_noise((side, side), 64).convert('RGB')
+    image_io = BytesIO()
+    image.save(image_io, format='JPEG', quality=95)
+    image_io.name = 'photo.jpg'
+    image_io.seek(0)
+    return encode_multipart(BOUNDARY, {'title': 'x', 'image': image_io})
+
+
+def upload(body, handler_classes, field):
+    meta = {
+        'CONTENT_TYPE': f'multipart/form-data; boundary={BOUNDARY}',
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    handlers = [handler() for handler in handler_classes]
+    _, files = MultiPartParser(meta, BytesIO(body), handlers).parse()
+    try:
+        field.clean(files['image'])
+    except ValidationError:
+        pass
+    files['image'].close()
+
+
+def measure(name, body, handler_classes, field):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        upload(body, handler_classes, field)
+    elapsed = (time.perf_counter() - started) / ROUNDS
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    megabytes = len(body) / 1024 / 1024
+    print(
+        f'{name:>10} {megabytes:6.1f} МБ {megabytes / elapsed:8.1f} МБ/с '
+        f'пик памяти {peak / 1024 / 1024:6.1f} МБ'
+    )
+
+
+def main():
+    default_handlers = (MemoryFileUploadHandler, TemporaryFileUploadHandler)
+    streaming_handlers = (PostImageUploadHandler, *default_handlers)
+    for side in SIDES:
+        body = make_body(side)
+        measure('текущий', body, default_handlers, forms.ImageField())
+        with override_settings(POST_IMAGE_MAX_SIZE=len(body)):
+            measure('потоковый', body, streaming_handlers, PostImageField())
+        # Файл больше лимита отбрасывается, не попадая во временный файл.
+        with override_settings(POST_IMAGE_MAX_SIZE=1024 * 1024):
+            measure('отказ', body, streaming_handlers, PostImageField())
+
+
+if __name__ == '__main__':
+    main()
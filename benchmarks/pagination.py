@@ -0,0 +1,105 @@
+"""
+Размер HTML и время рендеринга главной страницы при росте таблицы
+постов. Пагинатор выводит окно номеров вокруг текущей страницы, поэтому
+ни размер страницы, ни время рендеринга шаблона не должны зависеть от
+числа постов; скрипт проверяет это и завершается ошибкой при росте.
+
+Посты создаются во временной тестовой базе. Запуск из корня репозитория:
+    python benchmarks/pagination.py
+"""
+import os
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.template.loader import render_to_string  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from blog.models import Category, Post  # noqa: E402
+
+SIZES = (1000, 10000, 50000)
+ROUNDS = 30
+# Допустимый разброс размера страницы: растёт только число цифр в
+# номерах страниц.
+SIZE_TOLERANCE = 0.02
+TIME_TOLERANCE = 2.0
+
+
+def add_posts(count, author, category):
+    now = timezone.now()
+    start = Post.objects.count()
+    posts = []
+    for number in range(start, start + count):
+        post = Post(
+            title=f'Пост {number}',
+            text='Текст публикации.',
+            pub_date=now - timedelta(minutes=number),
+            author=author,
+            category=category,
+        )
+        post.render_text()
+        posts.append(post)
+    Post.objects.bulk_create(posts, batch_size=1000)
+
+
+def measure(client, total):
+    page = total // settings.POSTS_ON_PAGE // 2
+    response = client.get('/', {'page': page})
+    assert response.status_code == 200
+    # Данные страницы уже выбраны: замеряется только рендеринг шаблона.
+    context = response.context[0].flatten()
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        render_to_string('blog/index.html', context, response.wsgi_request)
+        timings.append(time.perf_counter() - started)
+    return len(response.content), min(timings)
+
+
+@override_settings(DEBUG=False)
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        author = get_user_model().objects.create(username='benchmark')
+        category = Category.objects.create(
+            title='Категория', description='Описание', slug='benchmark'
+        )
+        client = Client()
+        results = []
+        for size in SIZES:
+            add_posts(size - Post.objects.count(), author, category)
+            html_size, render_time = measure(client, size)
+            results.append((html_size, render_time))
+            print(
+                f'{size:>7} постов: страница {html_size / 1024:6.1f} КБ, '
+                f'рендеринг {render_time * 1000:6.2f} мс'
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    sizes = [html_size for html_size, _ in results]
+    times = [render_time for _, render_time in results]
+    assert max(sizes) <= min(sizes) * (1 + SIZE_TOLERANCE), (
+        'Размер страницы растёт вместе с числом постов.'
+    )
+    assert max(times) <= min(times) * TIME_TOLERANCE, (
+        'Время рендеринга растёт вместе с числом постов.'
+    )
+
+
+if __name__ == '__main__':
+    main()
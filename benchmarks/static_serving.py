@@ -0,0 +1,92 @@
+"""
+Сравнение раздачи статики: текущий путь через StaticFilesHandler и
+finders (как в runserver) против собранной статики с хешами, сжатием и
+StaticFilesApplication.
+
+Запуск из корня репозитория:
+    python benchmarks/static_serving.py
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from wsgiref.util import setup_testing_defaults
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'blogicum'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import StaticFilesHandler  # noqa
+from django.contrib.staticfiles.storage import staticfiles_storage  # noqa
+from django.core.management import call_command  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+from django.test import override_settings  # noqa: E402
+
+from blogicum.staticfiles import StaticFilesApplication  # noqa: E402
+
+REQUESTS = 2000
+FILES = ('admin/css/base.css', 'admin/js/core.js', 'img/logo.png')
+
+
+def request(application, path):
+    environ = {
+        'PATH_INFO': path,
+        'REQUEST_METHOD': 'GET',
+        'HTTP_ACCEPT_ENCODING': 'gzip, br',
+        'wsgi.errors': io.StringIO(),
+    }
+    setup_testing_defaults(environ)
+    status_headers = []
+
+    def start_response(status, headers, exc_info=None):
+        status_headers.append((status, headers))
+
+    body = application(environ, start_response)
+    size = sum(len(chunk) for chunk in body)
+    if hasattr(body, 'close'):
+        body.close()
+    return status_headers[0][0], size
+
+
+def measure(name, application, paths):
+    for path in paths:
+        status, size = request(application, path)
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            request(application, path)
+        elapsed = time.perf_counter() - started
+        print(
+            f'{name:>10} {path:<45} {status:<8} {size:>8} B '
+            f'{elapsed / REQUESTS * 1e6:>8.1f} мкс/запрос'
+        )
+
+
+def main():
+    measure(
+        'текущий',
+        StaticFilesHandler(get_wsgi_application()),
+        [settings.STATIC_URL + name for name in FILES],
+    )
+    with tempfile.TemporaryDirectory() as root, override_settings(
+        DEBUG=False,
+        STATIC_ROOT=root,
+        STATICFILES_STORAGE=(
+            'blogicum.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    ):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        measure(
+            'новый',
+            StaticFilesApplication(get_wsgi_application(), root=root),
+            [staticfiles_storage.url(name) for name in FILES],
+        )
+
+
+if __name__ == '__main__':
+    main()
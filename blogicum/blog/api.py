@@ -0,0 +1,325 @@
+"""
+JSON API только для чтения: /api/v1/.
+
+Ответы собираются из кортежей values_list(), без создания объектов
+моделей: запрашиваются только столбцы выбранных полей, а преобразуются
+лишь даты и картинки. Параметр ?fields=a,b ограничивает набор полей.
+Списки листаются курсором по (дата, id) из параметра ?cursor=, без
+OFFSET. ETag вычисляется по версии данных до построения ответа, так что
+повторный запрос с If-None-Match получает 304 за один агрегирующий
+запрос.
+"""
+import base64
+import hashlib
+import json
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Count, F, Max, Q, When
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.http import require_GET
+
+from .models import Category, Comment, Location, Post
+from .paginators import cached_feed_version
+from .queries import post_detail_version, post_query_default
+
+User = get_user_model()
+
+
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def image_url(name):
+    return Post.image.field.storage.url(name) if name else None
+
+
+# Поле API: (столбец или выражение для values_list, преобразование).
+POST_FIELDS = {
+    'id': ('id', None),
+    'title': ('title', None),
+    'excerpt': ('excerpt', None),
+    'text': ('text', None),
+    'text_html': ('text_html', None),
+    'pub_date': ('pub_date', isoformat),
+    'updated_at': ('updated_at', isoformat),
+    'image': ('image', image_url),
+    'author': ('author__username', None),
+    'category': ('category__slug', None),
+    'location': (
+        Case(When(location__is_published=True, then=F('location__name'))),
+        None,
+    ),
+    'comment_count': (Count('comments'), None),
+}
+POST_LIST_FIELDS = (
+    'id', 'title', 'excerpt', 'pub_date', 'image', 'author', 'category',
+    'location',
+)
+POST_DETAIL_FIELDS = (
+    'id', 'title', 'text_html', 'pub_date', 'updated_at', 'image',
+    'author', 'category', 'location',
+)
+COMMENT_FIELDS = {
+    'id': ('id', None),
+    'text': ('text', None),
+    'author': ('author__username', None),
+    'created_at': ('created_at', isoformat),
+    'updated_at': ('updated_at', isoformat),
+}
+LOCATION_FIELDS = {
+    'id': ('id', None),
+    'name': ('name', None),
+}
+CATEGORY_FIELDS = {
+    'slug': ('slug', None),
+    'title': ('title', None),
+    'description': ('description', None),
+}
+
+
+class ApiError(Exception):
+    """Ошибка в параметрах запроса, отдаётся клиенту с кодом 400."""
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+        content_type='application/json',
+        status=status,
+    )
+
+
+def not_found(message):
+    return json_response({'error': message}, status=404)
+
+
+def api_view(view):
+    """Разрешает только GET и отдаёт ApiError как JSON с кодом 400."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'error': str(error)}, status=400)
+    return wrapper
+
+
+def requested_fields(request, spec, default):
+    """Поля из параметра ?fields= или набор по умолчанию."""
+    value = request.GET.get('fields')
+    if not value:
+        return default
+    fields = tuple(dict.fromkeys(value.split(',')))
+    unknown = [name for name in fields if name not in spec]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}.')
+    return fields
+
+
+def serialize(queryset, spec, fields, extra=()):
+    """Выбирает поля кортежами и превращает их в словари.
+
+    Столбцы extra добавляются в конец выборки, но в словари не попадают;
+    вторым значением возвращаются их значения у последней строки.
+    """
+    rows = queryset.values_list(
+        *(spec[name][0] for name in fields), *extra
+    )
+    converters = [
+        (name, spec[name][1]) for name in fields if spec[name][1]
+    ]
+    width = len(fields)
+    items = []
+    row = None
+    for row in rows:
+        item = dict(zip(fields, row[:width]))
+        for name, convert in converters:
+            item[name] = convert(item[name])
+        items.append(item)
+    return items, (row[width:] if row is not None else None)
+
+
+def encode_cursor(moment, pk):
+    raw = json.dumps([moment.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(value):
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        moment, pk = json.loads(raw)
+        return datetime.fromisoformat(moment), int(pk)
+    except (ValueError, TypeError):
+        raise ApiError('Некорректный курсор.')
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('Параметр limit должен быть числом.')
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def keyset_page(request, queryset, spec, fields, date_field, descending):
+    """Страница списка после курсора, упорядоченного по (дата, id)."""
+    lookup = 'lt' if descending else 'gt'
+    cursor = request.GET.get('cursor')
+    if cursor:
+        moment, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__{lookup}': moment})
+            | Q(**{date_field: moment, f'id__{lookup}': pk})
+        )
+    prefix = '-' if descending else ''
+    queryset = queryset.order_by(f'{prefix}{date_field}', f'{prefix}id')
+    size = page_size(request)
+    items, last = serialize(
+        queryset[:size], spec, fields, extra=(date_field, 'id')
+    )
+    next_url = None
+    if len(items) == size:
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor(*last)
+        next_url = f'{request.path}?{params.urlencode()}'
+    return {'results': items, 'next': next_url}
+
+
+def conditional_json(request, version, build, private=False):
+    """Отдаёт 304, если версия данных не изменилась, иначе строит ответ.
+
+    Для ответов, зависящих от пользователя, в ETag входит его id.
+    """
+    user_key = request.user.pk if private else None
+    digest = hashlib.md5(
+        f'{request.get_full_path()}:{version}:{user_key}'.encode()
+    ).hexdigest()
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = json_response(build())
+    response['ETag'] = etag
+    if private:
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def post_list_response(request, queryset, feed_key):
+    fields = requested_fields(request, POST_FIELDS, POST_LIST_FIELDS)
+    version = dict(cached_feed_version(feed_key, queryset))
+    if 'comment_count' in fields:
+        version.update(queryset.aggregate(
+            comment_total=Count('comments'),
+            last_comment_at=Max('comments__updated_at'),
+        ))
+    return conditional_json(request, version, lambda: keyset_page(
+        request, queryset, POST_FIELDS, fields, 'pub_date', descending=True
+    ))
+
+
+@api_view
+def post_list(request):
+    """Лента опубликованных постов."""
+    return post_list_response(
+        request, post_query_default(filters=True), 'index'
+    )
+
+
+@api_view
+def category_post_list(request, category_slug):
+    """Посты опубликованной категории."""
+    category = Category.objects.filter(
+        slug=category_slug, is_published=True
+    ).values_list('pk', flat=True).first()
+    if category is None:
+        return not_found('Категория не найдена.')
+    return post_list_response(
+        request, post_query_default(filters=True).filter(category=category),
+        f'category:{category}',
+    )
+
+
+@api_view
+def author_post_list(request, username):
+    """Опубликованные посты автора."""
+    author = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    if author is None:
+        return not_found('Пользователь не найден.')
+    return post_list_response(
+        request, post_query_default(filters=True).filter(author=author),
+        f'author:{author}',
+    )
+
+
+@api_view
+def category_list(request):
+    """Опубликованные категории."""
+    fields = requested_fields(
+        request, CATEGORY_FIELDS, tuple(CATEGORY_FIELDS)
+    )
+    queryset = Category.objects.filter(is_published=True).order_by('title')
+    version = queryset.aggregate(
+        total=Count('id'), updated=Max('updated_at')
+    )
+    return conditional_json(request, version, lambda: {
+        'results': serialize(queryset, CATEGORY_FIELDS, fields)[0],
+    })
+
+
+@api_view
+def location_list(request):
+    """Локации, название которых содержит ?q=, для подсказок в форме.
+
+    Неопубликованные локации видны только пользователям, которые могут
+    выбрать их в форме поста.
+    """
+    queryset = Location.objects.order_by('name', 'id')
+    if not request.user.is_authenticated:
+        queryset = queryset.filter(is_published=True)
+    query = request.GET.get('q', '').strip()
+    if query:
+        queryset = queryset.filter(name__icontains=query)
+    return json_response({
+        'results': serialize(
+            queryset[:page_size(request)], LOCATION_FIELDS,
+            tuple(LOCATION_FIELDS),
+        )[0],
+    })
+
+
+@api_view
+def post_detail(request, post_id):
+    """Пост, видимый текущему пользователю."""
+    fields = requested_fields(request, POST_FIELDS, POST_DETAIL_FIELDS)
+    version = post_detail_version(request.user, post_id)
+    if version is None:
+        return not_found('Пост не найден.')
+
+    def build():
+        queryset = Post.objects.filter(pk=post_id)
+        return serialize(queryset, POST_FIELDS, fields)[0][0]
+
+    return conditional_json(request, version, build, private=True)
+
+
+@api_view
+def comment_list(request, post_id):
+    """Комментарии к посту в порядке добавления."""
+    fields = requested_fields(
+        request, COMMENT_FIELDS, tuple(COMMENT_FIELDS)
+    )
+    version = post_detail_version(request.user, post_id)
+    if version is None:
+        return not_found('Пост не найден.')
+    queryset = Comment.objects.filter(post_id=post_id)
+    return conditional_json(request, version, lambda: keyset_page(
+        request, queryset, COMMENT_FIELDS, fields, 'created_at',
+        descending=False,
+    ), private=True)
@@ -0,0 +1,118 @@
+"""
+Индекс границ страниц для перехода на произвольную страницу ленты.
+
+Для каждой ленты в PageBoundary хранится ключ (pub_date, id) каждого
+PAGE_BOUNDARY_STEP-го поста, считая от самого старого. Страница k
+находится поиском по ключу от ближайшей границы со смещением меньше
+шага, без OFFSET по всей ленте.
+
+Новые посты попадают в начало ленты и границ не сдвигают. Когда пост с
+ключом K появляется в ленте не сверху, пропадает из неё или удаляется,
+границы с ключом не меньше K удаляются; недостающие границы
+достраиваются при первом обращении. Команда rebuild_page_boundaries
+перестраивает индекс целиком.
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from .models import PageBoundary
+
+
+def newer_than(pub_date, post_id, inclusive=False, id_field='id'):
+    """Условие «ключ (pub_date, id) больше заданного»."""
+    lookup = 'gte' if inclusive else 'gt'
+    return Q(pub_date__gt=pub_date) | Q(
+        pub_date=pub_date, **{f'{id_field}__{lookup}': post_id}
+    )
+
+
+def older_than(pub_date, post_id, inclusive=False):
+    """Условие «ключ (pub_date, id) меньше заданного»."""
+    lookup = 'lte' if inclusive else 'lt'
+    return Q(pub_date__lt=pub_date) | Q(
+        pub_date=pub_date, **{f'id__{lookup}': post_id}
+    )
+
+
+def last_boundary(feed_key):
+    return (
+        PageBoundary.objects.filter(feed_key=feed_key)
+        .order_by('-rank').first()
+    )
+
+
+def extend_boundaries(feed_key, posts, rank):
+    """Достраивает границы ленты до номера rank включительно."""
+    step = settings.PAGE_BOUNDARY_STEP
+    last = last_boundary(feed_key)
+    start = last.rank if last is not None else 0
+    if rank <= start:
+        return
+    keys = posts.order_by('pub_date', 'id')
+    if last is not None:
+        keys = keys.filter(newer_than(last.pub_date, last.post_id))
+    keys = keys.values_list('pub_date', 'id')[:(rank - start) * step]
+    PageBoundary.objects.bulk_create(
+        (
+            PageBoundary(
+                feed_key=feed_key,
+                rank=start + (position + 1) // step,
+                pub_date=pub_date,
+                post_id=post_id,
+            )
+            for position, (pub_date, post_id) in enumerate(keys)
+            if (position + 1) % step == 0
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def get_boundary(feed_key, posts, rank):
+    """Граница с номером rank; при необходимости индекс достраивается."""
+    boundary = PageBoundary.objects.filter(
+        feed_key=feed_key, rank=rank
+    ).first()
+    if boundary is None:
+        extend_boundaries(feed_key, posts, rank)
+        boundary = PageBoundary.objects.filter(
+            feed_key=feed_key, rank=rank
+        ).first()
+    return boundary
+
+
+def count_by_boundaries(feed_key, posts):
+    """Число постов ленты по последней границе или None без индекса."""
+    last = last_boundary(feed_key)
+    if last is None:
+        return None
+    newer = posts.filter(newer_than(last.pub_date, last.post_id)).count()
+    return last.rank * settings.PAGE_BOUNDARY_STEP + newer
+
+
+def invalidate_boundaries(feed_keys, pub_date, post_id):
+    """Удаляет границы лент, сдвинутые изменением поста с этим ключом."""
+    PageBoundary.objects.filter(
+        Q(feed_key__in=feed_keys),
+        newer_than(pub_date, post_id, inclusive=True, id_field='post_id'),
+    ).delete()
+
+
+def rebuild_boundaries(feed_key, posts):
+    """Строит границы ленты заново одним проходом по ключам."""
+    step = settings.PAGE_BOUNDARY_STEP
+    PageBoundary.objects.filter(feed_key=feed_key).delete()
+    keys = posts.order_by('pub_date', 'id').values_list('pub_date', 'id')
+    batch = []
+    rank = 0
+    for position, (pub_date, post_id) in enumerate(keys.iterator()):
+        if (position + 1) % step:
+            continue
+        rank += 1
+        batch.append(PageBoundary(
+            feed_key=feed_key, rank=rank, pub_date=pub_date, post_id=post_id,
+        ))
+        if len(batch) >= 1000:
+            PageBoundary.objects.bulk_create(batch)
+            batch = []
+    PageBoundary.objects.bulk_create(batch)
+    return rank
@@ -0,0 +1,99 @@
+"""
+Чтение и сжатие журнала изменений моделей blog.
+
+Создание, изменение и удаление постов, комментариев, категорий и
+локаций записываются в ChangeLogEntry в той же транзакции, что и само
+изменение (см. blog.signals и BaseQuerySet). Потребитель (поисковый
+индекс, кеш, аналитика) хранит номер последней обработанной записи и
+получает следующие через read_changes(), не перебирая таблицы целиком.
+
+compact_changes() ограничивает размер журнала: из записей старше
+CHANGELOG_COMPACT_AFTER по каждому объекту остаётся только последняя, а
+записи об удалении пропадают через CHANGELOG_TOMBSTONE_TTL. Потребитель,
+отставший сильнее, должен заново выполнить полную синхронизацию.
+
+Курсор — автоинкрементный id. При нескольких одновременных писателях
+(PostgreSQL, MySQL) запись с меньшим id может зафиксироваться позже
+записи с большим, и курсор её перескочит. Поэтому читаются только
+записи старше CHANGELOG_READ_LAG секунд: задержка должна быть больше
+самой долгой пишущей транзакции. SQLite пишет в один поток, и для неё
+задержка по умолчанию нулевая.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import ChangeLogEntry
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def read_changes(after=0, limit=DEFAULT_BATCH_SIZE, models=None):
+    """Записи журнала после курсора after в порядке их появления.
+
+    models ограничивает выборку метками моделей вида 'blog.Post'. Новый
+    курсор — номер последней полученной записи.
+    """
+    queryset = ChangeLogEntry.objects.filter(id__gt=after)
+    if models:
+        queryset = queryset.filter(model_label__in=models)
+    entries = list(queryset.order_by('id')[:limit])
+    cutoff = read_cutoff()
+    if cutoff is None:
+        return entries
+    # Чтение обрывается на первой свежей записи: до неё ещё могут
+    # зафиксироваться записи с меньшими номерами.
+    for index, entry in enumerate(entries):
+        if entry.changed_at > cutoff:
+            return entries[:index]
+    return entries
+
+
+def read_cutoff():
+    """Время, записи новее которого ещё не читаются, или None."""
+    if not settings.CHANGELOG_READ_LAG:
+        return None
+    return timezone.now() - timedelta(seconds=settings.CHANGELOG_READ_LAG)
+
+
+def latest_cursor():
+    """Номер последней записи журнала: с него читают только новое."""
+    cutoff = read_cutoff()
+    if cutoff is not None:
+        first_recent = ChangeLogEntry.objects.filter(
+            changed_at__gt=cutoff
+        ).aggregate(first=Min('id'))['first']
+        if first_recent is not None:
+            return first_recent - 1
+    return (
+        ChangeLogEntry.objects.aggregate(last=Max('id'))['last'] or 0
+    )
+
+
+def compact_changes(now=None):
+    """Сжимает старую часть журнала, возвращает число удалённых записей."""
+    now = now or timezone.now()
+    compact_before = now - timedelta(
+        seconds=settings.CHANGELOG_COMPACT_AFTER
+    )
+    tombstones_before = now - timedelta(
+        seconds=settings.CHANGELOG_TOMBSTONE_TTL
+    )
+    with transaction.atomic():
+        old_entries = ChangeLogEntry.objects.filter(
+            changed_at__lt=compact_before
+        )
+        latest_ids = (
+            old_entries.values('model_label', 'object_id')
+            .annotate(last_id=Max('id'))
+            .values('last_id')
+        )
+        superseded, _ = old_entries.exclude(id__in=latest_ids).delete()
+        expired, _ = ChangeLogEntry.objects.filter(
+            action=ChangeLogEntry.Action.DELETE,
+            changed_at__lt=tombstones_before,
+        ).delete()
+    return superseded + expired
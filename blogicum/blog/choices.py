@@ -0,0 +1,88 @@
+"""
+Варианты выбора категории и локации в форме поста.
+
+Списки (pk, подпись) хранятся в VersionedCache и сбрасываются сигналами
+при изменении категорий и локаций, поэтому форма не выбирает их из базы
+при каждом показе. Если локаций больше LOCATION_AUTOCOMPLETE_FROM, список
+локаций заменяется полем с подсказками: в HTML попадает только выбранная
+локация, остальные подгружаются скриптом из /api/v1/locations/.
+"""
+from django import forms
+from django.forms.models import ModelChoiceIterator, ModelChoiceIteratorValue
+
+from .models import Category, Location
+from .versioned import VersionedCache
+
+
+def load_choices(model):
+    return lambda: [
+        (obj.pk, str(obj)) for obj in model.objects.order_by('pk')
+    ]
+
+
+category_choices = VersionedCache('category_choices', load_choices(Category))
+location_choices = VersionedCache('location_choices', load_choices(Location))
+
+
+class CachedChoiceIterator(ModelChoiceIterator):
+    """Варианты из кеша поля вместо запроса к queryset."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for pk, label in self.field.choices_cache.get():
+            yield (ModelChoiceIteratorValue(pk, None), label)
+
+    def __len__(self):
+        return (
+            len(self.field.choices_cache.get())
+            + (self.field.empty_label is not None)
+        )
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(
+            self.field.choices_cache.get()
+        )
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """Выбор объекта по закешированному списку вариантов.
+
+    Проверка отправленного значения по-прежнему идёт через queryset.
+    """
+
+    iterator = CachedChoiceIterator
+    choices_cache = None
+
+
+class CategoryChoiceField(CachedModelChoiceField):
+    choices_cache = category_choices
+
+
+class LocationChoiceField(CachedModelChoiceField):
+    choices_cache = location_choices
+
+
+class AutocompleteSelect(forms.Select):
+    """Список, в котором изначально есть только выбранный вариант.
+
+    Остальные варианты скрипт подгружает по адресу из
+    data-autocomplete-url по мере ввода.
+    """
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, url, attrs=None):
+        super().__init__({**(attrs or {}), 'data-autocomplete-url': url})
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        try:
+            self.choices = [
+                choice for choice in choices
+                if choice[0] == '' or str(choice[0]) in value
+            ]
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
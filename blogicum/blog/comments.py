@@ -0,0 +1,211 @@
+"""
+Приём новых комментариев.
+
+Существование поста проверяется по кешу: запись появляется после
+фиксации создания поста и удаляется при его удалении. Частоту
+комментариев ограничивает корзина токенов пользователя в кеше:
+COMMENT_RATE_BURST комментариев подряд, затем COMMENT_RATE_PER_SECOND в
+секунду.
+
+Оба кеша — кеш Django по умолчанию. Пока он свой у каждого процесса
+(LocMemCache без настройки CACHES), корзина тоже своя, и на деле
+пользователь может отправить до COMMENT_RATE_BURST × число процессов
+комментариев подряд; для точного лимита нужен общий кеш. Устаревшая
+запись о посте, удалённом в другом процессе, безопасна: запись пакета
+упадёт на внешнем ключе, и такие комментарии будут отклонены.
+
+Запись объединяется в пакеты в пределах процесса. Первый запрос
+становится ведущим и сохраняет до COMMENT_BATCH_SIZE комментариев
+очереди одной транзакцией, а остальные запросы ждут результата. Если в
+очереди уже есть другие комментарии, ведущий сначала ждёт
+COMMENT_BATCH_WINDOW, чтобы собрать и параллельные; одинокий
+комментарий записывается сразу. Если к концу записи в очереди есть
+новые комментарии, ведущим становится первый из ожидающих. Ответ
+каждому запросу отдаётся только после фиксации его комментария,
+поэтому редирект на пост показывает его сразу.
+
+Если ведущий за COMMENT_BATCH_TIMEOUT так и не забрал комментарий из
+очереди, запрос записывает его сам. Комментарий, который ведущий уже
+забрал, может быть зафиксирован в любой момент, поэтому запрос ждёт
+окончания записи пакета: ошибка по таймауту привела бы к повтору и
+дублю.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404
+
+from .metrics import record_cache
+from .models import Comment, Post, bulk_create_sets_pk
+
+
+def post_cache_key(post_id):
+    return f'post-exists:{post_id}'
+
+
+def post_exists(post_id):
+    """Есть ли пост, с проверкой по кешу."""
+    exists = cache.get(post_cache_key(post_id))
+    record_cache('comment_posts', exists is not None)
+    if exists is None:
+        exists = Post.objects.filter(pk=post_id).exists()
+        # Отсутствие не кешируется: пост может появиться в другом
+        # процессе, и его remember_post() сюда не дойдёт.
+        if exists:
+            remember_post(post_id)
+    return exists
+
+
+def remember_post(post_id):
+    cache.set(
+        post_cache_key(post_id), True, settings.COMMENT_POST_CACHE_TIMEOUT
+    )
+
+
+def forget_post(post_id):
+    cache.delete(post_cache_key(post_id))
+
+
+def take_comment_token(user_id):
+    """Списывает токен из корзины пользователя.
+
+    Возвращает 0, если комментарий разрешён, иначе через сколько секунд
+    появится следующий токен.
+    """
+    key = f'comment-tokens:{user_id}'
+    burst = settings.COMMENT_RATE_BURST
+    rate = settings.COMMENT_RATE_PER_SECOND
+    now = time.time()
+    tokens, updated = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated) * rate)
+    wait = 0 if tokens >= 1 else (1 - tokens) / rate
+    if not wait:
+        tokens -= 1
+    cache.set(key, (tokens, now), int(burst / rate) + 1)
+    return wait
+
+
+class PendingComment:
+    """Комментарий в очереди на запись и ожидающий его запрос."""
+
+    def __init__(self, comment):
+        self.comment = comment
+        self.leader = False
+        self.error = None
+        self.ready = threading.Event()
+
+
+class CommentBatcher:
+    """Очередь комментариев процесса с пакетной записью."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = []
+        self.leading = False
+
+    def submit(self, comment):
+        """Сохраняет комментарий в составе пакета и ждёт фиксации."""
+        entry = PendingComment(comment)
+        with self.lock:
+            self.queue.append(entry)
+            if not self.leading:
+                self.leading = entry.leader = True
+        if not entry.leader:
+            self.wait(entry)
+        if entry.leader:
+            self.lead()
+        if entry.error is not None:
+            raise entry.error
+        return comment
+
+    def wait(self, entry):
+        timeout = settings.COMMENT_BATCH_TIMEOUT
+        if entry.ready.wait(timeout):
+            return
+        with self.lock:
+            orphaned = not entry.leader and entry in self.queue
+            if orphaned:
+                self.queue.remove(entry)
+        if orphaned:
+            # Ведущий не забрал комментарий: он записывается отдельно.
+            write_batch([entry])
+        elif not entry.leader:
+            # Пакет с комментарием пишется: lead() отметит его в finally.
+            entry.ready.wait()
+
+    def lead(self):
+        batch = []
+        written = False
+        try:
+            with self.lock:
+                alone = len(self.queue) <= 1
+            if settings.COMMENT_BATCH_WINDOW and not alone:
+                time.sleep(settings.COMMENT_BATCH_WINDOW)
+            with self.lock:
+                batch = self.queue[:settings.COMMENT_BATCH_SIZE]
+                del self.queue[:len(batch)]
+            try:
+                write_batch(batch)
+            except Exception as error:
+                for entry in batch:
+                    entry.error = error
+            written = True
+        finally:
+            # Передача очереди выполняется, даже если поток ведущего
+            # прерван (BaseException), иначе очередь встанет навсегда.
+            if not written:
+                for entry in batch:
+                    entry.error = RuntimeError(
+                        'Запись пакета комментариев прервана.'
+                    )
+            with self.lock:
+                successor = self.queue[0] if self.queue else None
+                if successor is None:
+                    self.leading = False
+                else:
+                    successor.leader = True
+            for entry in batch:
+                entry.ready.set()
+            if successor is not None:
+                successor.ready.set()
+
+
+def save_comments(comments):
+    with transaction.atomic():
+        if bulk_create_sets_pk(connection):
+            # Журнал изменений bulk_create заполняет сам.
+            Comment.objects.bulk_create(comments)
+        else:
+            # Без id объекты не попадут в журнал изменений; пакет всё
+            # равно пишется одной транзакцией с одной фиксацией.
+            for comment in comments:
+                comment.save()
+
+
+def write_batch(batch):
+    try:
+        save_comments([entry.comment for entry in batch])
+    except IntegrityError:
+        # Пост удалили после проверки по кешу: такие комментарии
+        # отклоняются, остальные записываются повторно.
+        post_ids = {entry.comment.post_id for entry in batch}
+        for post_id in post_ids:
+            forget_post(post_id)
+        existing = set(
+            Post.objects.filter(pk__in=post_ids)
+            .values_list('pk', flat=True)
+        )
+        for entry in batch:
+            entry.comment.pk = None
+            entry.comment._state.adding = True
+            if entry.comment.post_id not in existing:
+                entry.error = Http404('Пост не найден')
+        save_comments([
+            entry.comment for entry in batch if entry.error is None
+        ])
+
+
+comment_batcher = CommentBatcher()
@@ -0,0 +1,169 @@
+"""
+RSS- и Atom-ленты публикаций: общая, по категории и по автору.
+
+Перед выдачей ленты берётся её версия — число видимых постов и
+последние времена публикации и изменения (cached_feed_version, из кеша,
+который сбрасывают сигналы). Из неё получаются ETag и Last-Modified, так
+что клиент с актуальной копией получает 304 без построения ленты.
+Готовый XML кешируется по ключу, включающему эту версию, и строится
+заново только после изменения входящих в ленту постов.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import http_date
+
+from .metrics import record_cache
+from .models import Category
+from .paginators import cached_feed_version
+from .queries import post_query_default
+
+User = get_user_model()
+
+
+class PostFeed(Feed):
+    """RSS-лента последних опубликованных постов."""
+
+    title = 'Блогикум: новые публикации'
+    description = 'Последние публикации всех авторов Блогикума.'
+
+    def link(self):
+        return reverse('blog:index')
+
+    def feed_posts(self, obj):
+        """Видимые посты, из которых состоит лента."""
+        return post_query_default(filters=True, fields='feed')
+
+    def feed_key(self, obj):
+        """Ключ ленты, как у пагинатора (см. paginators.post_feed_keys)."""
+        return 'index'
+
+    def feed_version(self, obj):
+        """Состояние ленты: меняется при любом изменении её постов."""
+        version = cached_feed_version(
+            self.feed_key(obj), self.feed_posts(obj)
+        )
+        version['object_updated'] = getattr(obj, 'updated_at', None)
+        return version
+
+    def items(self, obj):
+        return self.feed_posts(obj)[:settings.FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.text_html
+
+    def item_link(self, item):
+        return reverse('blog:post_detail', args=(item.pk,))
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_categories(self, item):
+        return (item.category.title,) if item.category else ()
+
+    def __call__(self, request, *args, **kwargs):
+        obj = self.get_object(request, *args, **kwargs)
+        version = self.feed_version(obj)
+        digest = hashlib.md5(
+            f'{type(self).__name__}:{request.path}:{version}'.encode()
+        ).hexdigest()
+        etag = f'"{digest}"'
+        timestamps = [
+            value for key, value in version.items()
+            if key != 'total' and value is not None
+        ]
+        last_modified = (
+            int(max(timestamps).timestamp()) if timestamps else None
+        )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            cache_key = f'feed:{digest}'
+            cached = cache.get(cache_key)
+            record_cache('feeds', cached is not None)
+            if cached is None:
+                rendered = super().__call__(request, *args, **kwargs)
+                cached = (rendered.content, rendered['Content-Type'])
+                cache.set(cache_key, cached, settings.FEED_CACHE_TIMEOUT)
+            response = HttpResponse(cached[0], content_type=cached[1])
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class CategoryFeed(PostFeed):
+    """RSS-лента публикаций категории."""
+
+    def get_object(self, request, category_slug):
+        return get_object_or_404(
+            Category, slug=category_slug, is_published=True
+        )
+
+    def title(self, obj):
+        return f'Блогикум: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('blog:category_posts', args=(obj.slug,))
+
+    def feed_key(self, obj):
+        return f'category:{obj.pk}'
+
+    def feed_posts(self, obj):
+        return super().feed_posts(obj).filter(category=obj)
+
+
+class AuthorFeed(PostFeed):
+    """RSS-лента публикаций автора."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Блогикум: публикации {obj.username}'
+
+    def description(self, obj):
+        return f'Последние публикации пользователя {obj.username}.'
+
+    def link(self, obj):
+        return reverse('blog:profile', args=(obj.username,))
+
+    def feed_key(self, obj):
+        return f'author:{obj.pk}'
+
+    def feed_posts(self, obj):
+        return super().feed_posts(obj).filter(author=obj)
+
+
+class PostAtomFeed(PostFeed):
+    feed_type = Atom1Feed
+
+
+class CategoryAtomFeed(CategoryFeed):
+    feed_type = Atom1Feed
+
+
+class AuthorAtomFeed(AuthorFeed):
+    feed_type = Atom1Feed
@@ -1,6 +1,13 @@
 from django import forms
+from django.conf import settings
+from django.urls import reverse_lazy
 
+from .choices import (
+    AutocompleteSelect, CategoryChoiceField, LocationChoiceField,
+    location_choices,
+)
 from .models import Comment, Post, User
+from .uploads import PostImageField
 
 
 class UserEditForm(forms.ModelForm):
@@ -18,6 +25,11 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = '__all__'
         exclude = ('author',)
+        field_classes = {
+            'image': PostImageField,
+            'category': CategoryChoiceField,
+            'location': LocationChoiceField,
+        }
 
         widgets = {
             'pub_date': forms.DateTimeInput(
@@ -26,6 +38,23 @@ class PostForm(forms.ModelForm):
             ),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        location = self.fields['location']
+        if len(location_choices.get()) > settings.LOCATION_AUTOCOMPLETE_FROM:
+            location.widget = AutocompleteSelect(
+                reverse_lazy('blog:api_locations')
+            )
+            location.widget.choices = location.choices
+
+
+class PostDeleteForm(forms.ModelForm):
+    """Подтверждение удаления поста: только объект, без полей ввода."""
+
+    class Meta:
+        model = Post
+        fields = ()
+
 
 class CommentForm(forms.ModelForm):
     """Ворма для добавления комментария."""
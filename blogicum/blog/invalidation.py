@@ -0,0 +1,307 @@
+"""
+Шина сброса кешей процессов.
+
+Кеши в памяти процесса (VersionedCache и будущие кеши карточек, строк
+пользователей) сверяют свою копию с версией ключа: bus.version(key).
+Изменение объекта в любом процессе вызывает bus.invalidate(key), ключи
+одной транзакции копятся и после её фиксации уходят остальным процессам
+одним сообщением через транспорт из INVALIDATION_TRANSPORT:
+
+* DatabaseTransport (по умолчанию) — таблица InvalidationMessage,
+  которую каждый процесс опрашивает не чаще раза в
+  INVALIDATION_POLL_INTERVAL секунд; работает между узлами;
+* LocalTransport — экземпляры внутри одного интерпретатора: только для
+  сервера из одного процесса и для тестов, другим процессам сброс не
+  доходит;
+* UnixSocketTransport — датаграммы в сокеты всех процессов узла из
+  каталога INVALIDATION_SOCKET_DIR.
+
+Полученные ключи применяются в начале запроса (InvalidationMiddleware):
+версия каждого ключа увеличивается. Если процесс мог пропустить
+сообщения (долго не опрашивал таблицу, пропуск в номерах датаграмм,
+слишком длинный пакет), увеличивается общая эпоха, входящая в версию
+каждого ключа, и все кеши процесса перечитываются.
+
+Ключи откатанной транзакции остаются в буфере потока и уходят со
+следующей фиксацией: лишний сброс безопасен, пропущенный — нет.
+"""
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+import weakref
+from collections import deque
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import InvalidationMessage
+
+
+def new_sender_id():
+    host = socket.gethostname()[:32]
+    return f'{host}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+class LocalTransport:
+    """Доставка другим экземплярам транспорта в этом же интерпретаторе."""
+
+    instances = weakref.WeakSet()
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.inbox = deque()
+        with self.lock:
+            self.instances.add(self)
+
+    def publish(self, keys):
+        with self.lock:
+            receivers = [
+                instance for instance in self.instances if instance is not self
+            ]
+        for receiver in receivers:
+            receiver.inbox.append(keys)
+
+    def receive(self):
+        keys = set()
+        while self.inbox:
+            keys.update(self.inbox.popleft())
+        return keys, False
+
+
+class DatabaseTransport:
+    """Сообщения в таблице InvalidationMessage.
+
+    Процесс, не опрашивавший таблицу дольше INVALIDATION_RETENTION
+    секунд, считает, что мог пропустить удалённые сообщения.
+    """
+
+    def __init__(self):
+        self.sender = new_sender_id()
+        self.cursor = None
+        self.last_receive = None
+        self.backlog = False
+        self.last_purge = 0
+
+    def publish(self, keys):
+        InvalidationMessage.objects.create(
+            sender=self.sender, keys=json.dumps(sorted(keys))
+        )
+        self.purge()
+
+    def purge(self):
+        now = time.monotonic()
+        if now - self.last_purge < settings.INVALIDATION_RETENTION / 2:
+            return
+        self.last_purge = now
+        InvalidationMessage.objects.filter(
+            created_at__lt=timezone.now() - timedelta(
+                seconds=settings.INVALIDATION_RETENTION
+            )
+        ).delete()
+
+    def latest_id(self):
+        return (
+            InvalidationMessage.objects.aggregate(last=Max('id'))['last']
+            or 0
+        )
+
+    def receive(self):
+        now = time.monotonic()
+        if (self.last_receive is not None and not self.backlog
+                and now - self.last_receive
+                < settings.INVALIDATION_POLL_INTERVAL):
+            return set(), False
+        missed = (
+            self.last_receive is not None
+            and now - self.last_receive > settings.INVALIDATION_RETENTION
+        )
+        self.last_receive = now
+        if self.cursor is None or missed:
+            # Новому процессу сбрасывать нечего, отставшему — всё сразу.
+            self.cursor = self.latest_id()
+            return set(), missed
+        rows = list(
+            InvalidationMessage.objects.filter(id__gt=self.cursor)
+            .order_by('id')
+            .values_list('id', 'sender', 'keys')
+            [:settings.INVALIDATION_BATCH_SIZE]
+        )
+        keys = set()
+        for message_id, sender, message_keys in rows:
+            self.cursor = message_id
+            if sender != self.sender:
+                keys.update(json.loads(message_keys))
+        # Остаток длинной очереди читается при следующем запросе, без
+        # ожидания интервала.
+        self.backlog = len(rows) == settings.INVALIDATION_BATCH_SIZE
+        return keys, False
+
+
+class UnixSocketTransport:
+    """Датаграммы в сокеты всех процессов узла.
+
+    Каждое сообщение несёт номер в последовательности отправителя;
+    пропуск номера (переполненный буфер получателя) или слишком длинный
+    пакет означают пропущенные сообщения.
+    """
+
+    MAX_DATAGRAM = 60000
+
+    def __init__(self):
+        self.directory = Path(settings.INVALIDATION_SOCKET_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sender = uuid.uuid4().hex
+        self.path = self.directory / f'{self.sender}.sock'
+        self.sequence = 0
+        self.sequences = {}
+        self.inbox = deque()
+        self.missed = False
+        self.lock = threading.Lock()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.listener.bind(str(self.path))
+        self.sender_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sender_socket.setblocking(False)
+        threading.Thread(target=self.listen, daemon=True).start()
+        atexit.register(self.close)
+
+    def close(self):
+        self.path.unlink(missing_ok=True)
+        self.listener.close()
+        self.sender_socket.close()
+
+    def publish(self, keys):
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+        payload = json.dumps({
+            'sender': self.sender, 'sequence': sequence, 'keys': sorted(keys),
+        }).encode()
+        if len(payload) > self.MAX_DATAGRAM:
+            payload = json.dumps({
+                'sender': self.sender, 'sequence': sequence, 'keys': None,
+            }).encode()
+        for path in self.directory.glob('*.sock'):
+            if path == self.path:
+                continue
+            try:
+                self.sender_socket.sendto(payload, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Процесс завершился, не убрав за собой сокет.
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                # Буфер получателя полон: он заметит пропуск номера.
+                pass
+
+    def listen(self):
+        while True:
+            try:
+                data = self.listener.recv(self.MAX_DATAGRAM + 1024)
+            except OSError:
+                return
+            message = json.loads(data)
+            with self.lock:
+                previous = self.sequences.get(message['sender'])
+                self.sequences[message['sender']] = message['sequence']
+                if (previous is not None
+                        and message['sequence'] != previous + 1):
+                    self.missed = True
+                if message['keys'] is None:
+                    self.missed = True
+                else:
+                    self.inbox.append(message['keys'])
+
+    def receive(self):
+        keys = set()
+        with self.lock:
+            while self.inbox:
+                keys.update(self.inbox.popleft())
+            missed, self.missed = self.missed, False
+        return keys, missed
+
+
+class InvalidationBus:
+    """Версии ключей кешей процесса и их рассылка другим процессам."""
+
+    def __init__(self, transport=None):
+        self._transport = transport
+        self.versions = {}
+        self.epoch = 0
+        self.lock = threading.Lock()
+        self.pending = threading.local()
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = import_string(
+                settings.INVALIDATION_TRANSPORT
+            )()
+        return self._transport
+
+    def version(self, key):
+        return self.epoch, self.versions.get(key, 0)
+
+    def apply(self, keys):
+        with self.lock:
+            for key in keys:
+                self.versions[key] = self.versions.get(key, 0) + 1
+            if len(self.versions) > settings.INVALIDATION_MAX_KEYS:
+                self.versions.clear()
+                self.epoch += 1
+
+    def bump_all(self):
+        with self.lock:
+            self.versions.clear()
+            self.epoch += 1
+
+    def invalidate(self, *keys):
+        """Сбрасывает ключи после фиксации текущей транзакции."""
+        if not keys:
+            return
+        pending = getattr(self.pending, 'keys', None)
+        if pending is None:
+            pending = self.pending.keys = set()
+        pending.update(keys)
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        keys = getattr(self.pending, 'keys', None)
+        if not keys:
+            return
+        self.pending.keys = None
+        self.apply(keys)
+        self.transport.publish(keys)
+
+    def poll(self):
+        """Применяет ключи, полученные от других процессов."""
+        keys, missed = self.transport.receive()
+        if missed:
+            self.bump_all()
+        if keys:
+            self.apply(keys)
+
+
+bus = InvalidationBus()
+
+
+def object_key(model, pk):
+    return f'{model._meta.label_lower}:{pk}'
+
+
+class InvalidationMiddleware:
+    """Применяет сообщения шины до обработки запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        bus.poll()
+        return self.get_response(request)
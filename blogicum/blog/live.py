@@ -0,0 +1,430 @@
+"""
+Живое обновление комментариев на странице поста (ASGI).
+
+Пути задаёт шаблон LIVE_COMMENTS_PATH (по умолчанию /posts/<id>/
+comments/<вид>/): вид stream — поток Server-Sent Events, poll?after=
+<курсор> — долгий опрос для клиентов без EventSource. Страница поста
+получает адреса из live_url, а blogicum.asgi узнаёт их через
+match_live_path, поэтому пути описаны в одном месте. Оба пути
+обслуживает LiveCommentsApp в обход Django, под WSGI их нет.
+
+Источник изменений — журнал ChangeLogEntry. В каждом процессе его
+читает один CommentHub раз в LIVE_POLL_INTERVAL секунд, пока есть
+подписчики, рендерит фрагменты новых и изменённых комментариев постов
+с подписчиками и раздаёт их очередям подписчиков. Запись журнала об
+удалении не содержит поста: хаб находит его по комментариям, которые
+помнит для постов с подписчиками. При дочитывании по курсору удаления
+получает любой клиент, а удаляет комментарий, только если он есть на
+странице.
+
+Очередь подписчика ограничена LIVE_QUEUE_SIZE событиями. Переполненная
+очередь заменяется одним событием reset, после которого клиент
+перезагружает страницу. Курсор (номер записи журнала) передаётся как
+id события SSE: при переподключении с Last-Event-ID и при долгом опросе
+пропущенное дочитывается из журнала.
+"""
+import asyncio
+import json
+import logging
+import re
+from functools import lru_cache
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from importlib import import_module
+from string import Formatter
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.template.loader import render_to_string
+
+from .changefeed import latest_cursor, read_changes
+from .models import ChangeLogEntry, Comment, Post
+from .queries import post_visibility_filter
+
+logger = logging.getLogger(__name__)
+
+COMMENT_LABEL = Comment._meta.label
+RESET = {'action': 'reset'}
+LIVE_KINDS = ('stream', 'poll')
+FIELD_PATTERNS = {
+    'post_id': r'(?P<post_id>\d+)',
+    'kind': f'(?P<kind>{"|".join(LIVE_KINDS)})',
+}
+
+
+def live_url(post_id, kind):
+    """Адрес живых комментариев поста: kind — 'stream' или 'poll'."""
+    return settings.LIVE_COMMENTS_PATH.format(post_id=post_id, kind=kind)
+
+
+@lru_cache(maxsize=None)
+def live_path_pattern(template):
+    """Регулярное выражение для путей по шаблону LIVE_COMMENTS_PATH."""
+    parts = []
+    for literal, field, _, _ in Formatter().parse(template):
+        parts.append(re.escape(literal))
+        if field is not None:
+            parts.append(FIELD_PATTERNS[field])
+    return re.compile(f'^{"".join(parts)}$')
+
+
+def match_live_path(path):
+    """(post_id, kind) для пути живых комментариев, иначе None."""
+    match = live_path_pattern(settings.LIVE_COMMENTS_PATH).match(path)
+    if match is None:
+        return None
+    return int(match['post_id']), match['kind']
+
+
+def load_events(after, post_ids):
+    """События о комментариях постов post_ids после курсора after и новый
+    курсор.
+
+    Фрагмент рендерится дважды: для автора комментария (со ссылками
+    на изменение и удаление) и для остальных; комментарии других постов
+    не загружаются и не рендерятся. Поста удалённого комментария журнал
+    не знает, у события удаления post_id равен None.
+    """
+    entries = read_changes(
+        after, settings.LIVE_BATCH_SIZE, models=[COMMENT_LABEL]
+    )
+    if not entries:
+        return [], after
+    comments = (
+        Comment.objects.select_related('author')
+        .filter(post_id__in=post_ids)
+        .in_bulk(
+            entry.object_id for entry in entries
+            if entry.action != ChangeLogEntry.Action.DELETE
+        )
+    )
+    events = []
+    for entry in entries:
+        comment = comments.get(entry.object_id)
+        if entry.action == ChangeLogEntry.Action.DELETE:
+            event = {'post_id': None, 'action': 'delete'}
+        elif comment is None:
+            # Комментарий другого поста или удалён позже: об удалении
+            # будет своя запись.
+            continue
+        else:
+            event = {
+                'post_id': comment.post_id,
+                'action': 'upsert',
+                'author_id': comment.author_id,
+                'html': render_to_string(
+                    'blog/includes/comment.html', {'comment': comment}
+                ),
+                'author_html': render_to_string(
+                    'blog/includes/comment.html',
+                    {'comment': comment, 'user': comment.author},
+                ),
+            }
+        events.append({**event, 'id': entry.id, 'comment_id': (
+            entry.object_id
+        )})
+    return events, entries[-1].id
+
+
+def public_event(event, user_id):
+    """Событие в том виде, в каком его получает клиент."""
+    if event['action'] != 'upsert':
+        return {
+            key: event[key] for key in ('id', 'action', 'comment_id')
+            if key in event
+        }
+    return {
+        'id': event['id'],
+        'action': 'upsert',
+        'comment_id': event['comment_id'],
+        'html': (
+            event['author_html'] if event['author_id'] == user_id
+            else event['html']
+        ),
+    }
+
+
+class Subscriber:
+    def __init__(self, post_id, user_id):
+        self.post_id = post_id
+        self.user_id = user_id
+        self.queue = asyncio.Queue(settings.LIVE_QUEUE_SIZE)
+
+    def offer(self, event):
+        if event['post_id'] not in (None, self.post_id):
+            return
+        try:
+            self.queue.put_nowait(public_event(event, self.user_id))
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: вместо потерянных событий он
+            # получает reset и загружает страницу заново.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+
+class CommentHub:
+    """Один читатель журнала на процесс и цикл событий.
+
+    Рендерятся только комментарии постов, у которых есть подписчики.
+    Чтобы удаление дошло лишь до подписчиков своего поста, хаб помнит
+    посты комментариев этих постов: существующих на момент подписки и
+    появившихся после. Ошибка чтения журнала не останавливает хаб: он
+    ждёт от LIVE_POLL_INTERVAL до LIVE_ERROR_BACKOFF секунд, удваивая
+    паузу, и пробует снова.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.comment_posts = {}
+        self.task = None
+        self.loop = None
+        self.cursor = None
+
+    def post_ids(self):
+        return {subscriber.post_id for subscriber in self.subscribers}
+
+    async def subscribe(self, post_id, user_id):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.subscribers = set()
+            self.comment_posts = {}
+            self.task = None
+            self.loop = loop
+        known = post_id in self.post_ids()
+        subscriber = Subscriber(post_id, user_id)
+        self.subscribers.add(subscriber)
+        if self.task is None:
+            self.task = loop.create_task(self.run())
+        if not known:
+            comment_ids = await sync_to_async(list)(
+                Comment.objects.filter(post_id=post_id)
+                .values_list('pk', flat=True)
+            )
+            for comment_id in comment_ids:
+                self.comment_posts.setdefault(comment_id, post_id)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        if subscriber.post_id not in self.post_ids():
+            self.comment_posts = {
+                comment_id: post_id
+                for comment_id, post_id in self.comment_posts.items()
+                if post_id != subscriber.post_id
+            }
+
+    def route(self, event):
+        """Пост события или None, если подписчикам оно не нужно."""
+        if event['action'] == 'upsert':
+            self.comment_posts[event['comment_id']] = event['post_id']
+            return event
+        post_id = self.comment_posts.pop(event['comment_id'], None)
+        if post_id is None:
+            return None
+        return {**event, 'post_id': post_id}
+
+    async def run(self):
+        delay = settings.LIVE_POLL_INTERVAL
+        try:
+            while self.subscribers:
+                try:
+                    if self.cursor is None:
+                        # Читается только то, что появилось после
+                        # запуска: прошлое подписчики дочитывают сами
+                        # по своему курсору.
+                        self.cursor = await sync_to_async(latest_cursor)()
+                    events, self.cursor = await sync_to_async(load_events)(
+                        self.cursor, self.post_ids()
+                    )
+                except Exception:
+                    logger.exception('Не удалось прочитать журнал изменений')
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, settings.LIVE_ERROR_BACKOFF)
+                    continue
+                delay = settings.LIVE_POLL_INTERVAL
+                for event in filter(None, map(self.route, events)):
+                    for subscriber in list(self.subscribers):
+                        subscriber.offer(event)
+                if len(events) < settings.LIVE_BATCH_SIZE:
+                    await asyncio.sleep(settings.LIVE_POLL_INTERVAL)
+        finally:
+            self.task = None
+            self.cursor = None
+
+
+hub = CommentHub()
+
+
+def resolve_user(scope):
+    """Пользователь по сессионной cookie из заголовков запроса."""
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', ()):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(morsel.value if morsel else None)
+    return get_user(SimpleNamespace(session=session))
+
+
+def find_visible_post(scope, post_id):
+    """Номер пользователя (0 для анонима), если пост ему виден, иначе None."""
+    user = resolve_user(scope)
+    visible = Post.objects.filter(
+        post_visibility_filter(user), pk=post_id
+    ).exists()
+    if not visible:
+        return None
+    return user.pk or 0
+
+
+def header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def parse_cursor(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+async def send_response(send, status, body, content_type):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode()),
+            (b'cache-control', b'no-store'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def format_event(event):
+    lines = [f'event: {event["action"]}']
+    if 'id' in event:
+        lines.append(f'id: {event["id"]}')
+    data = json.dumps(event, ensure_ascii=False)
+    return ('\n'.join(lines) + f'\ndata: {data}\n\n').encode()
+
+
+async def stream(scope, receive, send, post_id, user_id):
+    """Поток SSE: события, пропущенные после Last-Event-ID, затем новые."""
+    subscriber = await hub.subscribe(post_id, user_id)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': HTTPStatus.OK,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-store'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode(),
+            'more_body': True,
+        })
+        after = parse_cursor(header(scope, b'last-event-id'))
+        if after is not None:
+            events, _ = await sync_to_async(load_events)(
+                after, {post_id}
+            )
+            for event in events:
+                await send({
+                    'type': 'http.response.body',
+                    'body': format_event(public_event(event, user_id)),
+                    'more_body': True,
+                })
+        while not disconnected.done():
+            getter = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected},
+                timeout=settings.LIVE_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if getter in done:
+                body = format_event(getter.result())
+            else:
+                getter.cancel()
+                body = b': ping\n\n'
+            if disconnected.done():
+                break
+            await send({
+                'type': 'http.response.body', 'body': body,
+                'more_body': True,
+            })
+    finally:
+        hub.unsubscribe(subscriber)
+        disconnected.cancel()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def long_poll(scope, receive, send, post_id, user_id):
+    """Ответ с событиями после курсора ?after=; если их нет, ждёт до
+    LIVE_LONG_POLL_TIMEOUT секунд. Без курсора сразу отдаёт текущий.
+    """
+    query = parse_qs(scope.get('query_string', b'').decode())
+    after = parse_cursor(query.get('after', [None])[0])
+    if after is None:
+        cursor = await sync_to_async(latest_cursor)()
+        events = []
+    else:
+        subscriber = await hub.subscribe(post_id, user_id)
+        try:
+            events, cursor = await sync_to_async(load_events)(
+                after, {post_id}
+            )
+            events = [public_event(event, user_id) for event in events]
+            if not events:
+                try:
+                    events.append(await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        settings.LIVE_LONG_POLL_TIMEOUT,
+                    ))
+                except asyncio.TimeoutError:
+                    pass
+                while not subscriber.queue.empty():
+                    events.append(subscriber.queue.get_nowait())
+        finally:
+            hub.unsubscribe(subscriber)
+        cursor = max([cursor, *(event.get('id', 0) for event in events)])
+    body = json.dumps(
+        {'cursor': cursor, 'events': events}, ensure_ascii=False
+    ).encode()
+    await send_response(send, HTTPStatus.OK, body, 'application/json')
+
+
+class LiveCommentsApp:
+    """ASGI-приложение для путей живых комментариев."""
+
+    handlers = {'stream': stream, 'poll': long_poll}
+
+    async def __call__(self, scope, receive, send, post_id, kind):
+        if scope['method'] != 'GET':
+            await send_response(
+                send, HTTPStatus.METHOD_NOT_ALLOWED, b'', 'text/plain'
+            )
+            return
+        user_id = await sync_to_async(find_visible_post)(scope, post_id)
+        if user_id is None:
+            await send_response(
+                send, HTTPStatus.NOT_FOUND, b'Not found', 'text/plain'
+            )
+            return
+        await self.handlers[kind](scope, receive, send, post_id, user_id)
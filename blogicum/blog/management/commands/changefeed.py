@@ -0,0 +1,75 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.changefeed import (
+    DEFAULT_BATCH_SIZE, compact_changes, latest_cursor, read_changes
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит журнал изменений моделей blog в формате JSON Lines '
+        'или сжимает его. Записи новее CHANGELOG_READ_LAG секунд '
+        'не выводятся: при нескольких писателях в базу (не SQLite) '
+        'курсор иначе может перескочить позже зафиксированную запись.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--after', type=int, default=0,
+            help='Курсор: номер последней уже обработанной записи.',
+        )
+        parser.add_argument(
+            '--from-end', action='store_true',
+            help='Начать с конца журнала, выводя только новые записи.',
+        )
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            help='Метка модели, например blog.Post; можно указать '
+                 'несколько раз.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Размер порции записей.',
+        )
+        parser.add_argument(
+            '--follow', action='store_true',
+            help='Ждать новые записи и выводить их по мере появления.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Период опроса журнала в режиме --follow, секунды.',
+        )
+        parser.add_argument(
+            '--compact', action='store_true',
+            help='Сжать журнал и завершиться.',
+        )
+
+    def handle(self, *args, **options):
+        if options['compact']:
+            removed = compact_changes()
+            self.stdout.write(f'Удалено записей журнала: {removed}')
+            return
+
+        cursor = latest_cursor() if options['from_end'] else options['after']
+        while True:
+            entries = read_changes(
+                cursor, options['limit'], options['models']
+            )
+            for entry in entries:
+                self.stdout.write(json.dumps({
+                    'id': entry.id,
+                    'model': entry.model_label,
+                    'object_id': entry.object_id,
+                    'action': entry.action,
+                    'changed_at': entry.changed_at.isoformat(),
+                }))
+            if entries:
+                cursor = entries[-1].id
+                self.stdout.flush()
+            if len(entries) < options['limit']:
+                if not options['follow']:
+                    return
+                time.sleep(options['interval'])
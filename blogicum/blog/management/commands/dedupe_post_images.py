@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище с адресацией по содержимому '
+        'и удаляет дубликаты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, какие файлы будут перенесены.',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post.image.field.storage
+        names = list(
+            Post.objects.exclude(image='')
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()
+        )
+        moved = missing = 0
+        for name in names:
+            if storage.is_content_name(name):
+                continue
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Файл не найден: {name}')
+                continue
+            if options['dry_run']:
+                self.stdout.write(name)
+                moved += 1
+                continue
+            with storage.open(name) as content:
+                new_name = storage.save(name, content)
+            with transaction.atomic():
+                Post.objects.filter(image=name).update(image=new_name)
+            storage.delete(name)
+            moved += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved}, не найдено: {missing}.'
+        ))
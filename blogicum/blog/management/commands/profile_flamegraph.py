@@ -0,0 +1,66 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.profiling import load_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает сохранённые профили запросов в файлы свёрнутых стеков '
+        '(<view>.collapsed) для flamegraph.pl или speedscope.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            default=settings.PROFILING_DIR,
+            help='Каталог с профилями.',
+        )
+        parser.add_argument(
+            '--output',
+            default=Path(settings.PROFILING_DIR) / 'flamegraphs',
+            help='Каталог для файлов свёрнутых стеков.',
+        )
+        parser.add_argument(
+            '--view',
+            help='Имя представления, например blog:index.',
+        )
+
+    def handle(self, *args, **options):
+        stacks = defaultdict(Counter)
+        stats = defaultdict(lambda: {'requests': 0, 'time': 0, 'sql': 0})
+        for profile in load_profiles(options['source']):
+            view = profile['view']
+            if options['view'] and view != options['view']:
+                continue
+            stacks[view].update(profile['samples'])
+            stats[view]['requests'] += 1
+            stats[view]['time'] += profile['duration']
+            stats[view]['sql'] += sum(
+                query['duration'] for query in profile['sql']
+            )
+
+        output = Path(options['output'])
+        output.mkdir(parents=True, exist_ok=True)
+        for view, samples in stacks.items():
+            path = output / f'{view.replace(":", "_")}.collapsed'
+            path.write_text(
+                ''.join(
+                    f'{stack} {count}\n'
+                    for stack, count in samples.most_common()
+                ),
+                encoding='utf-8',
+            )
+            view_stats = stats[view]
+            requests = view_stats['requests']
+            self.stdout.write(
+                f'{view}: запросов {requests}, '
+                f'среднее время {view_stats["time"] / requests * 1000:.1f} мс'
+                f', из них SQL {view_stats["sql"] / requests * 1000:.1f} мс'
+                f' -> {path}'
+            )
+        if not stacks:
+            self.stdout.write('Профилей не найдено.')
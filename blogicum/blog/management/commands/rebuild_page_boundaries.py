@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.boundaries import rebuild_boundaries
+from blog.models import Category, Post
+from blog.paginators import invalidate_feed_counts
+from blog.queries import feed_posts
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает индекс границ страниц для лент постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--feed',
+            action='append',
+            default=[],
+            help=(
+                'Ключ ленты: index, category:<id>, author:<id> или '
+                'author:<id>:all. По умолчанию перестраиваются все ленты.'
+            ),
+        )
+
+    def feed_keys(self):
+        yield 'index'
+        categories = Category.objects.filter(is_published=True)
+        for pk in categories.values_list('pk', flat=True):
+            yield f'category:{pk}'
+        authors = Post.objects.order_by().values_list('author_id', flat=True)
+        for pk in authors.distinct():
+            yield f'author:{pk}'
+            yield f'author:{pk}:all'
+
+    def handle(self, *args, **options):
+        feed_keys = options['feed'] or list(self.feed_keys())
+        for feed_key in feed_keys:
+            try:
+                posts = feed_posts(feed_key)
+            except ValueError as error:
+                raise CommandError(error)
+            with transaction.atomic():
+                rank = rebuild_boundaries(feed_key, posts)
+                invalidate_feed_counts([feed_key])
+            self.stdout.write(f'{feed_key}: границ {rank}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перестроено лент: {len(feed_keys)}.'
+        ))
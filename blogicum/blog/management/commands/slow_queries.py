@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.querylog import load_stats, query_stats
+
+ORDERINGS = {
+    'total': lambda entry: entry[1],
+    'max': lambda entry: entry[2],
+    'count': lambda entry: entry[0],
+    'mean': lambda entry: entry[1] / entry[0],
+}
+
+
+class Command(BaseCommand):
+    help = 'Показывает самые затратные SQL-запросы по отпечаткам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Сколько отпечатков показать.',
+        )
+        parser.add_argument(
+            '--order', choices=ORDERINGS, default='total',
+            help='Сортировка: суммарное, максимальное, среднее время '
+                 'или число запросов.',
+        )
+        parser.add_argument(
+            '--view', help='Только запросы указанного представления.',
+        )
+
+    def handle(self, *args, **options):
+        query_stats.flush()
+        stats = load_stats(settings.QUERYLOG_DIR)
+        rows = [
+            (view, sql, entry) for (view, sql), entry in stats.items()
+            if not options['view'] or view == options['view']
+        ]
+        order = ORDERINGS[options['order']]
+        rows.sort(key=lambda row: order(row[2]), reverse=True)
+        if not rows:
+            self.stdout.write('Статистика запросов пуста.')
+        for view, sql, (count, total, maximum) in rows[:options['limit']]:
+            self.stdout.write(
+                f'{view}: {count} раз, всего {total * 1000:.1f} мс, '
+                f'среднее {total / count * 1000:.2f} мс, '
+                f'максимум {maximum * 1000:.2f} мс\n    {sql}'
+            )
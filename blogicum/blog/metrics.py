@@ -0,0 +1,304 @@
+"""
+Метрики приложения в формате Prometheus.
+
+Каждый процесс (например, воркер gunicorn) пишет значения в свой файл
+METRICS_DIR/metrics_<pid>.db, отображённый в память через mmap, поэтому
+процессам не нужны блокировки друг между другом. Представление
+metrics_view читает файлы всех процессов, суммирует значения и отдаёт
+их текстом на /metrics.
+
+MetricsMiddleware собирает по каждому запросу длительность, число и
+время SQL-запросов, время рендеринга шаблонов и ошибки с разбивкой по
+view_name. Кеши сообщают о попаданиях через record_cache().
+"""
+import contextvars
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import Http404, HttpResponse
+
+HEADER_SIZE = 8
+INITIAL_FILE_SIZE = 64 * 1024
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0,
+    7.5, 10.0,
+)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    'blogicum_request_duration_seconds': (
+        'histogram', 'Время обработки запроса.'),
+    'blogicum_requests_total': ('counter', 'Число запросов.'),
+    'blogicum_request_errors_total': (
+        'counter', 'Число запросов, завершившихся ошибкой 5xx.'),
+    'blogicum_db_queries': ('histogram', 'Число SQL-запросов на запрос.'),
+    'blogicum_db_duration_seconds': (
+        'histogram', 'Время SQL-запросов за один запрос.'),
+    'blogicum_template_render_seconds': (
+        'histogram', 'Время рендеринга шаблонов за один запрос.'),
+    'blogicum_cache_requests_total': (
+        'counter', 'Обращения к кешам приложения по результату.'),
+}
+
+request_state = contextvars.ContextVar('metrics_request_state', default=None)
+
+
+class MmapValues:
+    """Словарь «ключ — число float64» в файле, отображённом в память.
+
+    Формат: 8 байт заголовка (занятый размер), затем записи
+    [длина ключа: int32][ключ, выровненный до 8 байт][значение: double].
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(INITIAL_FILE_SIZE)
+        self.capacity = os.fstat(self.file.fileno()).st_size
+        self.mapped = mmap.mmap(self.file.fileno(), self.capacity)
+        self.used = struct.unpack_from('i', self.mapped, 0)[0] or HEADER_SIZE
+        self.positions = {
+            key: position
+            for key, _, position in iterate_entries(self.mapped, self.used)
+        }
+
+    def add(self, key, amount):
+        position = self.positions.get(key)
+        if position is None:
+            position = self.create(key)
+        value = struct.unpack_from('d', self.mapped, position)[0]
+        struct.pack_into('d', self.mapped, position, value + amount)
+
+    def create(self, key):
+        encoded = key.encode('utf-8')
+        padding = 8 - (len(encoded) + 4) % 8
+        entry = struct.pack(
+            f'i{len(encoded)}s{padding}xd', len(encoded), encoded, 0.0
+        )
+        while self.used + len(entry) > self.capacity:
+            self.grow()
+        self.mapped[self.used:self.used + len(entry)] = entry
+        position = self.used + len(entry) - 8
+        self.used += len(entry)
+        # Заголовок обновляется последним: читатели не увидят
+        # недописанную запись.
+        struct.pack_into('i', self.mapped, 0, self.used)
+        self.positions[key] = position
+        return position
+
+    def grow(self):
+        self.capacity *= 2
+        self.mapped.close()
+        self.file.truncate(self.capacity)
+        self.mapped = mmap.mmap(self.file.fileno(), self.capacity)
+
+
+def iterate_entries(data, used):
+    """Перебирает записи файла метрик: (ключ, значение, смещение)."""
+    position = HEADER_SIZE
+    while position < used:
+        length = struct.unpack_from('i', data, position)[0]
+        key_start = position + 4
+        key = bytes(data[key_start:key_start + length]).decode('utf-8')
+        position = key_start + length + 8 - (length + 4) % 8
+        value = struct.unpack_from('d', data, position)[0]
+        yield key, value, position
+        position += 8
+
+
+def read_file(path):
+    data = Path(path).read_bytes()
+    if len(data) < HEADER_SIZE:
+        return
+    used = min(struct.unpack_from('i', data, 0)[0], len(data))
+    for key, value, _ in iterate_entries(data, used):
+        yield key, value
+
+
+class Registry:
+    """Запись метрик текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.values = None
+
+    def storage(self):
+        # После fork() у воркера свой pid и, значит, свой файл.
+        if self.pid != os.getpid():
+            directory = Path(settings.METRICS_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            self.pid = os.getpid()
+            self.values = MmapValues(directory / f'metrics_{self.pid}.db')
+        return self.values
+
+    def inc(self, name, labels, amount=1):
+        key = json.dumps([name, '', sorted(labels.items())])
+        with self.lock:
+            self.storage().add(key, amount)
+
+    def observe(self, name, labels, value, buckets=DURATION_BUCKETS):
+        label_items = sorted(labels.items())
+        with self.lock:
+            storage = self.storage()
+            for bound in (*buckets, '+Inf'):
+                if bound == '+Inf' or value <= bound:
+                    storage.add(json.dumps([
+                        name, '_bucket', label_items + [('le', str(bound))]
+                    ]), 1)
+            storage.add(json.dumps([name, '_sum', label_items]), value)
+            storage.add(json.dumps([name, '_count', label_items]), 1)
+
+
+registry = Registry()
+
+
+def record_cache(cache_name, hit):
+    """Учитывает попадание или промах кеша приложения."""
+    if settings.METRICS_ENABLED:
+        registry.inc('blogicum_cache_requests_total', {
+            'cache': cache_name, 'result': 'hit' if hit else 'miss',
+        })
+
+
+def collect(directory):
+    """Суммирует значения из файлов всех процессов."""
+    totals = defaultdict(float)
+    for path in Path(directory).glob('metrics_*.db'):
+        for key, value in read_file(path):
+            totals[key] += value
+    return totals
+
+
+def format_labels(labels):
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in labels
+    )
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+
+def series_order(item):
+    """Порядок строк: по меткам, затем бакеты по возрастанию, _sum, _count."""
+    suffix, labels, _ = item
+    bound = dict(labels).get('le')
+    other_labels = [label for label in labels if label[0] != 'le']
+    return (
+        other_labels,
+        ('_bucket', '_sum', '_count', '').index(suffix),
+        float(bound) if bound is not None else 0,
+    )
+
+
+def render_metrics(totals):
+    """Формирует текстовый формат экспозиции Prometheus."""
+    series = defaultdict(list)
+    for key, value in totals.items():
+        name, suffix, labels = json.loads(key)
+        series[name].append((suffix, labels, value))
+    lines = []
+    for name in sorted(series):
+        metric_type, description = METRICS.get(name, ('untyped', name))
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for suffix, labels, value in sorted(series[name], key=series_order):
+            lines.append(
+                f'{name}{suffix}{{{format_labels(labels)}}} {value!r}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Отдаёт метрики всех процессов."""
+    if not settings.METRICS_ENABLED:
+        raise Http404('Метрики отключены')
+    return HttpResponse(
+        render_metrics(collect(settings.METRICS_DIR)),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+class QueryTimer:
+    """Обёртка execute_wrapper, суммирующая число и время запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def instrument_templates():
+    """Подключает учёт времени рендеринга шаблонов Django."""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'metrics_instrumented', False):
+        return
+    original_render = Template.render
+
+    def render(self, *args, **kwargs):
+        state = request_state.get()
+        started = time.perf_counter()
+        try:
+            return original_render(self, *args, **kwargs)
+        finally:
+            if state is not None:
+                state['template'] += time.perf_counter() - started
+
+    render.metrics_instrumented = True
+    Template.render = render
+
+
+class MetricsMiddleware:
+    """Собирает метрики запросов с разбивкой по view_name."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        instrument_templates()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'template': 0.0}
+        token = request_state.set(state)
+        timer = QueryTimer()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            request_state.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        labels = {'view': match.view_name if match else 'unresolved'}
+        registry.observe('blogicum_request_duration_seconds', labels, duration)
+        registry.inc('blogicum_requests_total', {
+            **labels, 'status': f'{response.status_code // 100}xx',
+        })
+        if response.status_code >= 500:
+            registry.inc('blogicum_request_errors_total', labels)
+        registry.observe(
+            'blogicum_db_queries', labels, timer.count, QUERY_COUNT_BUCKETS
+        )
+        registry.observe('blogicum_db_duration_seconds', labels,
+                         timer.duration)
+        registry.observe('blogicum_template_render_seconds', labels,
+                         state['template'])
+        return response
@@ -0,0 +1,53 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:25
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+BACKFILL_BATCH_SIZE = 500
+EXCERPT_MAX_LENGTH = 256
+EXCERPT_WORDS = 10
+
+
+def backfill_rendered_text(apps, schema_editor):
+    """Заполняет анонс и HTML-версию текста пачками по первичному ключу."""
+    Post = apps.get_model('blog', 'Post')
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'text')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for post in batch:
+            post.excerpt = Truncator(
+                Truncator(post.text).words(EXCERPT_WORDS, truncate=' …')
+            ).chars(EXCERPT_MAX_LENGTH)
+            post.text_html = linebreaksbr(post.text, autoescape=True)
+        Post.objects.bulk_update(batch, ('excerpt', 'text_html'))
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_alter_category_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=256, verbose_name='Анонс'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(
+            backfill_rendered_text, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:36
+
+import blog.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=blog.models.UpdatedAtField(auto_now=True, db_index=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='updated_at',
+            field=blog.models.UpdatedAtField(auto_now=True, db_index=True, verbose_name='Изменено'),
+        ),
+    ]
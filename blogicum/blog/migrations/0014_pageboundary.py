@@ -0,0 +1,32 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_changelogentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageBoundary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed_key', models.CharField(max_length=64, verbose_name='Лента')),
+                ('rank', models.PositiveIntegerField(verbose_name='Номер границы')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации поста')),
+                ('post_id', models.BigIntegerField(verbose_name='ID поста')),
+            ],
+            options={
+                'verbose_name': 'граница страниц',
+                'verbose_name_plural': 'Границы страниц',
+                'ordering': ('feed_key', 'rank'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pageboundary',
+            constraint=models.UniqueConstraint(fields=('feed_key', 'rank'), name='unique_feed_rank'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.16 on 2026-10-19 11:07
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_pageboundary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvalidationMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sender', models.CharField(max_length=64, verbose_name='Процесс')),
+                ('keys', models.TextField(verbose_name='Ключи (JSON)')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'сообщение о сбросе кешей',
+                'verbose_name_plural': 'Сообщения о сбросе кешей',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -4,12 +4,51 @@ from django.shortcuts import get_object_or_404, redirect
 
 from .models import Post
 from .forms import PostForm
+from .paginators import KeysetPaginator
+from .queries import post_query_default
+
+
+def get_page_range(page_obj):
+    """Номера страниц вокруг текущей и по краям, с пропусками между ними."""
+    return list(page_obj.paginator.get_elided_page_range(
+        page_obj.number,
+        on_each_side=settings.PAGINATOR_ON_EACH_SIDE,
+        on_ends=settings.PAGINATOR_ON_ENDS,
+    ))
 
 
 class PaginatePostViewMixin:
-    """Базовый миксин для представлений модели Post."""
+    """Базовый миксин для представлений модели Post.
+
+    По умолчанию лента — все видимые посты (get_posts()); наследники
+    сужают её и задают get_feed_key() — ключ ленты для кеша числа постов.
+    """
 
     paginate_by = settings.POSTS_ON_PAGE
+    paginator_class = KeysetPaginator
+
+    def get_feed_key(self):
+        return None
+
+    def get_posts(self, **kwargs):
+        return post_query_default(filters=True, **kwargs)
+
+    def get_queryset(self):
+        return self.get_posts(annotate=True, fields='card')
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return self.paginator_class(
+            queryset,
+            per_page,
+            feed_key=self.get_feed_key(),
+            count_queryset=self.get_posts(),
+            **kwargs,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_range'] = get_page_range(context['page_obj'])
+        return context
 
 
 class CreatePostViewMixin(LoginRequiredMixin):
@@ -1,17 +1,201 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.dispatch import Signal
+from django.template.defaultfilters import linebreaksbr
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from .storage import post_images_storage
 
 TITLE_MAX_LENGTH = 256
 TITLE_MAX_LENGTH_VIEW = 20
+EXCERPT_WORDS = 10
 
 User = get_user_model()
 
+# Массовое изменение через QuerySet.update() или bulk_update(), которое
+# не вызывает post_save. Аргументы: pks — id изменённых объектов,
+# fields — имена изменённых полей.
+bulk_updated = Signal()
+
+# Массовое создание через bulk_create(), которое не вызывает post_save.
+# Аргумент objs — созданные объекты (pk заполнен, если СУБД его вернула).
+bulk_created = Signal()
+
+
+def bulk_create_sets_pk(connection):
+    """Заполняет ли BaseQuerySet.bulk_create id созданных объектов."""
+    return (
+        connection.features.can_return_rows_from_bulk_insert
+        or connection.vendor == 'sqlite'
+    )
+
 
-class BaseModel(models.Model):
+class UpdatedAtField(models.DateTimeField):
+    """Индексированное время последнего изменения объекта."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('auto_now', True)
+        kwargs.setdefault('db_index', True)
+        kwargs.setdefault('verbose_name', 'Изменено')
+        super().__init__(*args, **kwargs)
+
+
+class BaseQuerySet(models.QuerySet):
+    """QuerySet, обновляющий updated_at и журнал изменений при массовых
+    изменениях.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # Объекты без id (СУБД без RETURNING, ignore_conflicts) в журнал
+        # не попадают.
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            new = all(obj.pk is None for obj in objs)
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if new and not kwargs.get('ignore_conflicts'):
+                self.fill_sqlite_pks(objs)
+            ChangeLogEntry.record(
+                self.model,
+                [obj.pk for obj in objs if obj.pk is not None],
+                ChangeLogEntry.Action.CREATE,
+            )
+            bulk_created.send(sender=self.model, objs=objs)
+        return objs
+
+    bulk_create.alters_data = True
+
+    def fill_sqlite_pks(self, objs):
+        """Заполняет id объектов, только что вставленных в SQLite.
+
+        SQLite не возвращает id из bulk_create. Но запись блокирует всю
+        базу до конца транзакции, а AUTOINCREMENT выдаёт id больше всех
+        прежних, поэтому объекты получили id подряд, и последний из них —
+        last_insert_rowid().
+        """
+        connection = connections[self.db]
+        if (not objs or connection.vendor != 'sqlite'
+                or objs[0].pk is not None):
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT last_insert_rowid()')
+            last = cursor.fetchone()[0]
+        for pk, obj in enumerate(objs, start=last - len(objs) + 1):
+            obj.pk = pk
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', timezone.now())
+        with transaction.atomic(using=self.db, savepoint=False):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            ChangeLogEntry.record(
+                self.model, pks, ChangeLogEntry.Action.UPDATE
+            )
+            bulk_updated.send(sender=self.model, pks=pks, fields=set(kwargs))
+        return rows
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        with transaction.atomic(using=self.db, savepoint=False):
+            rows = super().bulk_update(
+                objs, {*fields, 'updated_at'}, batch_size=batch_size
+            )
+            pks = [obj.pk for obj in objs]
+            ChangeLogEntry.record(
+                self.model, pks, ChangeLogEntry.Action.UPDATE
+            )
+            bulk_updated.send(
+                sender=self.model, pks=pks, fields={*fields, 'updated_at'}
+            )
+        return rows
+
+    bulk_update.alters_data = True
+
+
+class PostQuerySet(BaseQuerySet):
+    """QuerySet публикаций: массовые изменения текста заполняют и анонс с
+    HTML-версией, как Post.save().
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.render_text()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        fields = set(fields)
+        if 'text' in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.render_text()
+            fields |= {'excerpt', 'text_html'}
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+    def update(self, **kwargs):
+        text = kwargs.get('text')
+        if text is None:
+            return super().update(**kwargs)
+        if not hasattr(text, 'resolve_expression'):
+            rendered = self.model(text=text)
+            rendered.render_text()
+            return super().update(
+                excerpt=rendered.excerpt, text_html=rendered.text_html,
+                **kwargs,
+            )
+        # Текст задан выражением: HTML строится по уже записанным строкам.
+        with transaction.atomic(using=self.db, savepoint=False):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            posts = list(
+                self.model._base_manager.using(self.db)
+                .filter(pk__in=pks).only('pk', 'text')
+            )
+            for post in posts:
+                post.render_text()
+            self.model._base_manager.using(self.db).bulk_update(
+                posts, ('excerpt', 'text_html')
+            )
+        return rows
+
+    update.alters_data = True
+
+
+class TrackedModel(models.Model):
+    """
+    Абстрактная модель, изменения которой попадают в журнал изменений.
+    Сохранение объекта и запись в журнал выполняются в одной транзакции.
+    """
+
+    updated_at = UpdatedAtField()
+
+    objects = BaseQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class BaseModel(TrackedModel):
     """
     Абстрактная модель. Добавляет каждому объекту:
       -флаг is_published
-      -время создания.
+      -время создания
+      -время последнего изменения.
     """
 
     is_published = models.BooleanField(
@@ -100,7 +284,26 @@ class Post(BaseModel):
         null=True,
         verbose_name='Категория',
     )
-    image = models.ImageField('Фото', upload_to='posts_images', blank=True)
+    image = models.ImageField(
+        'Фото',
+        upload_to='posts_images',
+        storage=post_images_storage,
+        blank=True,
+        db_index=True,
+    )
+    excerpt = models.CharField(
+        max_length=TITLE_MAX_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name='Анонс',
+    )
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Текст в HTML',
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'публикация'
@@ -111,8 +314,25 @@ class Post(BaseModel):
     def __str__(self) -> str:
         return self.title[:TITLE_MAX_LENGTH_VIEW]
 
+    def render_text(self):
+        """Заполняет анонс и HTML-версию текста по полю text."""
+        self.excerpt = Truncator(
+            Truncator(self.text).words(EXCERPT_WORDS, truncate=' …')
+        ).chars(TITLE_MAX_LENGTH)
+        self.text_html = linebreaksbr(self.text, autoescape=True)
 
-class Comment(models.Model):
+    def save(self, *args, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.render_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, 'excerpt', 'text_html'
+            }
+        super().save(*args, **kwargs)
+
+
+class Comment(TrackedModel):
     """Модель для пользовательских комментариев."""
 
     text = models.TextField(verbose_name='Текст')
@@ -139,3 +359,104 @@ class Comment(models.Model):
 
     def __str__(self) -> str:
         return self.text[:TITLE_MAX_LENGTH_VIEW]
+
+
+class ChangeLogEntry(models.Model):
+    """Запись журнала изменений: что и когда случилось с объектом.
+
+    Журнал только дополняется; номер записи служит курсором для
+    потребителей, читающих изменения порциями.
+    """
+
+    class Action(models.TextChoices):
+        CREATE = 'create', 'Создание'
+        UPDATE = 'update', 'Изменение'
+        DELETE = 'delete', 'Удаление'
+
+    model_label = models.CharField(max_length=64, verbose_name='Модель')
+    object_id = models.BigIntegerField(verbose_name='ID объекта')
+    action = models.CharField(
+        max_length=6,
+        choices=Action.choices,
+        verbose_name='Действие',
+    )
+    changed_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='Время изменения',
+    )
+
+    class Meta:
+        verbose_name = 'запись журнала изменений'
+        verbose_name_plural = 'Журнал изменений'
+        ordering = ('id',)
+        indexes = (
+            models.Index(
+                fields=('model_label', 'object_id', 'id'),
+                name='changelog_object_idx',
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.action} {self.model_label} #{self.object_id}'
+
+    @classmethod
+    def record(cls, model, pks, action):
+        """Добавляет в журнал записи об изменении объектов модели."""
+        now = timezone.now()
+        cls.objects.bulk_create(
+            cls(
+                model_label=model._meta.label,
+                object_id=pk,
+                action=action,
+                changed_at=now,
+            )
+            for pk in pks
+        )
+
+
+class PageBoundary(models.Model):
+    """Граница страниц ленты: каждый PAGE_BOUNDARY_STEP-й пост.
+
+    Номер rank отсчитывается от самого старого поста ленты, поэтому новые
+    публикации не сдвигают уже записанные границы.
+    """
+
+    feed_key = models.CharField(max_length=64, verbose_name='Лента')
+    rank = models.PositiveIntegerField(verbose_name='Номер границы')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации поста')
+    post_id = models.BigIntegerField(verbose_name='ID поста')
+
+    class Meta:
+        verbose_name = 'граница страниц'
+        verbose_name_plural = 'Границы страниц'
+        ordering = ('feed_key', 'rank')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('feed_key', 'rank'), name='unique_feed_rank'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.feed_key} #{self.rank}'
+
+
+class InvalidationMessage(models.Model):
+    """Пакет ключей кешей процессов, сброшенных одной транзакцией.
+
+    Таблица служит транспортом blog.invalidation.DatabaseTransport.
+    """
+
+    sender = models.CharField(max_length=64, verbose_name='Процесс')
+    keys = models.TextField(verbose_name='Ключи (JSON)')
+    created_at = models.DateTimeField(
+        default=timezone.now, db_index=True, verbose_name='Создано'
+    )
+
+    class Meta:
+        verbose_name = 'сообщение о сбросе кешей'
+        verbose_name_plural = 'Сообщения о сбросе кешей'
+        ordering = ('id',)
+
+    def __str__(self) -> str:
+        return f'{self.sender} #{self.id}'
@@ -0,0 +1,212 @@
+"""
+Пагинатор лент постов с кешированным числом записей.
+
+Число постов ленты ('index', 'category:<id>', 'author:<id>' и
+'author:<id>:all' для автора, смотрящего свой профиль) хранится в кеше
+FEED_COUNT_TIMEOUT секунд и сбрасывается сигналами при изменении постов и
+категорий, в том числе при bulk_create. Сбрасывать можно и группы лент:
+'author:*' — ленты всех авторов, '*' — все ленты; так делают изменения
+категорий и массовые update() полей, влияющих на состав лент, вместе с
+индексом границ страниц этих лент.
+
+Ключ в кеше включает версии ленты и её групп в шине blog.invalidation,
+поэтому сброс доходит и до процессов, у которых кеш Django свой
+(LocMemCache).
+
+Для главной ленты перед точным COUNT(*) запрашивается оценка СУБД: план
+запроса в PostgreSQL или статистика sqlite_stat1 в SQLite (после
+ANALYZE). Если оценка не меньше FEED_COUNT_ESTIMATE_FROM, она и
+используется, а пагинатор помечается как приблизительный. Ленты
+категорий и авторов всегда считаются точно: статистика знает только
+среднее число строк на значение, и для маленькой категории в большой
+таблице оценка дала бы тысячи пустых страниц.
+
+Рядом хранится версия ленты для RSS и API (cached_feed_version), она
+сбрасывается вместе с числом постов.
+
+KeysetPaginator дополнительно считает посты по индексу границ страниц
+(см. boundaries) и по нему же переходит на дальние страницы.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, transaction
+from django.utils.functional import cached_property
+
+from .boundaries import count_by_boundaries, get_boundary, older_than
+from .invalidation import bus
+from .metrics import record_cache
+from .queries import post_feed_version
+
+
+ALL_FEEDS = '*'
+ALL_AUTHOR_FEEDS = 'author:*'
+
+
+def feed_bus_key(feed_key):
+    return f'feed:{feed_key}'
+
+
+def feed_groups(feed_key):
+    """Ключи шины ленты и групп, в которые она входит."""
+    groups = [feed_key, ALL_FEEDS]
+    if feed_key.startswith('author:'):
+        groups.append(ALL_AUTHOR_FEEDS)
+    return [feed_bus_key(group) for group in groups]
+
+
+def feed_cache_version(feed_key):
+    versions = [bus.version(key) for key in feed_groups(feed_key)]
+    epoch = versions[0][0]
+    return ':'.join([str(epoch), *(str(version) for _, version in versions)])
+
+
+def feed_count_key(feed_key):
+    return f'feed-count:{feed_key}:{feed_cache_version(feed_key)}'
+
+
+def post_feed_keys(category_id, author_id):
+    """Ленты, в которые входит пост с такими категорией и автором."""
+    keys = ['index', f'author:{author_id}', f'author:{author_id}:all']
+    if category_id is not None:
+        keys.append(f'category:{category_id}')
+    return keys
+
+
+def feed_version_key(feed_key):
+    return f'feed-version:{feed_key}:{feed_cache_version(feed_key)}'
+
+
+def cached_feed_version(feed_key, queryset):
+    """post_feed_version() ленты из кеша: опрос RSS и API не считает
+    агрегаты по всей ленте каждый раз.
+    """
+    key = feed_version_key(feed_key)
+    version = cache.get(key)
+    record_cache('feed_versions', version is not None)
+    if version is None:
+        version = post_feed_version(queryset)
+        cache.set(key, version, settings.FEED_VERSION_TIMEOUT)
+    return version
+
+
+def invalidate_feed_counts(feed_keys):
+    """Сбрасывает число постов и версии лент сразу и ещё раз после
+    фиксации; другие процессы узнают о сбросе через шину.
+
+    Группы лент ('author:*', '*') сбрасываются только через шину: их
+    кеши меняют ключ после фиксации.
+    """
+    feed_keys = list(feed_keys)
+    cache_keys = [
+        key_function(feed_key) for feed_key in feed_keys
+        if not feed_key.endswith('*')
+        for key_function in (feed_count_key, feed_version_key)
+    ]
+    cache.delete_many(cache_keys)
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+    bus.invalidate(*(feed_bus_key(feed_key) for feed_key in feed_keys))
+
+
+def sqlite_estimate(queryset):
+    """Число строк таблицы по sqlite_stat1 или None без статистики."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                [table],
+            )
+        except DatabaseError:
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return int(row[0].split()[0])
+
+
+def estimate_count(queryset, feed_key):
+    """Оценка числа строк главной ленты от СУБД или None."""
+    if feed_key != 'index':
+        return None
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    if vendor == 'sqlite':
+        return sqlite_estimate(queryset)
+    return None
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор с числом записей из кеша или из оценки СУБД.
+
+    count_queryset — те же строки без аннотаций и сортировки, по нему
+    считается число записей.
+    """
+
+    def __init__(self, object_list, per_page, feed_key=None,
+                 count_queryset=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed_key = feed_key
+        self.count_queryset = (
+            object_list if count_queryset is None else count_queryset
+        )
+        self.approximate = False
+
+    def count_rows(self):
+        estimate = estimate_count(self.count_queryset, self.feed_key)
+        if (estimate is not None
+                and estimate >= settings.FEED_COUNT_ESTIMATE_FROM):
+            return estimate, True
+        return self.count_queryset.count(), False
+
+    @cached_property
+    def count(self):
+        if self.feed_key is None:
+            return self.count_queryset.count()
+        key = feed_count_key(self.feed_key)
+        cached = cache.get(key)
+        record_cache('feed_counts', cached is not None)
+        if cached is None:
+            cached = self.count_rows()
+            cache.set(key, cached, settings.FEED_COUNT_TIMEOUT)
+        count, self.approximate = cached
+        return count
+
+
+class KeysetPaginator(CachedCountPaginator):
+    """Пагинатор, переходящий на дальние страницы по индексу границ.
+
+    object_list должен быть упорядочен по ('-pub_date', '-id'). Страницы
+    ближе PAGE_SEEK_FROM постов к началу ленты выбираются обычным OFFSET,
+    остальные — от ближайшей границы со смещением меньше шага индекса.
+    """
+
+    def count_rows(self):
+        count = count_by_boundaries(self.feed_key, self.count_queryset)
+        if count is not None:
+            return count, False
+        return super().count_rows()
+
+    def page(self, number):
+        number = self.validate_number(number)
+        offset = (number - 1) * self.per_page
+        if (self.feed_key is None or self.approximate
+                or offset < settings.PAGE_SEEK_FROM):
+            return super().page(number)
+        step = settings.PAGE_BOUNDARY_STEP
+        # Позиция первого поста страницы, считая от самого старого.
+        top = self.count - 1 - offset
+        rank = top // step + 1
+        boundary = get_boundary(self.feed_key, self.count_queryset, rank)
+        if boundary is None:
+            return super().page(number)
+        skip = rank * step - 1 - top
+        posts = self.object_list.filter(
+            older_than(boundary.pub_date, boundary.post_id, inclusive=True)
+        )[skip:skip + self.per_page]
+        return self._get_page(posts, number, self)
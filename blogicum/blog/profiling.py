@@ -0,0 +1,140 @@
+"""
+Выборочное профилирование запросов к представлениям blog.
+
+ProfilingMiddleware профилирует долю запросов PROFILING_SAMPLE_RATE:
+отдельный поток с интервалом PROFILING_INTERVAL снимает стек потока,
+обрабатывающего запрос, а обёртка курсора записывает время SQL-запросов.
+Результат сохраняется JSON-файлом в PROFILING_DIR, где хранится не
+больше PROFILING_MAX_FILES последних файлов. Команда profile_flamegraph
+собирает их в файлы свёрнутых стеков для построения flame graph.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+PROFILED_NAMESPACE = 'blog'
+
+
+def frame_stack(frame):
+    """Сворачивает стек в строку вида 'модуль:функция;...' от корня."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', code.co_filename)
+        names.append(f'{module}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    """Поток, периодически снимающий стек указанного потока."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name='profiling-sampler')
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[frame_stack(frame)] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.samples
+
+
+class QueryTimer:
+    """Обёртка execute_wrapper, записывающая время каждого запроса."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'duration': time.perf_counter() - started,
+            })
+
+
+class ProfilingMiddleware:
+    """Профилирует случайную долю запросов к представлениям blog."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = Path(settings.PROFILING_DIR)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        sampler = StackSampler(
+            threading.get_ident(), settings.PROFILING_INTERVAL
+        )
+        timer = QueryTimer()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        finally:
+            samples = sampler.stop()
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        if match is not None and match.namespace == PROFILED_NAMESPACE:
+            self.save(match.view_name, request, response, duration,
+                      timer.queries, samples)
+        return response
+
+    def save(self, view_name, request, response, duration, queries, samples):
+        profile = {
+            'view': view_name,
+            'path': request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'duration': duration,
+            'interval': settings.PROFILING_INTERVAL,
+            'sql': queries,
+            'samples': samples,
+        }
+        name = f'{time.time():.6f}-{os.getpid()}-{view_name}.json'
+        (self.directory / name.replace(':', '_')).write_text(
+            json.dumps(profile), encoding='utf-8'
+        )
+        self.rotate()
+
+    def rotate(self):
+        """Удаляет самые старые профили сверх PROFILING_MAX_FILES."""
+        files = sorted(self.directory.glob('*.json'))
+        for path in files[:-settings.PROFILING_MAX_FILES]:
+            path.unlink(missing_ok=True)
+
+
+def load_profiles(directory):
+    """Читает сохранённые профили, пропуская повреждённые файлы."""
+    for path in sorted(Path(directory).glob('*.json')):
+        try:
+            yield json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
@@ -1,25 +1,228 @@
-from django.db.models import Count
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch, Q
 from django.utils import timezone
 
-from .models import Post
+from .models import Category, Comment, Location, Post
+from .versioned import VersionedCache
 
+# Модели, изменения которых отдаёт changes_since().
+TRACKED_MODELS = (Category, Location, Post, Comment)
 
-def post_query_default(manager=Post.objects, filters=False, annotate=False):
-    """Функция собирающая основной запрос для модели пост."""
+# Наборы полей, которые реально используются в шаблонах и выгрузках.
+# Остальные столбцы (полный текст, данные пользователя, описание
+# категории) при выборке откладываются.
+FIELD_PROFILES = {
+    'card': (
+        'title',
+        'excerpt',
+        'pub_date',
+        'is_published',
+        'image',
+        'author__username',
+        'location__name',
+        'location__is_published',
+        'category__title',
+        'category__slug',
+        'category__is_published',
+    ),
+    'detail': (
+        'title',
+        'text_html',
+        'pub_date',
+        'is_published',
+        'image',
+        'author__username',
+        'location__name',
+        'location__is_published',
+        'category__title',
+        'category__slug',
+        'category__is_published',
+    ),
+    'feed': (
+        'title',
+        'text_html',
+        'pub_date',
+        'updated_at',
+        'author__username',
+        'location__name',
+        'category__title',
+    ),
+    'export': (
+        'id',
+        'title',
+        'text',
+        'pub_date',
+        'created_at',
+        'image',
+        'author__username',
+        'location__name',
+        'category__title',
+        'category__slug',
+    ),
+}
+
+
+def load_published_category_ids():
+    return frozenset(
+        Category.objects.filter(is_published=True)
+        .values_list('pk', flat=True)
+    )
+
+
+# id опубликованных категорий; сбрасывается сигналами при изменении
+# категорий.
+published_categories = VersionedCache(
+    'published_categories', load_published_category_ids
+)
+
+
+def post_published_filter():
+    """Условие «пост опубликован»: сам пост, его дата и категория.
+
+    Категория проверяется по закешированному списку id, без соединения с
+    таблицей категорий. Пустой список Django не переводит в SQL (нужный,
+    например, для explain()), поэтому при пустом и при слишком длинном
+    списке проверка делается соединением.
+    """
+    category_ids = published_categories.get()
+    if not 0 < len(category_ids) <= settings.PUBLISHED_CATEGORIES_IN_LIMIT:
+        category = Q(category__is_published=True)
+    else:
+        category = Q(category_id__in=category_ids)
+    return Q(pub_date__lte=timezone.now(), is_published=True) & category
+
+
+def post_query_default(
+    manager=Post.objects, filters=False, annotate=False, fields=None
+):
+    """Функция собирающая основной запрос для модели пост.
+
+    Параметр fields принимает имя набора полей из FIELD_PROFILES.
+    """
     queryset = manager.select_related(
         'author', 'location', 'category'
     )
 
+    if fields is not None:
+        queryset = queryset.only(*FIELD_PROFILES[fields])
+
     if filters:
-        queryset = queryset.filter(
-            pub_date__lte=timezone.now(),
-            is_published=True,
-            category__is_published=True,
-        )
+        queryset = queryset.filter(post_published_filter())
 
     if annotate:
         queryset = queryset.annotate(
             comment_count=Count('comments')
-        ).order_by('-pub_date')
+        ).order_by('-pub_date', '-id')
 
     return queryset
+
+
+def feed_posts(feed_key):
+    """Посты ленты по её ключу, без аннотаций.
+
+    Ключи: 'index', 'category:<id>', 'author:<id>' и 'author:<id>:all' —
+    все посты автора, включая неопубликованные.
+    """
+    kind, _, rest = feed_key.partition(':')
+    if kind == 'index':
+        return post_query_default(filters=True)
+    if kind == 'category':
+        return post_query_default(filters=True).filter(category_id=int(rest))
+    if kind == 'author':
+        author_id, _, scope = rest.partition(':')
+        return post_query_default(filters=scope != 'all').filter(
+            author_id=int(author_id)
+        )
+    raise ValueError(f'Неизвестная лента: {feed_key}')
+
+
+def post_visibility_filter(user):
+    """Условие видимости поста: опубликован или принадлежит пользователю."""
+    visible = post_published_filter()
+    if user.is_authenticated:
+        visible |= Q(author_id=user.pk)
+    return visible
+
+
+def post_detail_query(user):
+    """Видимый пользователю пост вместе с автором, категорией и локацией
+    одним запросом; комментарии с авторами подгружаются вторым.
+    """
+    comments = Comment.objects.select_related('author').only(
+        'text', 'created_at', 'post_id', 'author__username'
+    )
+    return (
+        post_query_default(fields='detail')
+        .filter(post_visibility_filter(user))
+        .prefetch_related(Prefetch('comments', queryset=comments))
+    )
+
+
+def post_feed_version(queryset):
+    """Версия набора постов: меняется при изменении любого из них.
+
+    Снятие поста с публикации или наступление отложенной даты меняют
+    число постов и время последней публикации.
+    """
+    return queryset.aggregate(
+        total=Count('id'),
+        published=Max('pub_date'),
+        updated=Max('updated_at'),
+        category_updated=Max('category__updated_at'),
+    )
+
+
+def post_detail_version(user, post_id):
+    """Время изменения поста, его категории, локации и комментариев.
+
+    Один запрос по индексам, без загрузки самого поста; для скрытого от
+    пользователя поста возвращает None.
+    """
+    return (
+        Post.objects.filter(post_visibility_filter(user), pk=post_id)
+        .annotate(
+            last_comment_at=Max('comments__updated_at'),
+            comment_total=Count('comments'),
+        )
+        .values(
+            'updated_at',
+            'category__updated_at',
+            'location__updated_at',
+            'last_comment_at',
+            'comment_total',
+        )
+        .first()
+    )
+
+
+def changed_since(model, since, until=None, after_pk=None):
+    """Объекты модели, изменённые после курсора (since, after_pk).
+
+    Порядок (updated_at, pk) позволяет выгружать изменения порциями:
+    следующая порция запрашивается с updated_at и pk последнего
+    полученного объекта. Без after_pk возвращаются объекты строго новее
+    since. pk нужен, потому что QuerySet.update() даёт всем изменённым
+    строкам одно и то же updated_at.
+    """
+    queryset = model.objects.all()
+    if since is not None:
+        condition = Q(updated_at__gt=since)
+        if after_pk is not None:
+            condition |= Q(updated_at=since, pk__gt=after_pk)
+        queryset = queryset.filter(condition)
+    if until is not None:
+        queryset = queryset.filter(updated_at__lte=until)
+    return queryset.order_by('updated_at', 'pk')
+
+
+def changes_since(since, until=None):
+    """Изменения всех отслеживаемых моделей: {метка модели: queryset}.
+
+    Верхняя граница until по умолчанию фиксируется в момент вызова, чтобы
+    все выборки относились к одному и тому же срезу.
+    """
+    until = until or timezone.now()
+    return {
+        model._meta.label: changed_since(model, since, until)
+        for model in TRACKED_MODELS
+    }
@@ -0,0 +1,147 @@
+"""
+Журнал SQL-запросов с нормализованными отпечатками.
+
+QueryLogMiddleware через connection.execute_wrapper замеряет каждый
+запрос и сводит его к отпечатку: литералы и параметры заменяются на ?,
+списки IN (...) схлопываются. В памяти процесса по паре «представление —
+отпечаток» копятся число, суммарное и максимальное время; раз в
+QUERYLOG_FLUSH_INTERVAL секунд статистика сбрасывается в
+QUERYLOG_DIR/querylog_<pid>.json. Запросы дольше
+QUERYLOG_SLOW_THRESHOLD дополнительно пишутся в лог blog.querylog.
+Команда slow_queries показывает самые затратные отпечатки.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_RULES = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE), 'IN (...)'),
+    (re.compile(r'\bLIMIT\s+\?(?:\s+OFFSET\s+\?)?', re.IGNORECASE), 'LIMIT ?'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Приводит SQL к виду без литералов, общему для однотипных запросов."""
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryStats:
+    """Статистика отпечатков текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.flushed_at = time.monotonic()
+
+    def add(self, view_name, queries):
+        with self.lock:
+            for sql, duration in queries:
+                key = (view_name, fingerprint(sql))
+                entry = self.entries.get(key)
+                if entry is None:
+                    self.entries[key] = [1, duration, duration]
+                else:
+                    entry[0] += 1
+                    entry[1] += duration
+                    entry[2] = max(entry[2], duration)
+
+    def flush_if_due(self):
+        if (time.monotonic() - self.flushed_at
+                >= settings.QUERYLOG_FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Сохраняет накопленную статистику процесса в файл."""
+        with self.lock:
+            self.flushed_at = time.monotonic()
+            rows = [
+                [view, sql, *entry]
+                for (view, sql), entry in self.entries.items()
+            ]
+        if not rows:
+            return
+        directory = Path(settings.QUERYLOG_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'querylog_{os.getpid()}.json'
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(rows), encoding='utf-8')
+        temporary.replace(path)
+
+
+query_stats = QueryStats()
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper, запоминающая SQL и время запросов."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+
+class QueryLogMiddleware:
+    """Собирает статистику SQL-запросов по представлениям."""
+
+    def __init__(self, get_response):
+        if not settings.QUERYLOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        atexit.register(query_stats.flush)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        query_stats.add(view_name, recorder.queries)
+        for sql, duration in recorder.queries:
+            if duration >= settings.QUERYLOG_SLOW_THRESHOLD:
+                logger.warning(
+                    'Медленный запрос %.3f с в %s: %s',
+                    duration, view_name, fingerprint(sql),
+                )
+        query_stats.flush_if_due()
+        return response
+
+
+def load_stats(directory):
+    """Объединяет статистику, сохранённую всеми процессами."""
+    merged = {}
+    for path in Path(directory).glob('querylog_*.json'):
+        try:
+            rows = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        for view, sql, count, total, maximum in rows:
+            entry = merged.setdefault((view, sql), [0, 0.0, 0.0])
+            entry[0] += count
+            entry[1] += total
+            entry[2] = max(entry[2], maximum)
+    return merged
@@ -0,0 +1,304 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .boundaries import invalidate_boundaries
+from .choices import category_choices, location_choices
+from .comments import forget_post, remember_post
+from .invalidation import bus, object_key
+from .models import (
+    Category, ChangeLogEntry, Location, PageBoundary, Post, User,
+    bulk_created, bulk_updated,
+)
+from .paginators import (
+    ALL_AUTHOR_FEEDS, ALL_FEEDS, invalidate_feed_counts, post_feed_keys,
+)
+from .queries import TRACKED_MODELS, published_categories
+from .uploads import schedule_reencoding
+
+
+def release_image(name):
+    """Удаляет файл картинки, если на него больше не ссылается ни один пост.
+
+    Проверка выполняется после фиксации транзакции, чтобы не удалить
+    файл, который ещё может понадобиться при её откате.
+    """
+    if not name:
+        return
+
+    def delete_if_orphaned():
+        Post.image.field.storage.delete_unreferenced(
+            name, Post.objects.filter(image=name).exists
+        )
+
+    transaction.on_commit(delete_if_orphaned)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    previous = None
+    if not raw and instance.pk is not None:
+        previous = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list(
+                'image', 'category_id', 'author_id', 'pub_date',
+                'is_published',
+            )
+            .first()
+        )
+    instance._previous_image = previous[0] if previous else None
+    instance._previous_feeds = (
+        post_feed_keys(*previous[1:3]) if previous else []
+    )
+    instance._previous_position = previous[1:] if previous else None
+
+
+@receiver(pre_save, sender=Post)
+def render_raw_post_text(sender, instance, raw=False, **kwargs):
+    # loaddata сохраняет объекты в обход Post.save().
+    if raw:
+        instance.render_text()
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if not raw and previous and previous != instance.image.name:
+        release_image(previous)
+
+
+@receiver(post_save, sender=Post)
+def reencode_new_image(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_image', None)
+    if not raw and instance.image and previous != instance.image.name:
+        schedule_reencoding(instance)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def cache_created_post(sender, instance, created, **kwargs):
+    if created:
+        post_id = instance.pk
+        transaction.on_commit(lambda: remember_post(post_id))
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post(sender, instance, **kwargs):
+    # Повторно после фиксации: до неё параллельный запрос мог снова
+    # закешировать ещё не удалённый пост.
+    post_id = instance.pk
+    forget_post(post_id)
+    transaction.on_commit(lambda: forget_post(post_id))
+
+
+def log_saved_object(sender, instance, created, **kwargs):
+    action = (
+        ChangeLogEntry.Action.CREATE if created
+        else ChangeLogEntry.Action.UPDATE
+    )
+    ChangeLogEntry.record(sender, [instance.pk], action)
+
+
+def log_deleted_object(sender, instance, **kwargs):
+    ChangeLogEntry.record(
+        sender, [instance.pk], ChangeLogEntry.Action.DELETE
+    )
+
+
+def fill_raw_updated_at(sender, instance, raw=False, **kwargs):
+    # loaddata сохраняет объекты в обход pre_save() полей, и auto_now не
+    # срабатывает, а фикстуры, выгруженные до появления поля, его не знают.
+    if raw and instance.updated_at is None:
+        instance.updated_at = (
+            getattr(instance, 'created_at', None) or timezone.now()
+        )
+
+
+def broadcast_changed_object(sender, instance, **kwargs):
+    bus.invalidate(object_key(sender, instance.pk))
+
+
+def broadcast_bulk_updated(sender, pks, **kwargs):
+    bus.invalidate(*(object_key(sender, pk) for pk in pks))
+
+
+def broadcast_bulk_created(sender, objs, **kwargs):
+    bus.invalidate(*(
+        object_key(sender, obj.pk) for obj in objs if obj.pk is not None
+    ))
+
+
+for tracked_model in TRACKED_MODELS:
+    pre_save.connect(fill_raw_updated_at, sender=tracked_model)
+    post_save.connect(log_saved_object, sender=tracked_model)
+    post_delete.connect(log_deleted_object, sender=tracked_model)
+    post_save.connect(broadcast_changed_object, sender=tracked_model)
+    post_delete.connect(broadcast_changed_object, sender=tracked_model)
+    bulk_updated.connect(broadcast_bulk_updated, sender=tracked_model)
+    bulk_created.connect(broadcast_bulk_created, sender=tracked_model)
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Location)
+def log_detached_posts(sender, instance, **kwargs):
+    """Посты теряют ссылку через SET_NULL в обход сигналов и BaseQuerySet,
+    поэтому их изменение записывается и рассылается до удаления.
+    """
+    post_ids = list(instance.posts.values_list('pk', flat=True))
+    ChangeLogEntry.record(Post, post_ids, ChangeLogEntry.Action.UPDATE)
+    bus.invalidate(*(object_key(Post, pk) for pk in post_ids))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feed_counts(sender, instance, **kwargs):
+    invalidate_feed_counts({
+        *getattr(instance, '_previous_feeds', ()),
+        *post_feed_keys(instance.category_id, instance.author_id),
+    })
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_username(sender, instance, raw=False,
+                               update_fields=None, **kwargs):
+    instance._previous_username = None
+    if raw or instance.pk is None or (
+        update_fields is not None and 'username' not in update_fields
+    ):
+        return
+    instance._previous_username = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('username', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_renamed_author_content(sender, instance, **kwargs):
+    """Имя автора выводится на страницах его постов и комментариев:
+    после переименования они считаются изменёнными, и ETag, журнал и
+    кеши, зависящие от updated_at, это видят.
+    """
+    previous = getattr(instance, '_previous_username', None)
+    if previous is None or previous == instance.username:
+        return
+    instance.posts.update()
+    instance.comments.update()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_feed_counts(sender, instance, **kwargs):
+    # Публикация категории меняет и главную ленту, и ленты авторов.
+    invalidate_feed_counts(
+        ['index', f'category:{instance.pk}', ALL_AUTHOR_FEEDS]
+    )
+
+
+# Поля, изменение которых сдвигает пост внутри лент.
+POSITION_FIELDS = {
+    'category', 'category_id', 'author', 'author_id', 'pub_date',
+    'is_published',
+}
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_boundaries(sender, instance, created, raw=False,
+                                     **kwargs):
+    previous = getattr(instance, '_previous_position', None)
+    current = (
+        instance.category_id, instance.author_id, instance.pub_date,
+        instance.is_published,
+    )
+    if raw or previous == current:
+        return
+    # Новый пост со свежей датой встаёт в начало ленты и под условие
+    # удаления не попадает.
+    keys = [(instance.pub_date, instance.pk)]
+    if previous is not None:
+        keys.append((previous[2], instance.pk))
+    invalidate_boundaries(
+        {
+            *getattr(instance, '_previous_feeds', ()),
+            *post_feed_keys(instance.category_id, instance.author_id),
+        },
+        *min(keys),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_boundaries(sender, instance, **kwargs):
+    invalidate_boundaries(
+        post_feed_keys(instance.category_id, instance.author_id),
+        instance.pub_date,
+        instance.pk,
+    )
+
+
+@receiver(bulk_created, sender=Post)
+def invalidate_bulk_created_feeds(sender, objs, **kwargs):
+    if not objs:
+        return
+    feed_keys = {
+        feed_key for post in objs
+        for feed_key in post_feed_keys(post.category_id, post.author_id)
+    }
+    invalidate_feed_counts(feed_keys)
+    # Без RETURNING у постов нет id: граница сбрасывается с начала даты.
+    invalidate_boundaries(
+        feed_keys, *min((post.pub_date, post.pk or 0) for post in objs)
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_boundaries(sender, instance, **kwargs):
+    # Категория меняет состав главной ленты и лент всех авторов.
+    PageBoundary.objects.filter(
+        Q(feed_key__in=['index', f'category:{instance.pk}'])
+        | Q(feed_key__startswith='author:')
+    ).delete()
+
+
+@receiver(bulk_updated, sender=Post)
+@receiver(bulk_updated, sender=Category)
+def invalidate_bulk_updated_boundaries(sender, pks, fields, **kwargs):
+    """Массовое изменение может сдвинуть посты любой ленты: индекс
+    сбрасывается целиком и достраивается при следующих переходах.
+    """
+    if fields & POSITION_FIELDS:
+        PageBoundary.objects.all().delete()
+        invalidate_feed_counts([ALL_FEEDS])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_published_categories(sender, instance, **kwargs):
+    published_categories.invalidate()
+
+
+@receiver(bulk_updated, sender=Category)
+def invalidate_bulk_published_categories(sender, pks, fields, **kwargs):
+    if 'is_published' in fields:
+        published_categories.invalidate()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(bulk_updated, sender=Category)
+def invalidate_category_choices(sender, **kwargs):
+    category_choices.invalidate()
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(bulk_updated, sender=Location)
+def invalidate_location_choices(sender, **kwargs):
+    location_choices.invalidate()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+HASH_CHUNK_SIZE = 64 * 1024
+LOCK_NAME = '.content.lock'
+CONTENT_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def content_digest(content):
+    """Считает sha256 файла по кускам, не читая его в память целиком."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла определяется его содержимым.
+
+    Файл сохраняется как <каталог>/<2 символа хеша>/<sha256>.<расширение>,
+    поэтому повторная загрузка той же картинки не создаёт новую копию.
+    Ссылки на файл считаются по записям Post.image, удаление неиспользуемых
+    файлов — в blog.signals.
+
+    Повторная загрузка не пишет файл, а очистка в другом запросе может
+    удалить его до фиксации поста со ссылкой. Поэтому после фиксации
+    файл проверяется и при необходимости записывается заново; проверка и
+    удаление выполняются под общей блокировкой lock().
+    """
+
+    thread_lock = threading.Lock()
+
+    def content_name(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = content_digest(content)
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            transaction.on_commit(lambda: self.restore(name, content))
+            return name.replace('\\', '/')
+        return super().save(name, content, max_length=max_length)
+
+    @contextmanager
+    def lock(self):
+        """Блокировка, общая для процессов узла и потоков процесса."""
+        with self.thread_lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.location, exist_ok=True)
+            with open(os.path.join(self.location, LOCK_NAME), 'a') as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def restore(self, name, content):
+        """Записывает файл заново, если его успела удалить очистка."""
+        with self.lock():
+            if not self.exists(name):
+                super().save(name, content)
+
+    def delete_unreferenced(self, name, is_referenced):
+        """Удаляет файл, если is_referenced() под блокировкой ложно."""
+        with self.lock():
+            if not is_referenced():
+                self.delete(name)
+
+    @staticmethod
+    def is_content_name(name):
+        """Проверяет, что файл уже хранится под именем-хешем."""
+        return bool(CONTENT_NAME_RE.search(name))
+
+
+post_images_storage = ContentAddressedStorage()
@@ -0,0 +1,28 @@
+"""
+Кешируемый вывод пустых форм.
+
+{% cached_bootstrap_form form %} выводит то же, что
+{% bootstrap_form form %}, но HTML несвязанной формы без начальных данных
+строится один раз на процесс для каждого класса формы и языка. Тег
+<form>, адрес отправки и CSRF-токен остаются в шаблоне и выводятся при
+каждом запросе.
+"""
+from django import template
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+from django_bootstrap5.forms import render_form
+
+register = template.Library()
+
+rendered_forms = {}
+
+
+@register.simple_tag
+def cached_bootstrap_form(form):
+    if form.is_bound or form.initial:
+        return render_form(form)
+    key = (type(form), form.prefix, get_language())
+    html = rendered_forms.get(key)
+    if html is None:
+        html = rendered_forms[key] = mark_safe(render_form(form))
+    return html
@@ -0,0 +1,184 @@
+"""
+Потоковая обработка загружаемых картинок постов.
+
+PostImageUploadHandler стоит первым в FILE_UPLOAD_HANDLERS и проверяет
+файл прямо во время чтения тела запроса: сигнатуру формата по первому
+куску и размер по мере поступления данных. Отклонённый файл дальше не
+буферизуется, а форма получает вместо него RejectedUpload с текстом
+ошибки.
+
+PostImageField проверяет картинку только по заголовку, без полного
+декодирования. Удаление метаданных и перекодирование выполняются после
+сохранения поста в фоновом потоке.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django import forms
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import close_old_connections, connection, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIGNATURES = {
+    b'\xff\xd8\xff': 'JPEG',
+    b'\x89PNG\r\n\x1a\n': 'PNG',
+    b'GIF87a': 'GIF',
+    b'GIF89a': 'GIF',
+}
+ALLOWED_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# Метаданные, ради удаления которых картинку стоит перекодировать.
+STRIPPED_INFO_KEYS = ('exif', 'xmp', 'comment', 'photoshop')
+EXIF_ORIENTATION = 0x0112
+
+reencode_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix='post-image'
+)
+
+
+def sniff_format(header):
+    """Определяет формат картинки по первым байтам файла."""
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+class RejectedUpload(UploadedFile):
+    """Пустой файл-заглушка для загрузки, отклонённой при чтении."""
+
+    def __init__(self, name, error):
+        super().__init__(BytesIO(), name=name, size=0)
+        self.upload_error = error
+
+
+class PostImageUploadHandler(FileUploadHandler):
+    """Проверяет размер и формат картинки во время загрузки."""
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name in settings.POST_IMAGE_UPLOAD_FIELDS
+        self.received = 0
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+        if self.error:
+            return None
+        if start == 0 and sniff_format(raw_data[:16]) is None:
+            self.error = (
+                'Загрузите правильное изображение. Файл, который вы '
+                'загрузили, поврежден или не является изображением.'
+            )
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            self.error = (
+                'Размер файла не должен превышать '
+                f'{settings.POST_IMAGE_MAX_SIZE // (1024 * 1024)} МБ.'
+            )
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.active and self.error:
+            return RejectedUpload(self.file_name, self.error)
+        return None
+
+
+class PostImageField(forms.ImageField):
+    """Поле картинки, которое не декодирует файл целиком."""
+
+    def to_python(self, data):
+        error = getattr(data, 'upload_error', None)
+        if error:
+            raise forms.ValidationError(error, code='invalid_image')
+        file = forms.FileField.to_python(self, data)
+        if file is None:
+            return None
+        try:
+            # Image.open читает только заголовок, пиксели не декодируются.
+            image = Image.open(file)
+            image_format = image.format
+            width, height = image.size
+        except Exception as exc:
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image'
+            ) from exc
+        if (image_format not in ALLOWED_FORMATS
+                or width * height > Image.MAX_IMAGE_PIXELS):
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image'
+            )
+        file.image = image
+        file.content_type = Image.MIME.get(image_format)
+        if hasattr(file, 'seek') and callable(file.seek):
+            file.seek(0)
+        return file
+
+
+def needs_reencoding(image):
+    """Есть ли в картинке метаданные или поворот, которые нужно убрать."""
+    return (
+        any(key in image.info for key in STRIPPED_INFO_KEYS)
+        or image.getexif().get(EXIF_ORIENTATION, 1) != 1
+    )
+
+
+def reencode_image(data):
+    """Возвращает картинку без метаданных или None, если менять нечего."""
+    with Image.open(BytesIO(data)) as image:
+        if image.format not in ('JPEG', 'PNG', 'WEBP'):
+            return None
+        if not needs_reencoding(image):
+            return None
+        image_format = image.format
+        cleaned = ImageOps.exif_transpose(image)
+        cleaned.info = {}
+        output = BytesIO()
+        options = {'quality': 90} if image_format != 'PNG' else {}
+        cleaned.save(output, format=image_format, **options)
+        return output.getvalue()
+
+
+def reencode_post_image(post_id, name):
+    """Перекодирует картинку поста и подменяет ссылку на неё."""
+    from .models import Post
+    from .signals import release_image
+
+    close_old_connections()
+    try:
+        storage = Post.image.field.storage
+        with storage.open(name) as file:
+            cleaned = reencode_image(file.read())
+        if cleaned is None:
+            return
+        new_name = storage.save(name, ContentFile(cleaned, name=name))
+        with transaction.atomic():
+            updated = Post.objects.filter(pk=post_id, image=name).update(
+                image=new_name
+            )
+            if updated:
+                release_image(name)
+    except Exception:
+        logger.exception('Не удалось перекодировать картинку %s', name)
+    finally:
+        connection.close()
+
+
+def schedule_reencoding(post):
+    """Ставит перекодирование картинки поста в фон после коммита."""
+    if not post.image or not settings.POST_IMAGE_REENCODE:
+        return
+    post_id, name = post.pk, post.image.name
+    transaction.on_commit(
+        lambda: reencode_executor.submit(reencode_post_image, post_id, name)
+    )
@@ -1,6 +1,6 @@
 from django.urls import include, path
 
-from . import views
+from . import api, feeds, views
 
 app_name = 'blog'
 
@@ -44,26 +44,73 @@ posts_urls = [
     ),
 ]
 
+# Пути JSON API
+
+api_urls = [
+    path('posts/', api.post_list, name='api_posts'),
+    path('posts/<int:post_id>/', api.post_detail, name='api_post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        api.comment_list,
+        name='api_comments',
+    ),
+    path('categories/', api.category_list, name='api_categories'),
+    path('locations/', api.location_list, name='api_locations'),
+    path(
+        'categories/<slug:category_slug>/posts/',
+        api.category_post_list,
+        name='api_category_posts',
+    ),
+    path(
+        'authors/<slug:username>/posts/',
+        api.author_post_list,
+        name='api_author_posts',
+    ),
+]
+
 # Общие пути приложения blog
 
 urlpatterns = [
     path('', views.PostListView.as_view(), name='index'),
+    path('feed/', feeds.PostFeed(), name='feed'),
+    path('feed/atom/', feeds.PostAtomFeed(), name='feed_atom'),
     path(
         'auth/registration/',
         views.UserCreateView.as_view(),
         name='registration',
     ),
     path('posts/', include(posts_urls)),
+    path('api/v1/', include(api_urls)),
     path(
         'category/<slug:category_slug>/',
         views.PostByCategoryView.as_view(),
         name='category_posts'
     ),
+    path(
+        'category/<slug:category_slug>/feed/',
+        feeds.CategoryFeed(),
+        name='category_feed',
+    ),
+    path(
+        'category/<slug:category_slug>/feed/atom/',
+        feeds.CategoryAtomFeed(),
+        name='category_feed_atom',
+    ),
     path(
         'profile/<slug:username>/',
         views.user_profile,
         name='profile',
     ),
+    path(
+        'profile/<slug:username>/feed/',
+        feeds.AuthorFeed(),
+        name='profile_feed',
+    ),
+    path(
+        'profile/<slug:username>/feed/atom/',
+        feeds.AuthorAtomFeed(),
+        name='profile_feed_atom',
+    ),
     path(
         'profile-edit/',
         views.edit_profile,
@@ -0,0 +1,82 @@
+"""
+Редко меняющиеся данные, общие для всех запросов процесса.
+
+Значение хранится в памяти процесса вместе с версией, с которой оно
+загружено. Сама версия — случайный токен в общем кеше Django: каждый
+запрос сверяет с ним свою копию одним обращением к кешу. invalidate()
+записывает новый токен сразу и ещё раз после фиксации транзакции, после
+чего все процессы перезагружают значение при следующем обращении. Если
+токен пропал из кеша (очистка, вытеснение), создаётся новый, и значение
+тоже перезагружается.
+
+Кеш Django может быть и своим у каждого процесса (locmem), поэтому в
+версию входит ещё и версия ключа в шине blog.invalidation: сброс
+доходит до других процессов и через неё. На случай потерянного сообщения
+значение в любом случае перечитывается раз в VERSIONED_CACHE_MAX_AGE
+секунд.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.db import transaction
+
+from .invalidation import bus as default_bus
+from .metrics import record_cache
+
+
+class VersionedCache:
+    """Значение load(), общее для процесса и сбрасываемое во всех
+    процессах через версию в кеше.
+    """
+
+    def __init__(self, name, load, cache=None, bus=None):
+        self.name = name
+        self.load = load
+        self.cache = default_cache if cache is None else cache
+        self.bus = default_bus if bus is None else bus
+        # Тройка (версия, значение, время загрузки) заменяется целиком,
+        # чтобы потоки не увидели значение одной версии с номером другой.
+        self.state = (None, None, 0)
+
+    @property
+    def version_key(self):
+        return f'version:{self.name}'
+
+    def version(self):
+        version = self.cache.get(self.version_key)
+        if version is None:
+            self.cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = self.cache.get(self.version_key)
+        return version, self.bus.version(self.name)
+
+    def get(self):
+        # Версия читается до загрузки: изменение, случившееся во время
+        # загрузки, сменит версию, и значение перечитается в следующий раз.
+        version = self.version()
+        now = time.monotonic()
+        cached_version, value, loaded_at = self.state
+        fresh = (
+            version == cached_version
+            and now - loaded_at < settings.VERSIONED_CACHE_MAX_AGE
+        )
+        record_cache(self.name, fresh)
+        if not fresh:
+            value = self.load()
+            self.state = (version, value, now)
+        return value
+
+    def bump(self):
+        self.cache.set(self.version_key, uuid.uuid4().hex, None)
+        self.state = (None, None, 0)
+
+    def invalidate(self):
+        """Сбрасывает значение во всех процессах.
+
+        Повторно после фиксации: до неё параллельный запрос мог загрузить
+        старые данные под новой версией.
+        """
+        self.bump()
+        transaction.on_commit(self.bump)
+        self.bus.invalidate(self.name)
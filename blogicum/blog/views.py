@@ -1,21 +1,32 @@
+import hashlib
+import math
+from http import HTTPStatus
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-from django.core.paginator import Paginator
-from django.http import Http404
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
 from django.urls import reverse, reverse_lazy
+from django.views.decorators.http import condition
 from django.views.generic import (
     CreateView, DeleteView, DetailView, ListView, UpdateView
 )
 
-from .forms import CommentForm, PostForm, UserEditForm
+from .comments import comment_batcher, post_exists, take_comment_token
+from .forms import CommentForm, PostDeleteForm, UserEditForm
+from .live import LIVE_KINDS, live_url
 from .mixins import (
-    AlterPostViewMixin, CreatePostViewMixin, PaginatePostViewMixin
+    AlterPostViewMixin, CreatePostViewMixin, PaginatePostViewMixin,
+    get_page_range,
 )
 from .models import Category, Comment, Post, User
-from .queries import post_query_default
+from .paginators import KeysetPaginator
+from .queries import (
+    post_detail_query, post_detail_version, post_query_default
+)
 
 
 # Классы и функции для управления постами.
@@ -26,9 +37,8 @@ class PostListView(PaginatePostViewMixin, ListView):
 
     template_name = 'blog/index.html'
 
-    def get_queryset(self):
-        queryset = post_query_default(filters=True, annotate=True)
-        return queryset
+    def get_feed_key(self):
+        return 'index'
 
 
 class PostByCategoryView(PaginatePostViewMixin, ListView):
@@ -38,21 +48,21 @@ class PostByCategoryView(PaginatePostViewMixin, ListView):
 
     def get_category(self):
         """Метод для получения конкретной категории."""
-        category_slug = self.kwargs['category_slug']
-        return get_object_or_404(
-            Category,
-            slug=category_slug,
-            is_published=True,
-        )
-
-    def get_queryset(self):
-        """Переопределенный метотд для формирования постов по категории."""
-        return (
-            post_query_default(
-                manager=self.get_category().posts,
-                filters=True,
-                annotate=True,
+        if not hasattr(self, 'category'):
+            self.category = get_object_or_404(
+                Category,
+                slug=self.kwargs['category_slug'],
+                is_published=True,
             )
+        return self.category
+
+    def get_feed_key(self):
+        return f'category:{self.get_category().pk}'
+
+    def get_posts(self, **kwargs):
+        """Посты категории."""
+        return post_query_default(
+            manager=self.get_category().posts, filters=True, **kwargs
         )
 
     def get_context_data(self, **kwargs):
@@ -63,27 +73,84 @@ class PostByCategoryView(PaginatePostViewMixin, ListView):
         return context
 
 
+def get_post_detail_version(request, post_id):
+    """Версия страницы поста, одна на запрос для ETag и Last-Modified."""
+    if not hasattr(request, '_post_detail_version'):
+        request._post_detail_version = post_detail_version(
+            request.user, post_id
+        )
+    return request._post_detail_version
+
+
+def post_detail_etag(request, post_id):
+    """Значение ETag страницы поста с учётом пользователя и CSRF-cookie.
+
+    Имя пользователя выводится в шапке страницы; имена автора и
+    комментаторов меняют updated_at их постов и комментариев (см.
+    signals.touch_renamed_author_content).
+    """
+    version = get_post_detail_version(request, post_id)
+    if version is None:
+        return None
+    key = '|'.join(map(str, (
+        *version.values(),
+        request.user.pk,
+        request.user.get_username(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    )))
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def post_detail_last_modified(request, post_id):
+    version = get_post_detail_version(request, post_id)
+    if version is None:
+        return None
+    return max(filter(None, (
+        version['updated_at'],
+        version['category__updated_at'],
+        version['location__updated_at'],
+        version['last_comment_at'],
+    )))
+
+
+@method_decorator(
+    condition(
+        etag_func=post_detail_etag,
+        last_modified_func=post_detail_last_modified,
+    ),
+    name='get',
+)
 class PostDetailView(DetailView):
-    """Класс для представления отдельного поста."""
+    """Класс для представления отдельного поста.
+
+    На повторный запрос без изменений отвечает 304 по ETag, не загружая
+    пост и не рендеря шаблон.
+    """
 
     model = Post
     template_name = 'blog/detail.html'
 
     def get_object(self):
-        post_id = self.kwargs.get('post_id')
-        post = get_object_or_404(Post, pk=post_id)
-        if (self.request.user == post.author
-            or (post.is_published and post.category.is_published
-                and post.pub_date < timezone.now())):
-            return post
-        raise Http404("Page not found")
+        return get_object_or_404(
+            post_detail_query(self.request.user),
+            pk=self.kwargs.get('post_id'),
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = self.object.comments.select_related('author')
+        context['comments'] = self.object.comments.all()
+        context['live_urls'] = {
+            kind: live_url(self.object.pk, kind) for kind in LIVE_KINDS
+        }
         return context
 
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
 
 class PostCreateView(CreatePostViewMixin, CreateView):
     """Класс для создания поста."""
@@ -112,7 +179,7 @@ class PostDeleteView(AlterPostViewMixin, DeleteView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['form'] = PostForm(instance=self.object)
+        context['form'] = PostDeleteForm(instance=self.object)
         return context
 
     def get_success_url(self):
@@ -122,16 +189,45 @@ class PostDeleteView(AlterPostViewMixin, DeleteView):
 
 # Функции управления комментарими.
 
+def wants_fragment(request):
+    """Запрос от скрипта страницы, которому нужен фрагмент, а не редирект."""
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
 @login_required
 def add_comment(request, post_id):
-    """Добавление комментария."""
-    post = get_object_or_404(Post, pk=post_id)
+    """Добавление комментария.
+
+    Скрипт страницы поста получает в ответ HTML нового комментария (201)
+    или поля формы с ошибками (400); обычная отправка формы заканчивается
+    редиректом на пост.
+    """
+    if not post_exists(post_id):
+        raise Http404('Пост не найден')
     form = CommentForm(request.POST)
     if form.is_valid():
+        retry_after = take_comment_token(request.user.pk)
+        if retry_after:
+            response = HttpResponse(
+                'Слишком много комментариев, попробуйте позже.',
+                status=HTTPStatus.TOO_MANY_REQUESTS,
+            )
+            response['Retry-After'] = math.ceil(retry_after)
+            return response
         comment = form.save(commit=False)
         comment.author = request.user
-        comment.post = post
-        comment.save()
+        comment.post_id = post_id
+        comment_batcher.submit(comment)
+        if wants_fragment(request):
+            return render(
+                request, 'blog/includes/comment.html', {'comment': comment},
+                status=HTTPStatus.CREATED,
+            )
+    elif wants_fragment(request):
+        return render(
+            request, 'blog/includes/comment_form.html', {'form': form},
+            status=HTTPStatus.BAD_REQUEST,
+        )
 
     return redirect('blog:post_detail', post_id)
 
@@ -180,26 +276,34 @@ def delete_comment(request, post_id, comment_id):
 def user_profile(request, username):
     """Генерация страницы профиля пользователя."""
     profile_user = get_object_or_404(User, username=username)
-    if request.user != profile_user:
-        base_query = post_query_default(
-            manager=profile_user.posts,
-            filters=True,
-            annotate=True,
-        )
-    else:
-        base_query = post_query_default(
-            manager=profile_user.posts,
-            annotate=True,
-        )
+    is_owner = request.user == profile_user
+    feed_key = f'author:{profile_user.pk}' + (':all' if is_owner else '')
+    base_query = post_query_default(
+        manager=profile_user.posts,
+        filters=not is_owner,
+        annotate=True,
+        fields='card',
+    )
 
-    paginator = Paginator(base_query, settings.POSTS_ON_PAGE)
+    paginator = KeysetPaginator(
+        base_query,
+        settings.POSTS_ON_PAGE,
+        feed_key=feed_key,
+        count_queryset=post_query_default(
+            manager=profile_user.posts, filters=not is_owner
+        ),
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
     return render(
         request,
         'blog/profile.html',
-        context={'profile': profile_user, 'page_obj': page_obj},
+        context={
+            'profile': profile_user,
+            'page_obj': page_obj,
+            'page_range': get_page_range(page_obj),
+        },
     )
 
 
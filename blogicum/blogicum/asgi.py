@@ -13,4 +13,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from blog.live import LiveCommentsApp, match_live_path  # noqa: E402
+
+# Живые комментарии обслуживаются напрямую: Django 3.2 не умеет отдавать
+# асинхронный потоковый ответ. Пути задаёт LIVE_COMMENTS_PATH.
+live_comments = LiveCommentsApp()
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        match = match_live_path(scope['path'])
+        if match:
+            await live_comments(scope, receive, send, *match)
+            return
+    await django_application(scope, receive, send)
@@ -0,0 +1,134 @@
+"""
+Раздача пользовательских файлов из MEDIA_ROOT.
+
+Поддерживаются условные запросы (If-None-Match, If-Modified-Since) и
+запросы части файла (Range). Если перед приложением стоит прокси,
+передача файла поручается ему через X-Sendfile или X-Accel-Redirect
+(настройка MEDIA_SENDFILE_HEADER). Без прокси файл отображается в
+память через mmap и отдаётся кусками, не загружаясь в память процесса
+целиком.
+"""
+import mimetypes
+import mmap
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+STREAM_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+SENDFILE_HEADERS = ('X-Sendfile', 'X-Accel-Redirect')
+
+
+def parse_range(header, size):
+    """Разбирает заголовок Range с одним диапазоном.
+
+    Возвращает пару (start, end) включительно, None для заголовка,
+    который нужно проигнорировать, и ValueError для диапазона вне файла.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def mmap_chunks(path, start, end):
+    """Отдаёт байты файла [start, end] кусками из отображения в память."""
+    with open(path, 'rb') as file:
+        if end < start:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = start
+            while position <= end:
+                stop = min(position + STREAM_CHUNK_SIZE, end + 1)
+                yield mapped[position:stop]
+                position = stop
+
+
+def sendfile_response(path, name):
+    """Ответ, передающий отдачу файла прокси-серверу."""
+    response = HttpResponse()
+    header = settings.MEDIA_SENDFILE_HEADER
+    if header == 'X-Accel-Redirect':
+        response[header] = quote(
+            settings.MEDIA_SENDFILE_PREFIX + name.replace(os.sep, '/')
+        )
+    else:
+        response[header] = path
+    # Тип содержимого определяет прокси.
+    del response['Content-Type']
+    return response
+
+
+def serve_media(request, path):
+    """Отдаёт файл из MEDIA_ROOT."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+
+    stat = os.stat(full_path)
+    etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    last_modified = http_date(stat.st_mtime)
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if not_modified is not None:
+        return not_modified
+
+    if settings.MEDIA_SENDFILE_HEADER in SENDFILE_HEADERS:
+        response = sendfile_response(full_path, path)
+    else:
+        response = stream_response(request, full_path, stat.st_size, etag)
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def stream_response(request, full_path, size, etag):
+    """Потоковый ответ на весь файл или на запрошенный диапазон."""
+    start, end = 0, size - 1
+    status = 200
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            status = 206
+
+    response = StreamingHttpResponse(
+        mmap_chunks(full_path, start, end), status=status
+    )
+    response['Content-Length'] = str(end - start + 1)
+    if status == 206:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog.metrics.MetricsMiddleware',
+    'blog.profiling.ProfilingMiddleware',
+    'blog.querylog.QueryLogMiddleware',
+    'blog.invalidation.InvalidationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -133,6 +138,19 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static_dev', ]
 
+STATIC_ROOT = BASE_DIR / 'static'
+
+# Production-режим раздачи статики: хешированные имена файлов, заранее
+# сжатые копии и раздача собранной статики WSGI-обёрткой
+# blogicum.staticfiles.StaticFilesApplication. Перед запуском нужен
+# collectstatic.
+STATIC_PRODUCTION = os.getenv('BLOGICUM_STATIC_PRODUCTION') == '1'
+
+if STATIC_PRODUCTION:
+    STATICFILES_STORAGE = (
+        'blogicum.staticfiles.CompressedManifestStaticFilesStorage'
+    )
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -152,6 +170,190 @@ EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+MEDIA_URL = '/media/'
+
+# Картинки постов проверяются обработчиком загрузки по мере чтения
+# запроса: слишком большие файлы и файлы с неверной сигнатурой
+# отбрасываются, не дожидаясь конца загрузки.
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploads.PostImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+POST_IMAGE_UPLOAD_FIELDS = ('image',)
+
+POST_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+
+# Удалять метаданные картинок постов и перекодировать их в фоне.
+POST_IMAGE_REENCODE = True
+
+# Передача отдачи медиафайлов прокси-серверу: 'X-Sendfile' (Apache,
+# lighttpd) или 'X-Accel-Redirect' (nginx, internal-локация с префиксом
+# MEDIA_SENDFILE_PREFIX). Без настройки файлы отдаёт само приложение.
+MEDIA_SENDFILE_HEADER = os.getenv('BLOGICUM_MEDIA_SENDFILE_HEADER')
+
+MEDIA_SENDFILE_PREFIX = '/protected-media/'
+
 POSTS_ON_PAGE = 10
 
+# Сколько номеров страниц показывать в пагинаторе рядом с текущей и у
+# каждого края; остальные заменяются многоточием.
+PAGINATOR_ON_EACH_SIDE = 2
+
+PAGINATOR_ON_ENDS = 1
+
+# Число постов лент хранится в кеше FEED_COUNT_TIMEOUT секунд. Если
+# оценка СУБД не меньше FEED_COUNT_ESTIMATE_FROM, точный COUNT(*) не
+# выполняется и пагинатор показывает примерное число страниц.
+FEED_COUNT_TIMEOUT = 5 * 60
+
+FEED_COUNT_ESTIMATE_FROM = 100000
+
+# Индекс границ страниц хранит ключ каждого PAGE_BOUNDARY_STEP-го поста
+# ленты. Страницы, начинающиеся дальше PAGE_SEEK_FROM постов от начала
+# ленты, выбираются поиском от ближайшей границы вместо OFFSET.
+PAGE_BOUNDARY_STEP = POSTS_ON_PAGE
+
+PAGE_SEEK_FROM = 10 * POSTS_ON_PAGE
+
+# Лента отбирает посты опубликованных категорий по списку их id из кеша
+# процесса; если категорий больше PUBLISHED_CATEGORIES_IN_LIMIT, вместо
+# списка используется соединение с таблицей категорий.
+PUBLISHED_CATEGORIES_IN_LIMIT = 500
+
+# Если локаций больше LOCATION_AUTOCOMPLETE_FROM, форма поста не выводит
+# их списком, а подгружает подсказки по вводу.
+LOCATION_AUTOCOMPLETE_FROM = 200
+
+# Живые комментарии (blog.live): журнал изменений читается раз в
+# LIVE_POLL_INTERVAL секунд порциями по LIVE_BATCH_SIZE записей. Очередь
+# подписчика вмещает LIVE_QUEUE_SIZE событий; пустой поток SSE получает
+# комментарий-пинг раз в LIVE_HEARTBEAT секунд, долгий опрос ждёт до
+# LIVE_LONG_POLL_TIMEOUT секунд, а браузер переподключается через
+# LIVE_RETRY_MS миллисекунд. После ошибки чтения журнала пауза
+# удваивается, но не превышает LIVE_ERROR_BACKOFF секунд.
+LIVE_POLL_INTERVAL = 1
+
+# Шаблон путей живых комментариев: по нему страница поста строит адреса,
+# а ASGI-приложение узнаёт запросы (поля post_id и kind — stream или poll).
+LIVE_COMMENTS_PATH = '/posts/{post_id}/comments/{kind}/'
+
+LIVE_BATCH_SIZE = 200
+
+LIVE_QUEUE_SIZE = 100
+
+LIVE_HEARTBEAT = 15
+
+LIVE_LONG_POLL_TIMEOUT = 25
+
+LIVE_RETRY_MS = 3000
+
+LIVE_ERROR_BACKOFF = 30
+
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
+
+# Выборочное профилирование представлений blog: доля профилируемых
+# запросов (0 отключает middleware), интервал снятия стека в секундах,
+# каталог и число хранимых профилей.
+PROFILING_SAMPLE_RATE = float(os.getenv('BLOGICUM_PROFILING_SAMPLE_RATE', 0))
+
+PROFILING_INTERVAL = 0.005
+
+PROFILING_DIR = BASE_DIR / 'profiles'
+
+PROFILING_MAX_FILES = 500
+
+# Метрики в формате Prometheus на /metrics. Каждый процесс пишет свои
+# значения в отдельный файл в METRICS_DIR; каталог должен быть общим для
+# всех воркеров и очищаться при перезапуске сервера.
+METRICS_ENABLED = os.getenv('BLOGICUM_METRICS_ENABLED') == '1'
+
+METRICS_DIR = os.getenv('BLOGICUM_METRICS_DIR', BASE_DIR / 'metrics')
+
+# Статистика SQL-запросов по отпечаткам: каталог для файлов процессов,
+# период сброса статистики в секундах и порог медленного запроса.
+QUERYLOG_ENABLED = os.getenv('BLOGICUM_QUERYLOG_ENABLED') == '1'
+
+QUERYLOG_DIR = BASE_DIR / 'querylog'
+
+QUERYLOG_FLUSH_INTERVAL = 10
+
+QUERYLOG_SLOW_THRESHOLD = 0.1
+
+# Журнал изменений моделей blog: записи старше CHANGELOG_COMPACT_AFTER
+# секунд при сжатии схлопываются до последней по каждому объекту, а
+# записи об удалении хранятся CHANGELOG_TOMBSTONE_TTL секунд.
+CHANGELOG_COMPACT_AFTER = 24 * 60 * 60
+
+CHANGELOG_TOMBSTONE_TTL = 7 * 24 * 60 * 60
+
+# Читатели журнала не видят записи моложе CHANGELOG_READ_LAG секунд: при
+# нескольких одновременных писателях запись с меньшим id может
+# зафиксироваться позже. Значение должно превышать самую долгую пишущую
+# транзакцию; SQLite пишет в один поток, ей задержка не нужна.
+CHANGELOG_READ_LAG = (
+    0 if DATABASES['default']['ENGINE'].endswith('sqlite3') else 5
+)
+
+# RSS/Atom-ленты: число постов в ленте и время хранения готового XML в
+# кеше (ключ включает версию ленты, так что устаревших данных не будет).
+# Сама версия ленты хранится FEED_VERSION_TIMEOUT секунд и сбрасывается
+# сигналами; истечение срока нужно для отложенных публикаций.
+FEED_ITEMS = 20
+
+FEED_CACHE_TIMEOUT = 24 * 60 * 60
+
+FEED_VERSION_TIMEOUT = 60
+
+# JSON API: размер страницы по умолчанию и наибольший допустимый ?limit=.
+API_PAGE_SIZE = 20
+
+API_MAX_PAGE_SIZE = 100
+
+# Приём комментариев: сколько ведущий ждёт параллельные запросы, если
+# в очереди уже не один комментарий (секунды), наибольший размер пакета
+# и сколько запрос ждёт, пока ведущий заберёт его комментарий; корзина токенов на пользователя
+# (в кеше по умолчанию: без общего кеша она своя у каждого процесса);
+# время хранения в кеше признака существования поста.
+COMMENT_BATCH_WINDOW = 0.005
+
+COMMENT_BATCH_SIZE = 100
+
+COMMENT_BATCH_TIMEOUT = 10
+
+COMMENT_RATE_BURST = 20
+
+COMMENT_RATE_PER_SECOND = 1
+
+COMMENT_POST_CACHE_TIMEOUT = 10 * 60
+
+# Значения VersionedCache (опубликованные категории, варианты выбора в
+# форме поста) перечитываются не реже раза в VERSIONED_CACHE_MAX_AGE
+# секунд, даже если сообщение о сбросе до процесса не дошло.
+VERSIONED_CACHE_MAX_AGE = 60
+
+# Шина сброса кешей процессов (blog.invalidation). Транспорт:
+# blog.invalidation.DatabaseTransport (по умолчанию: таблица, опрашиваемая
+# раз в INVALIDATION_POLL_INTERVAL секунд порциями по
+# INVALIDATION_BATCH_SIZE сообщений и хранящаяся INVALIDATION_RETENTION
+# секунд; работает между процессами и узлами), UnixSocketTransport
+# (сокеты процессов одного узла в INVALIDATION_SOCKET_DIR) или
+# LocalTransport — только для сервера из одного процесса. Больше
+# INVALIDATION_MAX_KEYS версий ключей процесс не помнит и сбрасывает все
+# кеши разом.
+INVALIDATION_TRANSPORT = os.getenv(
+    'BLOGICUM_INVALIDATION_TRANSPORT', 'blog.invalidation.DatabaseTransport'
+)
+
+INVALIDATION_POLL_INTERVAL = 1
+
+INVALIDATION_BATCH_SIZE = 500
+
+INVALIDATION_RETENTION = 600
+
+INVALIDATION_MAX_KEYS = 10000
+
+INVALIDATION_SOCKET_DIR = os.getenv(
+    'BLOGICUM_INVALIDATION_SOCKET_DIR', '/tmp/blogicum-invalidation'
+)
@@ -0,0 +1,202 @@
+"""
+Раздача статики в production-режиме.
+
+CompressedManifestStaticFilesStorage при collectstatic добавляет хеш
+содержимого в имена файлов и заранее сохраняет рядом сжатые копии
+(.gz и, если установлен пакет brotli, .br).
+
+StaticFilesApplication оборачивает WSGI-приложение и отдаёт собранную
+статику из STATIC_ROOT, не доходя до Django: файлы с хешем в имени
+кешируются клиентом «навсегда», а тело ответа передаётся через
+wsgi.file_wrapper, который WSGI-серверы реализуют через sendfile().
+"""
+import gzip
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.txt', '.html', '.xml', '.json', '.map', '.ico',
+)
+# Сжатая копия сохраняется, только если она заметно меньше оригинала.
+MIN_COMPRESSION_RATIO = 0.95
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+FILE_WRAPPER_BLOCK_SIZE = 64 * 1024
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress_file(path):
+    """Сохраняет рядом с файлом его gzip- и brotli-версии."""
+    data = Path(path).read_bytes()
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data)))
+    for suffix, compressed in variants:
+        if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+            Path(f'{path}{suffix}').write_bytes(compressed)
+            yield f'{path}{suffix}'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище с хешированными именами и сжатыми копиями файлов."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                for compressed in compress_file(self.path(name)):
+                    yield name, compressed, True
+
+
+def parse_accept_encoding(header):
+    """Словарь {кодировка: q} из заголовка Accept-Encoding."""
+    weights = {}
+    for item in header.split(','):
+        encoding, *params = item.strip().split(';')
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[encoding] = weight
+    return weights
+
+
+class StaticFile:
+    """Описание файла статики и его сжатых вариантов.
+
+    У каждого варианта свой ETag: тела ответов различаются, и кеш
+    не должен подставлять сжатое тело клиенту, который его не принимает.
+    """
+
+    def __init__(self, path, url):
+        stat = os.stat(path)
+        self.path = path
+        self.size = stat.st_size
+        self.content_type = (
+            mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.cache_control = (
+            IMMUTABLE_CACHE_CONTROL if HASHED_NAME_RE.search(url)
+            else DEFAULT_CACHE_CONTROL
+        )
+        self.encodings = {
+            encoding: (f'{path}{suffix}', os.path.getsize(f'{path}{suffix}'))
+            for encoding, suffix in ENCODINGS
+            if os.path.exists(f'{path}{suffix}')
+        }
+
+    def choose(self, accept_encoding):
+        """Возвращает (путь, размер, кодировка, ETag) под Accept-Encoding.
+
+        Из допустимых (q > 0) кодировок выбирается с наибольшим q, при
+        равных — в порядке ENCODINGS.
+        """
+        weights = parse_accept_encoding(accept_encoding)
+        best = None
+        for encoding, (path, size) in self.encodings.items():
+            weight = weights.get(encoding, weights.get('*', 0))
+            if weight > 0 and (best is None or weight > best[0]):
+                best = (weight, path, size, encoding)
+        if best is None:
+            return self.path, self.size, None, self.etag
+        _, path, size, encoding = best
+        return path, size, encoding, f'{self.etag[:-1]}-{encoding}"'
+
+
+def etag_matches(header, etag):
+    """Совпадает ли ETag с одним из If-None-Match (слабое сравнение)."""
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in (
+        tag[2:] if tag.startswith('W/') else tag for tag in tags
+    )
+
+
+class StaticFilesApplication:
+    """WSGI-обёртка, раздающая файлы из STATIC_ROOT."""
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = Path(root or settings.STATIC_ROOT)
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = self.scan()
+
+    def scan(self):
+        """Строит индекс файлов: после collectstatic статика неизменна."""
+        files = {}
+        compressed = tuple(suffix for _, suffix in ENCODINGS)
+        for path in self.root.rglob('*'):
+            if not path.is_file() or path.suffix in compressed:
+                continue
+            url = self.prefix + path.relative_to(self.root).as_posix()
+            files[url] = StaticFile(str(path), url)
+        return files
+
+    def __call__(self, environ, start_response):
+        static_file = self.files.get(environ.get('PATH_INFO', ''))
+        if static_file is None:
+            return self.application(environ, start_response)
+        return self.serve(static_file, environ, start_response)
+
+    def serve(self, static_file, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+            return []
+        path, size, encoding, etag = static_file.choose(
+            environ.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        headers = [
+            ('Cache-Control', static_file.cache_control),
+            ('ETag', etag),
+            ('Last-Modified', static_file.last_modified),
+        ]
+        if static_file.encodings:
+            headers.append(('Vary', 'Accept-Encoding'))
+        if etag_matches(environ.get('HTTP_IF_NONE_MATCH', ''), etag):
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers += [
+            ('Content-Type', static_file.content_type),
+            ('Content-Length', str(size)),
+        ]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', file_iterator)
+        return file_wrapper(open(path, 'rb'), FILE_WRAPPER_BLOCK_SIZE)
+
+
+def file_iterator(file, block_size):
+    """Запасной вариант wsgi.file_wrapper для серверов без sendfile()."""
+    with file:
+        while True:
+            chunk = file.read(block_size)
+            if not chunk:
+                break
+            yield chunk
@@ -0,0 +1,43 @@
+// Подсказки для списков с атрибутом data-autocomplete-url: над списком
+// появляется поле поиска, варианты подгружаются из JSON API по вводу.
+document.addEventListener('DOMContentLoaded', () => {
+  document.querySelectorAll('select[data-autocomplete-url]').forEach((select) => {
+    const search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'form-control mb-1';
+    search.placeholder = 'Начните вводить название';
+    select.before(search);
+
+    let timer = null;
+    let controller = null;
+    search.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(async () => {
+        if (controller) {
+          controller.abort();
+        }
+        controller = new AbortController();
+        const url = new URL(select.dataset.autocompleteUrl, window.location.origin);
+        url.searchParams.set('q', search.value.trim());
+        let data;
+        try {
+          const response = await fetch(url, { signal: controller.signal });
+          data = await response.json();
+        } catch (error) {
+          return;
+        }
+        // Пустой вариант и текущий выбор остаются в списке.
+        const keep = Array.from(select.options).filter(
+          (option) => option.value === '' || option.selected,
+        );
+        select.replaceChildren(...keep);
+        data.results.forEach((location) => {
+          if (keep.some((option) => option.value === String(location.id))) {
+            return;
+          }
+          select.add(new Option(location.name, location.id));
+        });
+      }, 250);
+    });
+  });
+});
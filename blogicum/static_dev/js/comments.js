@@ -0,0 +1,42 @@
+// Отправка комментария без перезагрузки страницы: сервер возвращает HTML
+// нового комментария или поля формы с ошибками. Без скрипта форма
+// отправляется обычным образом и заканчивается редиректом на пост.
+document.addEventListener('DOMContentLoaded', () => {
+  const form = document.querySelector('form[data-comment-form]');
+  const list = document.querySelector('[data-comment-list]');
+  if (!form || !list) {
+    return;
+  }
+  const fields = form.querySelector('[data-comment-fields]');
+  const emptyFields = fields.innerHTML;
+  const button = form.querySelector('[type="submit"]');
+
+  form.addEventListener('submit', async (event) => {
+    event.preventDefault();
+    button.disabled = true;
+    try {
+      const response = await fetch(form.action, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: { 'X-Requested-With': 'XMLHttpRequest' },
+        credentials: 'same-origin',
+      });
+      const html = await response.text();
+      if (response.status === 201) {
+        list.insertAdjacentHTML('beforeend', html);
+        fields.innerHTML = emptyFields;
+      } else if (response.status === 400) {
+        fields.innerHTML = html;
+      } else if (response.status === 429) {
+        window.alert(html);
+      } else {
+        window.alert('Не удалось отправить комментарий.');
+      }
+    } catch (error) {
+      // Сеть недоступна: отправляем форму без скрипта.
+      form.submit();
+    } finally {
+      button.disabled = false;
+    }
+  });
+});
@@ -0,0 +1,69 @@
+// Живое обновление комментариев: поток Server-Sent Events, а если он
+// недоступен — долгий опрос. События upsert добавляют или заменяют
+// комментарий, delete удаляет его, reset перезагружает страницу.
+document.addEventListener('DOMContentLoaded', () => {
+  const list = document.querySelector('[data-comment-list]');
+  if (!list) {
+    return;
+  }
+
+  const apply = (event) => {
+    if (event.action === 'reset') {
+      window.location.reload();
+      return;
+    }
+    const anchor = list.querySelector(`a[name="comment_${event.comment_id}"]`);
+    const existing = anchor ? anchor.closest('.media') : null;
+    if (event.action === 'delete') {
+      if (existing) {
+        existing.remove();
+      }
+    } else if (existing) {
+      existing.outerHTML = event.html;
+    } else {
+      list.insertAdjacentHTML('beforeend', event.html);
+    }
+  };
+
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  const poll = async (url) => {
+    let cursor = null;
+    let failures = 0;
+    while (failures < 5) {
+      try {
+        const query = cursor === null ? '' : `?after=${cursor}`;
+        const response = await fetch(url + query, { credentials: 'same-origin' });
+        if (response.status === 404) {
+          return;
+        }
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        const data = await response.json();
+        data.events.forEach(apply);
+        cursor = data.cursor;
+        failures = 0;
+      } catch (error) {
+        failures += 1;
+        await sleep(3000 * failures);
+      }
+    }
+  };
+
+  if (!window.EventSource) {
+    poll(list.dataset.livePoll);
+    return;
+  }
+  const source = new EventSource(list.dataset.liveStream);
+  ['upsert', 'delete', 'reset'].forEach((type) => {
+    source.addEventListener(type, (message) => apply(JSON.parse(message.data)));
+  });
+  source.addEventListener('error', () => {
+    // Сервер отказал в потоке (например, прокси его не пропускает):
+    // браузер не переподключается, переходим на долгий опрос.
+    if (source.readyState === EventSource.CLOSED) {
+      poll(list.dataset.livePoll);
+    }
+  });
+});
@@ -35,6 +35,16 @@ UrlRepr = NamedTuple("UrlRepr", [("url", str), ("repr", str)])
 TitledUrlRepr = TypeVar("TitledUrlRepr", bound=Tuple[UrlRepr, str])
 
 
+@pytest.fixture(scope="session", autouse=True)
+def single_process_invalidation():
+    # Тесты идут в одном процессе: шина сброса кешей обходится без
+    # таблицы и не добавляет запросов к проверяемым.
+    with override_settings(
+        INVALIDATION_TRANSPORT="blog.invalidation.LocalTransport"
+    ):
+        yield
+
+
 @pytest.fixture(autouse=True)
 def enable_debug_false():
     with override_settings(DEBUG=False):
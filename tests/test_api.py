@@ -0,0 +1,100 @@
+from http import HTTPStatus
+
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_post_list_pages_by_cursor(
+    client, many_posts_with_published_locations, django_assert_num_queries
+):
+    seen = []
+    url = "/api/v1/posts/?limit=7"
+    # Первый запрос загружает список опубликованных категорий и версию
+    # ленты, дальше выполняется только выборка страницы.
+    client.get(url)
+    while url:
+        with django_assert_num_queries(1):
+            data = client.get(url).json()
+        seen.extend(post["id"] for post in data["results"])
+        url = data["next"]
+    expected = sorted(
+        many_posts_with_published_locations,
+        key=lambda post: (post.pub_date, post.id),
+        reverse=True,
+    )
+    assert seen == [post.id for post in expected], (
+        "Курсор должен обходить все посты без пропусков и повторов."
+    )
+
+
+def test_sparse_fieldsets(client, post_with_published_location):
+    data = client.get("/api/v1/posts/?fields=id,title,comment_count").json()
+    assert data["results"] == [{
+        "id": post_with_published_location.id,
+        "title": post_with_published_location.title,
+        "comment_count": 0,
+    }]
+    response = client.get("/api/v1/posts/?fields=id,password")
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert client.get(
+        "/api/v1/posts/?cursor=broken"
+    ).status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_hidden_posts_are_not_listed(
+    client, post_with_published_location, user_client
+):
+    post = post_with_published_location
+    post.is_published = False
+    post.save()
+    assert client.get("/api/v1/posts/").json()["results"] == []
+    detail_url = f"/api/v1/posts/{post.id}/"
+    assert client.get(detail_url).status_code == HTTPStatus.NOT_FOUND
+    assert user_client.get(detail_url).json()["title"] == post.title, (
+        "Автор должен видеть свой неопубликованный пост."
+    )
+
+
+def test_filtered_lists(
+    client, post_with_published_location, post_with_another_category, user
+):
+    category = post_with_another_category.category
+    data = client.get(f"/api/v1/categories/{category.slug}/posts/").json()
+    assert [post["id"] for post in data["results"]] == [
+        post_with_another_category.id
+    ]
+    data = client.get(f"/api/v1/authors/{user.username}/posts/").json()
+    assert len(data["results"]) == 2
+    assert client.get(
+        "/api/v1/authors/unknown/posts/"
+    ).status_code == HTTPStatus.NOT_FOUND
+    slugs = [
+        item["slug"] for item in client.get("/api/v1/categories/").json()[
+            "results"
+        ]
+    ]
+    assert category.slug in slugs
+
+
+def test_comments_and_etag(client, post_with_published_location, mixer, user):
+    url = f"/api/v1/posts/{post_with_published_location.id}/comments/"
+    response = client.get(url)
+    assert response.json() == {"results": [], "next": None}
+    etag = response["ETag"]
+    assert client.get(
+        url, HTTP_IF_NONE_MATCH=etag
+    ).status_code == HTTPStatus.NOT_MODIFIED
+
+    comment = mixer.blend(
+        "blog.Comment", post=post_with_published_location, author=user
+    )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["results"][0] == {
+        "id": comment.id,
+        "text": comment.text,
+        "author": user.username,
+        "created_at": comment.created_at.isoformat(),
+        "updated_at": comment.updated_at.isoformat(),
+    }
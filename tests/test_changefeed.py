@@ -0,0 +1,170 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.changefeed import compact_changes, latest_cursor, read_changes
+from blog.models import Category, ChangeLogEntry, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def entries(after=0):
+    return [
+        (entry.model_label, entry.object_id, entry.action)
+        for entry in read_changes(after)
+    ]
+
+
+def test_create_update_delete_are_logged(post_with_published_location):
+    post = post_with_published_location
+    cursor = latest_cursor()
+    comment = post.comments.create(text="Комментарий", author=post.author)
+    post_id, comment_id = post.pk, comment.pk
+    post.title = "Новый заголовок"
+    post.save()
+    post.delete()
+    assert entries(cursor) == [
+        ("blog.Comment", comment_id, "create"),
+        ("blog.Post", post_id, "update"),
+        ("blog.Comment", comment_id, "delete"),
+        ("blog.Post", post_id, "delete"),
+    ], "Журнал изменений должен содержать все изменения по порядку."
+
+
+def test_queryset_update_is_logged(post_with_published_location, user):
+    cursor = latest_cursor()
+    user.posts.update(is_published=False)
+    assert entries(cursor) == [
+        ("blog.Post", post_with_published_location.pk, "update")
+    ], "Массовое обновление должно попадать в журнал изменений."
+
+
+def test_detached_posts_are_logged(
+    post_with_published_location, published_category
+):
+    post_with_published_location.category = published_category
+    post_with_published_location.save()
+    cursor = latest_cursor()
+    category_id = published_category.pk
+    published_category.delete()
+    assert entries(cursor) == [
+        ("blog.Post", post_with_published_location.pk, "update"),
+        ("blog.Category", category_id, "delete"),
+    ], "Пост, потерявший категорию, должен попадать в журнал изменений."
+
+
+def test_rolled_back_change_is_not_logged(post_with_published_location):
+    cursor = latest_cursor()
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            post_with_published_location.save()
+            raise RuntimeError
+    assert entries(cursor) == [], (
+        "Запись журнала должна откатываться вместе с изменением."
+    )
+
+
+def test_read_changes_pages_by_cursor(published_category):
+    cursor = latest_cursor()
+    for _ in range(3):
+        published_category.save()
+    first = read_changes(cursor, limit=2)
+    second = read_changes(first[-1].id, limit=2)
+    assert len(first) == 2 and len(second) == 1
+    assert read_changes(second[-1].id) == []
+
+
+def test_recent_entries_wait_for_read_lag(published_category):
+    ChangeLogEntry.objects.update(
+        changed_at=timezone.now() - timedelta(hours=1)
+    )
+    cursor = latest_cursor()
+    published_category.save()
+    published_category.save()
+    old, recent = ChangeLogEntry.objects.filter(id__gt=cursor)
+    old.changed_at -= timedelta(minutes=1)
+    old.save()
+    with override_settings(CHANGELOG_READ_LAG=10):
+        assert [entry.id for entry in read_changes(cursor)] == [old.id], (
+            "Записи моложе CHANGELOG_READ_LAG не должны читаться."
+        )
+        assert latest_cursor() == old.id
+        ChangeLogEntry.objects.filter(pk=old.pk).update(
+            changed_at=timezone.now()
+        )
+        assert read_changes(cursor) == [], (
+            "Чтение должно обрываться на первой свежей записи."
+        )
+
+
+def test_compaction_keeps_latest_entry_per_object(
+    post_with_published_location, published_category
+):
+    post = post_with_published_location
+    category_id = published_category.pk
+    for _ in range(3):
+        post.save()
+    published_category.delete()
+    ChangeLogEntry.objects.update(
+        changed_at=timezone.now() - timedelta(days=2)
+    )
+    compact_changes()
+    remaining = {
+        (entry.model_label, entry.object_id): entry.action
+        for entry in ChangeLogEntry.objects.all()
+    }
+    assert ChangeLogEntry.objects.filter(
+        model_label="blog.Post", object_id=post.pk
+    ).count() == 1, "После сжатия по объекту должна остаться одна запись."
+    assert remaining[("blog.Post", post.pk)] == "update"
+    assert remaining[("blog.Category", category_id)] == "delete"
+
+    compact_changes(now=timezone.now() + timedelta(days=30))
+    assert not ChangeLogEntry.objects.filter(action="delete").exists(), (
+        "Записи об удалении должны удаляться по истечении срока хранения."
+    )
+
+
+def test_changefeed_command(post_with_published_location, capsys):
+    cursor = latest_cursor()
+    Post.objects.filter(pk=post_with_published_location.pk).update(
+        title="Заголовок"
+    )
+    call_command("changefeed", after=cursor, models=["blog.Post"])
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(line)["action"] for line in lines] == ["update"]
+
+
+def test_bulk_create_is_logged(mixer, user):
+    category, location = mixer.blend("blog.Category"), mixer.blend(
+        "blog.Location"
+    )
+    cursor = latest_cursor()
+    posts = Post.objects.bulk_create(
+        Post(
+            title=f"Пост {number}", text="Текст", author=user,
+            category=category, location=location, pub_date=timezone.now(),
+        )
+        for number in range(3)
+    )
+    categories = Category.objects.bulk_create(
+        (Category(title=slug, description="", slug=slug)
+         for slug in ("one", "two")),
+        batch_size=1,
+    )
+    assert [post.pk for post in posts] == list(
+        Post.objects.order_by("pk").values_list("pk", flat=True)
+    ), "bulk_create должен заполнять id созданных постов."
+    assert entries(cursor) == [
+        ("blog.Post", post.pk, "create") for post in posts
+    ] + [
+        ("blog.Category", category.pk, "create") for category in categories
+    ], "Объекты, созданные через bulk_create, должны попадать в журнал."
+    assert [category.slug for category in categories] == [
+        Category.objects.get(pk=category.pk).slug for category in categories
+    ]
@@ -0,0 +1,63 @@
+import pytest
+from django.utils import timezone
+
+from blog.models import Category, Post
+from blog.queries import changed_since, changes_since
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_queryset_update_sets_updated_at(post_with_published_location, user):
+    before = timezone.now()
+    user.posts.update(is_published=False)
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.updated_at >= before
+
+
+def test_bulk_update_sets_updated_at(published_category, another_category):
+    before = timezone.now()
+    categories = [published_category, another_category]
+    for category in categories:
+        category.is_published = False
+    Category.objects.bulk_update(categories, ["is_published"])
+    assert all(
+        category.updated_at >= before
+        for category in Category.objects.all()
+    )
+
+
+def test_changes_since(
+    post_with_published_location, comment_to_a_post, another_category
+):
+    checkpoint = timezone.now()
+    assert not changed_since(Post, checkpoint).exists()
+
+    post_with_published_location.title = "Изменённый заголовок"
+    post_with_published_location.save()
+    another_category.save()
+
+    changes = changes_since(checkpoint)
+    assert list(changes["blog.Post"]) == [post_with_published_location]
+    assert list(changes["blog.Category"]) == [another_category]
+    assert not changes["blog.Comment"].exists()
+    assert not changes["blog.Location"].exists()
+
+
+def test_changed_since_resumes_inside_update_batch(mixer, user):
+    checkpoint = timezone.now()
+    mixer.cycle(5).blend("blog.Post", author=user)
+    Post.objects.update(title="Массовое изменение")
+    assert Post.objects.values("updated_at").distinct().count() == 1
+
+    received = []
+    since, after_pk = checkpoint, None
+    while True:
+        batch = list(changed_since(Post, since, after_pk=after_pk)[:2])
+        if not batch:
+            break
+        received.extend(post.pk for post in batch)
+        since, after_pk = batch[-1].updated_at, batch[-1].pk
+    assert received == sorted(Post.objects.values_list("pk", flat=True)), (
+        "Выгрузка порциями не должна терять объекты с одинаковым "
+        "updated_at."
+    )
@@ -0,0 +1,152 @@
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from blog import comments
+from blog.comments import CommentBatcher, post_cache_key
+from blog.models import Comment
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+@override_settings(COMMENT_RATE_BURST=2, COMMENT_RATE_PER_SECOND=0.01)
+def test_comments_are_rate_limited(user_client, post_with_published_location):
+    url = f"/posts/{post_with_published_location.id}/comment/"
+    for _ in range(2):
+        response = user_client.post(url, {"text": "Комментарий"})
+        assert response.status_code == HTTPStatus.FOUND
+    response = user_client.post(url, {"text": "Комментарий"})
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+        "Комментарии сверх лимита должны отклоняться со статусом 429."
+    )
+    assert int(response["Retry-After"]) > 0
+    assert Comment.objects.count() == 2
+
+
+@override_settings(COMMENT_BATCH_WINDOW=0.05)
+def test_concurrent_comments_are_written_in_one_batch(monkeypatch):
+    batches = []
+
+    def write_batch(batch):
+        # Пока пишется пакет, остальные комментарии встают в очередь.
+        time.sleep(0.05)
+        batches.append([entry.comment for entry in batch])
+
+    monkeypatch.setattr(comments, "write_batch", write_batch)
+    batcher = CommentBatcher()
+    submitted = [Comment(text=str(number)) for number in range(5)]
+    threads = [
+        threading.Thread(target=batcher.submit, args=(comment,))
+        for comment in submitted
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert sorted(
+        comment.text for batch in batches for comment in batch
+    ) == [comment.text for comment in submitted]
+    assert len(batches) < len(submitted), (
+        "Параллельные комментарии должны записываться пакетом."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_post_cache_falls_back_to_404(user_client):
+    cache.set(post_cache_key(999), True)
+    response = user_client.post("/posts/999/comment/", {"text": "Текст"})
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        "Комментарий к удалённому посту должен отклоняться даже при "
+        "устаревшем кеше."
+    )
+    assert not Comment.objects.exists()
+    assert cache.get(post_cache_key(999)) is None
+
+
+class Abort(BaseException):
+    """Прерывание потока в духе gevent.Timeout."""
+
+
+def test_interrupted_leader_hands_over(monkeypatch):
+    batches = []
+
+    def write_batch(batch):
+        if not batches:
+            batches.append(None)
+            raise Abort
+        batches.append([entry.comment for entry in batch])
+
+    monkeypatch.setattr(comments, "write_batch", write_batch)
+    batcher = CommentBatcher()
+    with pytest.raises(Abort):
+        batcher.submit(Comment(text="первый"))
+    assert not batcher.leading, (
+        "Прерванный ведущий должен освобождать очередь."
+    )
+    comment = Comment(text="второй")
+    assert batcher.submit(comment) is comment
+    assert batches[-1] == [comment]
+
+
+@override_settings(COMMENT_BATCH_TIMEOUT=0.05)
+def test_waiter_writes_comment_when_leader_is_stuck(monkeypatch):
+    batches = []
+    monkeypatch.setattr(
+        comments, "write_batch",
+        lambda batch: batches.append([entry.comment for entry in batch]),
+    )
+    batcher = CommentBatcher()
+    # Ведущий завис, не забрав очередь.
+    batcher.leading = True
+    comment = Comment(text="Текст")
+    assert batcher.submit(comment) is comment
+    assert batches == [[comment]], (
+        "Комментарий, который ведущий не забрал, должен записываться "
+        "самим запросом."
+    )
+    assert batcher.queue == []
+
+
+@override_settings(COMMENT_BATCH_WINDOW=5)
+def test_single_comment_skips_batch_window(monkeypatch):
+    monkeypatch.setattr(comments, "write_batch", lambda batch: None)
+    started = time.monotonic()
+    CommentBatcher().submit(Comment(text="Текст"))
+    assert time.monotonic() - started < 1, (
+        "Одинокий комментарий не должен ждать COMMENT_BATCH_WINDOW."
+    )
+
+
+@override_settings(COMMENT_BATCH_TIMEOUT=0.05)
+def test_waiter_waits_for_slow_batch(monkeypatch):
+    written = threading.Event()
+
+    def write_batch(batch):
+        time.sleep(0.2)
+        written.set()
+
+    monkeypatch.setattr(comments, "write_batch", write_batch)
+    batcher = CommentBatcher()
+    comment = Comment(text="Текст")
+    entry = comments.PendingComment(comment)
+    batcher.queue.append(entry)
+    batcher.leading = True
+    leader = threading.Thread(target=batcher.lead)
+    leader.start()
+    batcher.wait(entry)
+    leader.join(timeout=5)
+    assert written.is_set() and entry.error is None, (
+        "Запрос, чей комментарий уже пишется, должен дождаться записи, "
+        "а не падать по таймауту."
+    )
@@ -0,0 +1,53 @@
+import pytest
+from django.template import Context, Template
+
+from blog.forms import CommentForm
+from blog.templatetags import blog_forms
+
+pytestmark = [pytest.mark.django_db]
+
+
+def render(template, form):
+    return Template(
+        "{% load django_bootstrap5 blog_forms %}" + template
+    ).render(Context({"form": form}))
+
+
+def test_cached_form_matches_bootstrap_form():
+    blog_forms.rendered_forms.clear()
+    expected = render("{% bootstrap_form form %}", CommentForm())
+    assert render("{% cached_bootstrap_form form %}", CommentForm()) == (
+        expected
+    )
+    assert render("{% cached_bootstrap_form form %}", CommentForm()) == (
+        expected
+    )
+    bound = CommentForm(data={"text": ""})
+    assert render("{% cached_bootstrap_form form %}", bound) == render(
+        "{% bootstrap_form form %}", bound
+    ), "Связанная форма с ошибками должна выводиться без кеша."
+
+
+def test_detail_page_renders_comment_form_once(
+    monkeypatch, user_client, post_with_published_location
+):
+    blog_forms.rendered_forms.clear()
+    calls = []
+    render_form = blog_forms.render_form
+
+    def counting_render_form(form):
+        calls.append(form)
+        return render_form(form)
+
+    monkeypatch.setattr(blog_forms, "render_form", counting_render_form)
+    url = f"/posts/{post_with_published_location.id}/"
+    for _ in range(3):
+        content = user_client.get(url).content.decode()
+        assert 'name="csrfmiddlewaretoken"' in content
+        assert (
+            f'action="/posts/{post_with_published_location.id}/comment/"'
+            in content
+        )
+    assert len(calls) == 1, (
+        "Форма комментария должна строиться один раз на процесс."
+    )
@@ -0,0 +1,61 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+XHR = {"HTTP_X_REQUESTED_WITH": "XMLHttpRequest"}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_script_gets_comment_fragment(
+    user_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/comment/"
+    with CaptureQueriesContext(connection) as queries:
+        response = user_client.post(url, {"text": "Новый комментарий"}, **XHR)
+    assert response.status_code == HTTPStatus.CREATED
+    content = response.content.decode()
+    comment = Comment.objects.get()
+    assert "Новый комментарий" in content
+    assert f"/posts/{post.id}/edit_comment/{comment.id}/" in content
+    assert "<html" not in content, (
+        "Скрипту должен возвращаться только фрагмент нового комментария."
+    )
+    assert not any(
+        'FROM "blog_comment"' in query["sql"] for query in queries
+    ), "Ответ не должен заново выбирать комментарии поста."
+
+
+def test_script_gets_form_errors(user_client, post_with_published_location):
+    url = f"/posts/{post_with_published_location.id}/comment/"
+    response = user_client.post(url, {"text": ""}, **XHR)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert "is-invalid" in response.content.decode()
+    assert not Comment.objects.exists()
+
+
+def test_form_without_script_redirects(
+    user_client, post_with_published_location
+):
+    post = post_with_published_location
+    response = user_client.post(
+        f"/posts/{post.id}/comment/", {"text": "Комментарий"}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert response["Location"] == f"/posts/{post.id}/"
+    content = user_client.get(f"/posts/{post.id}/").content.decode()
+    assert "data-comment-form" in content
+    assert "js/comments.js" in content
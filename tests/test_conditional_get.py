@@ -0,0 +1,101 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib.auth import get_user_model
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def detail_url(post_with_published_location):
+    return f"/posts/{post_with_published_location.id}/"
+
+
+def get_etag(client, url):
+    # Первый ответ выставляет CSRF-cookie, от которой зависит ETag.
+    client.get(url)
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert "ETag" in response and "Last-Modified" in response
+    return response["ETag"]
+
+
+def test_unchanged_page_is_not_rendered(user_client, detail_url):
+    etag = get_etag(user_client, detail_url)
+    response = user_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.templates == [], (
+        "Ответ 304 не должен рендерить шаблоны."
+    )
+    assert response.content == b""
+
+
+def test_new_comment_changes_etag(
+    user_client, detail_url, post_with_published_location, mixer, user
+):
+    etag = get_etag(user_client, detail_url)
+    mixer.blend(
+        "blog.Comment", post=post_with_published_location, author=user
+    )
+    response = user_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_deleted_comment_and_edited_post_change_etag(
+    user_client, detail_url, post_with_published_location, comment_to_a_post
+):
+    etag = get_etag(user_client, detail_url)
+    comment_to_a_post.delete()
+    assert user_client.get(
+        detail_url, HTTP_IF_NONE_MATCH=etag
+    ).status_code == HTTPStatus.OK
+
+    etag = get_etag(user_client, detail_url)
+    post_with_published_location.title = "Новый заголовок"
+    post_with_published_location.save()
+    assert user_client.get(
+        detail_url, HTTP_IF_NONE_MATCH=etag
+    ).status_code == HTTPStatus.OK
+
+
+def test_etag_depends_on_user(user_client, another_user_client, detail_url):
+    etag = get_etag(user_client, detail_url)
+    response = another_user_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response["ETag"] != etag
+    assert "Cookie" in response["Vary"]
+
+
+def test_hidden_post_is_not_revalidated(
+    user_client, another_user_client, detail_url, post_with_published_location
+):
+    etag = get_etag(another_user_client, detail_url)
+    post_with_published_location.is_published = False
+    post_with_published_location.save()
+    response = another_user_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert user_client.get(detail_url).status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize("renamed", ("author", "commenter", "viewer"))
+def test_renamed_user_changes_etag(
+    renamed, another_user_client, detail_url, post_with_published_location,
+    mixer, another_user,
+):
+    commenter = mixer.blend(get_user_model())
+    mixer.blend(
+        "blog.Comment", post=post_with_published_location, author=commenter
+    )
+    etag = get_etag(another_user_client, detail_url)
+    renamed_user = {
+        "author": post_with_published_location.author,
+        "commenter": commenter,
+        "viewer": another_user,
+    }[renamed]
+    renamed_user.username = f"{renamed_user.username}_new"
+    renamed_user.save()
+    response = another_user_client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        "После смены имени пользователя, которое выводится на странице, "
+        "ETag страницы поста должен меняться."
+    )
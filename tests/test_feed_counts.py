@@ -0,0 +1,136 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.invalidation import InvalidationBus, LocalTransport, bus
+from blog.models import Post
+from blog.paginators import feed_bus_key, feed_count_key
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    counts = [
+        query["sql"] for query in queries if "COUNT(*)" in query["sql"]
+    ]
+    return response, counts
+
+
+def test_feed_count_is_cached(client, many_posts_with_published_locations):
+    category = many_posts_with_published_locations[0].category
+    for url in ("/", f"/category/{category.slug}/"):
+        response, counts = count_queries(client, url)
+        assert len(counts) == 1
+        assert "GROUP BY" not in counts[0], (
+            "Число постов должно считаться без аннотаций."
+        )
+        response, counts = count_queries(client, url)
+        assert counts == [], "Число постов ленты должно браться из кеша."
+        assert response.context["paginator"].count == len(
+            many_posts_with_published_locations
+        )
+
+
+def test_new_post_invalidates_count(
+    client, mixer, user, many_posts_with_published_locations
+):
+    client.get("/")
+    mixer.blend(
+        "blog.Post",
+        author=user,
+        category=many_posts_with_published_locations[0].category,
+    )
+    response = client.get("/")
+    assert response.context["paginator"].count == len(
+        many_posts_with_published_locations
+    ) + 1
+
+
+def test_profile_counts_are_separate_for_owner(
+    client, user_client, user, many_posts_with_published_locations
+):
+    hidden = many_posts_with_published_locations[0]
+    hidden.is_published = False
+    hidden.save()
+    url = f"/profile/{user.username}/"
+    total = len(many_posts_with_published_locations)
+    assert client.get(url).context["page_obj"].paginator.count == total - 1
+    assert user_client.get(
+        url
+    ).context["page_obj"].paginator.count == total
+
+
+@override_settings(FEED_COUNT_ESTIMATE_FROM=1)
+def test_large_feed_uses_estimate(client, many_posts_with_published_locations):
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    response, counts = count_queries(client, "/")
+    assert counts == [], "Для большой ленты COUNT(*) выполняться не должен."
+    assert response.context["paginator"].approximate
+    assert "примерно" in response.content.decode()
+
+
+@override_settings(FEED_COUNT_ESTIMATE_FROM=1)
+def test_filtered_feeds_are_counted_exactly(
+    client, many_posts_with_published_locations, post_with_another_category
+):
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    category = post_with_another_category.category
+    response, counts = count_queries(client, f"/category/{category.slug}/")
+    assert len(counts) == 1, (
+        "Ленты категорий должны считаться точно: оценка по статистике "
+        "даёт среднее на значение."
+    )
+    assert not response.context["paginator"].approximate
+    assert response.context["paginator"].count == 1
+
+
+def test_bulk_created_posts_invalidate_count(
+    client, user, many_posts_with_published_locations
+):
+    category = many_posts_with_published_locations[0].category
+    client.get("/")
+    posts = [
+        Post(
+            title=f"Пост {number}", text="Текст", author=user,
+            category=category, pub_date=timezone.now(),
+        )
+        for number in range(3)
+    ]
+    Post.objects.bulk_create(posts)
+    response = client.get("/")
+    assert response.context["paginator"].count == len(
+        many_posts_with_published_locations
+    ) + 3, "bulk_create постов должен сбрасывать число постов лент."
+
+
+def test_other_process_invalidates_count(
+    client, many_posts_with_published_locations,
+    django_capture_on_commit_callbacks,
+):
+    total = len(many_posts_with_published_locations)
+    # Число, закешированное этим процессом до удаления поста в другом:
+    # сигналы другого процесса сюда не доходят, только сообщение шины.
+    Post.objects.filter(pk=many_posts_with_published_locations[0].pk).delete()
+    cache.set(feed_count_key("index"), (total, False))
+    assert client.get("/").context["paginator"].count == total
+    other = InvalidationBus(LocalTransport())
+    with django_capture_on_commit_callbacks(execute=True):
+        other.invalidate(feed_bus_key("index"))
+    bus.poll()
+    assert client.get("/").context["paginator"].count == total - 1, (
+        "Сброс числа постов в другом процессе должен доходить через шину."
+    )
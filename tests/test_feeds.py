@@ -0,0 +1,98 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_feeds_list_published_posts(
+    client, post_with_published_location, post_with_another_category, user
+):
+    hidden = post_with_another_category
+    hidden.is_published = False
+    hidden.save()
+    category = post_with_published_location.category
+    for url in (
+        "/feed/",
+        "/feed/atom/",
+        f"/category/{category.slug}/feed/",
+        f"/category/{category.slug}/feed/atom/",
+        f"/profile/{user.username}/feed/",
+        f"/profile/{user.username}/feed/atom/",
+    ):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, url
+        content = response.content.decode()
+        assert post_with_published_location.title in content, (
+            f"Лента {url} должна содержать опубликованный пост."
+        )
+        assert hidden.title not in content, (
+            f"Лента {url} не должна содержать снятый с публикации пост."
+        )
+    assert "atom" in client.get("/feed/atom/")["Content-Type"]
+
+
+def test_category_feed_filters_posts(
+    client, post_with_published_location, post_with_another_category
+):
+    category = post_with_another_category.category
+    content = client.get(f"/category/{category.slug}/feed/").content.decode()
+    assert post_with_another_category.title in content
+    assert post_with_published_location.title not in content
+
+
+def test_unknown_feed_object_is_404(client):
+    assert client.get("/category/unknown/feed/").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+    assert client.get("/profile/unknown/feed/").status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+
+def test_unchanged_feed_is_not_rebuilt(
+    client, post_with_published_location, django_assert_num_queries
+):
+    response = client.get("/feed/")
+    etag = response["ETag"]
+    # Версия ленты берётся из кеша: опрос не обращается к базе.
+    with django_assert_num_queries(0):
+        revalidated = client.get("/feed/", HTTP_IF_NONE_MATCH=etag)
+    assert revalidated.status_code == HTTPStatus.NOT_MODIFIED
+    with django_assert_num_queries(0):
+        cached = client.get("/feed/")
+    assert cached.content == response.content, (
+        "Неизменившаяся лента должна отдаваться из кеша."
+    )
+
+
+def test_changed_post_rebuilds_feed(client, post_with_published_location):
+    etag = client.get("/feed/")["ETag"]
+    post_with_published_location.title = "Новый заголовок"
+    post_with_published_location.save()
+    response = client.get("/feed/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert "Новый заголовок" in response.content.decode()
+
+
+def test_changed_category_rebuilds_category_feed(
+    client, post_with_published_location
+):
+    category = post_with_published_location.category
+    url = f"/category/{category.slug}/feed/"
+    etag = client.get(url)["ETag"]
+    category.title = "Новая категория"
+    category.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        "Изменение категории должно сбрасывать версию её ленты."
+    )
+    assert "Новая категория" in response.content.decode()
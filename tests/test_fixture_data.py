@@ -0,0 +1,27 @@
+from http import HTTPStatus
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from blog.models import Category, Post
+
+pytestmark = [pytest.mark.django_db]
+
+FIXTURE = settings.BASE_DIR.parent / "db.json"
+
+
+def test_demo_data_loads(client):
+    call_command("loaddata", FIXTURE, verbosity=0)
+    assert Post.objects.count() == 39
+    assert not Category.objects.filter(updated_at=None).exists()
+    post = Post.objects.filter(is_published=True).order_by("pk").first()
+    assert post.updated_at is not None, (
+        "Объекты из фикстуры без updated_at должны получать время изменения."
+    )
+    assert post.excerpt and post.text_html, (
+        "Посты из фикстуры должны получать анонс и HTML-версию текста."
+    )
+    response = client.get(f"/posts/{post.pk}/")
+    assert response.status_code == HTTPStatus.OK
+    assert post.text_html in response.content.decode()
@@ -0,0 +1,212 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from blog.comments import save_comments
+from blog.invalidation import (
+    DatabaseTransport, InvalidationBus, LocalTransport, UnixSocketTransport,
+    bus, object_key,
+)
+from blog.models import Category, Comment, InvalidationMessage
+from blog.versioned import VersionedCache
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def process_bus():
+    """Шина процесса с уже созданным транспортом и пустым входящим."""
+    bus.transport.receive()
+    return bus
+
+
+@pytest.fixture
+def socket_buses(tmp_path):
+    with override_settings(INVALIDATION_SOCKET_DIR=tmp_path):
+        buses = [
+            InvalidationBus(UnixSocketTransport()) for _ in range(2)
+        ]
+        yield buses
+    for one in buses:
+        one.transport.close()
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_keys_of_transaction_sent_once(django_capture_on_commit_callbacks):
+    sender = InvalidationBus(LocalTransport())
+    receiver = InvalidationBus(LocalTransport())
+    with django_capture_on_commit_callbacks(execute=True):
+        sender.invalidate('first')
+        sender.invalidate('second', 'first')
+    assert len(receiver.transport.inbox) == 1, (
+        "Ключи одной транзакции должны уходить одним сообщением."
+    )
+    before = receiver.version('first')
+    receiver.poll()
+    assert receiver.version('first') != before
+    assert receiver.version('second') != before
+    assert receiver.version('other') == before, (
+        "Сообщение не должно сбрасывать другие ключи."
+    )
+
+
+def test_nothing_sent_before_commit(django_capture_on_commit_callbacks):
+    sender = InvalidationBus(LocalTransport())
+    receiver = InvalidationBus(LocalTransport())
+    with django_capture_on_commit_callbacks() as callbacks:
+        sender.invalidate('key')
+    assert not receiver.transport.inbox, (
+        "Ключи должны рассылаться только после фиксации транзакции."
+    )
+    for callback in callbacks:
+        callback()
+    assert receiver.transport.inbox
+
+
+@override_settings(INVALIDATION_POLL_INTERVAL=0)
+def test_database_transport():
+    sender = InvalidationBus(DatabaseTransport())
+    receiver = InvalidationBus(DatabaseTransport())
+    receiver.poll()
+    sender.poll()
+    sender.invalidate('key')
+    sender.flush()
+    before = receiver.version('key')
+    receiver.poll()
+    assert receiver.version('key') != before, (
+        "Получатель должен применять сообщения из таблицы."
+    )
+    own = sender.version('key')
+    sender.poll()
+    assert sender.version('key') == own, (
+        "Процесс не должен повторно применять свои сообщения."
+    )
+    assert InvalidationMessage.objects.count() == 1
+
+
+@override_settings(INVALIDATION_POLL_INTERVAL=0, INVALIDATION_BATCH_SIZE=2)
+def test_database_transport_reads_in_batches():
+    sender = InvalidationBus(DatabaseTransport())
+    receiver = InvalidationBus(DatabaseTransport())
+    receiver.poll()
+    for key in ('a', 'b', 'c'):
+        sender.invalidate(key)
+        sender.flush()
+    receiver.poll()
+    assert receiver.version('b') != receiver.version('c')
+    receiver.poll()
+    assert receiver.version('c') == receiver.version('a'), (
+        "Остаток очереди должен дочитываться следующим опросом."
+    )
+
+
+@override_settings(INVALIDATION_POLL_INTERVAL=0)
+def test_database_transport_gap_resets_everything():
+    receiver = InvalidationBus(DatabaseTransport())
+    receiver.poll()
+    before = receiver.version('key')
+    with override_settings(INVALIDATION_RETENTION=0):
+        receiver.poll()
+    assert receiver.version('key') != before, (
+        "Процесс, долго не читавший таблицу, должен сбросить все кеши."
+    )
+
+
+def test_unix_socket_transport(socket_buses):
+    sender, receiver = socket_buses
+    before = receiver.version('key')
+    sender.invalidate('key')
+    sender.flush()
+
+    def delivered():
+        receiver.poll()
+        return receiver.version('key') != before
+
+    assert wait_for(delivered), (
+        "Сообщение должно доходить до сокета другого процесса."
+    )
+    assert receiver.version('other') == before
+
+
+def test_unix_socket_sequence_gap_resets_everything(socket_buses):
+    sender, receiver = socket_buses
+    sender.invalidate('first')
+    sender.flush()
+    assert wait_for(lambda: receiver.transport.inbox)
+    receiver.poll()
+    other = receiver.version('other')
+    # Сообщение потерялось по дороге.
+    sender.transport.sequence += 1
+    sender.invalidate('second')
+    sender.flush()
+    assert wait_for(lambda: receiver.transport.missed), (
+        "Пропуск номера сообщения должен замечаться получателем."
+    )
+    receiver.poll()
+    assert receiver.version('other') != other
+
+
+def test_model_changes_broadcast_keys(
+    published_category, process_bus, django_capture_on_commit_callbacks
+):
+    receiver = InvalidationBus(LocalTransport())
+    with django_capture_on_commit_callbacks(execute=True):
+        published_category.title = 'Другое название'
+        published_category.save()
+        Category.objects.filter(pk=published_category.pk).update(
+            is_published=False
+        )
+    keys, _ = receiver.transport.receive()
+    assert object_key(Category, published_category.pk) in keys, (
+        "Изменение категории должно рассылаться по шине."
+    )
+
+
+def test_batched_comments_broadcast_keys(
+    post_with_published_location, user, process_bus,
+    django_capture_on_commit_callbacks,
+):
+    receiver = InvalidationBus(LocalTransport())
+    comment = Comment(
+        text="Комментарий", post=post_with_published_location, author=user
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        save_comments([comment])
+    keys, _ = receiver.transport.receive()
+    assert object_key(Comment, comment.pk) in keys, (
+        "Комментарии, записанные пакетом, должны рассылаться по шине."
+    )
+
+
+def test_versioned_cache_reloads_on_bus_message(
+    process_bus, django_capture_on_commit_callbacks
+):
+    loads = []
+    shared = VersionedCache('test_bus', lambda: loads.append(1) or len(loads))
+    assert shared.get() == 1
+    assert shared.get() == 1
+    other = InvalidationBus(LocalTransport())
+    with django_capture_on_commit_callbacks(execute=True):
+        other.invalidate('test_bus')
+    process_bus.poll()
+    assert shared.get() == 2, (
+        "Сообщение шины должно перезагружать значение, даже если кеш "
+        "Django у процессов свой."
+    )
@@ -0,0 +1,284 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.test import override_settings
+
+from blog import live
+from blog.live import RESET, Subscriber, hub
+from blog.models import Comment
+from blogicum.asgi import application
+
+pytestmark = [pytest.mark.django_db]
+
+LIVE_SETTINGS = {
+    "LIVE_POLL_INTERVAL": 0.01,
+    "LIVE_HEARTBEAT": 0.2,
+    "LIVE_LONG_POLL_TIMEOUT": 0.3,
+}
+
+
+def http_scope(path, query=b"", headers=()):
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query,
+        "headers": list(headers),
+    }
+
+
+async def request(path, query=b""):
+    communicator = ApplicationCommunicator(
+        application, http_scope(path, query)
+    )
+    await communicator.send_input({"type": "http.request", "body": b""})
+    start = await communicator.receive_output(2)
+    body = await communicator.receive_output(2)
+    return start["status"], body["body"]
+
+
+async def read_event(communicator, timeout=2):
+    """Следующее событие потока, пропуская пинги."""
+    while True:
+        message = await communicator.receive_output(timeout)
+        chunk = message.get("body", b"").decode()
+        if chunk.startswith("event:"):
+            return json.loads(chunk.split("data: ", 1)[1])
+
+
+@override_settings(**LIVE_SETTINGS)
+def test_stream_pushes_comment_changes(post_with_published_location, user):
+    post = post_with_published_location
+
+    async def scenario():
+        communicator = ApplicationCommunicator(
+            application, http_scope(f"/posts/{post.id}/comments/stream/")
+        )
+        await communicator.send_input({"type": "http.request", "body": b""})
+        start = await communicator.receive_output(2)
+        assert start["status"] == 200
+        assert (b"content-type", b"text/event-stream; charset=utf-8") in (
+            start["headers"]
+        )
+        retry = await communicator.receive_output(2)
+        assert retry["body"].startswith(b"retry:")
+        # Читатель журнала запоминает курсор при запуске.
+        while hub.task is None:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+
+        comment = await sync_to_async(Comment.objects.create)(
+            text="Живой комментарий", post=post, author=user
+        )
+        event = await read_event(communicator)
+        assert event["action"] == "upsert"
+        assert event["comment_id"] == comment.id
+        assert "Живой комментарий" in event["html"]
+        assert "edit_comment" not in event["html"], (
+            "Анониму не должны приходить ссылки на изменение комментария."
+        )
+
+        comment_id = comment.id
+        await sync_to_async(comment.delete)()
+        event = await read_event(communicator)
+        assert event == {
+            "id": event["id"], "action": "delete", "comment_id": comment_id,
+        }
+
+        heartbeat = await communicator.receive_output(2)
+        assert heartbeat["body"] == b": ping\n\n"
+
+        await communicator.send_input({"type": "http.disconnect"})
+        await communicator.wait(2)
+        assert not hub.subscribers
+
+    async_to_sync(scenario)()
+
+
+@override_settings(**LIVE_SETTINGS)
+def test_long_poll(post_with_published_location, user):
+    post = post_with_published_location
+    path = f"/posts/{post.id}/comments/poll/"
+
+    status, body = async_to_sync(request)(path)
+    assert status == 200
+    cursor = json.loads(body)["cursor"]
+
+    status, body = async_to_sync(request)(path, f"after={cursor}".encode())
+    assert json.loads(body) == {"cursor": cursor, "events": []}, (
+        "Без изменений долгий опрос должен вернуть пустой ответ по таймауту."
+    )
+
+    comment = Comment.objects.create(
+        text="Комментарий для опроса", post=post, author=user
+    )
+    status, body = async_to_sync(request)(path, f"after={cursor}".encode())
+    data = json.loads(body)
+    assert [event["comment_id"] for event in data["events"]] == [comment.id]
+    assert data["cursor"] > cursor
+
+
+def test_hidden_post_is_not_found(mixer, user):
+    post = mixer.blend("blog.Post", author=user, is_published=False)
+    status, _ = async_to_sync(request)(f"/posts/{post.id}/comments/poll/")
+    assert status == 404
+
+
+@override_settings(LIVE_QUEUE_SIZE=2)
+def test_slow_subscriber_gets_reset():
+    async def scenario():
+        subscriber = Subscriber(post_id=1, user_id=0)
+        for number in range(3):
+            subscriber.offer({
+                "id": number, "post_id": None, "action": "delete",
+                "comment_id": number,
+            })
+        return [
+            subscriber.queue.get_nowait()
+            for _ in range(subscriber.queue.qsize())
+        ]
+
+    assert async_to_sync(scenario)() == [RESET], (
+        "Переполненная очередь должна заменяться событием reset."
+    )
+
+
+@override_settings(**LIVE_SETTINGS)
+def test_stream_replays_after_last_event_id(
+    post_with_published_location, user, user_client
+):
+    post = post_with_published_location
+    cursor = json.loads(async_to_sync(request)(
+        f"/posts/{post.id}/comments/poll/"
+    )[1])["cursor"]
+    comment = Comment.objects.create(
+        text="Пропущенный комментарий", post=post, author=user
+    )
+    session = user_client.cookies["sessionid"].value
+
+    async def scenario():
+        communicator = ApplicationCommunicator(application, http_scope(
+            f"/posts/{post.id}/comments/stream/",
+            headers=[
+                (b"cookie", f"sessionid={session}".encode()),
+                (b"last-event-id", str(cursor).encode()),
+            ],
+        ))
+        await communicator.send_input({"type": "http.request", "body": b""})
+        event = await read_event(communicator)
+        await communicator.send_input({"type": "http.disconnect"})
+        await communicator.wait(2)
+        return event
+
+    event = async_to_sync(scenario)()
+    assert event["comment_id"] == comment.id
+    assert f"/edit_comment/{comment.id}/" in event["html"], (
+        "Автору комментария должен приходить фрагмент со ссылками на его"
+        " изменение."
+    )
+
+
+@override_settings(
+    LIVE_COMMENTS_PATH="/live/{post_id}/{kind}", **LIVE_SETTINGS
+)
+def test_page_and_router_share_live_path(post_with_published_location, client):
+    post = post_with_published_location
+    content = client.get(f"/posts/{post.id}/").content.decode()
+    for kind in ("stream", "poll"):
+        assert f'data-live-{kind}="/live/{post.id}/{kind}"' in content, (
+            "Адреса живых комментариев на странице поста должны строиться"
+            " по LIVE_COMMENTS_PATH."
+        )
+    status, body = async_to_sync(request)(f"/live/{post.id}/poll")
+    assert status == 200 and "cursor" in json.loads(body), (
+        "ASGI-приложение должно узнавать пути по LIVE_COMMENTS_PATH."
+    )
+
+
+async def hub_events(subscriber, count):
+    return [
+        await asyncio.wait_for(subscriber.queue.get(), 2)
+        for _ in range(count)
+    ]
+
+
+@override_settings(**LIVE_SETTINGS)
+def test_hub_serves_only_subscribed_posts(
+    post_with_published_location, mixer, user, monkeypatch
+):
+    post = post_with_published_location
+    other_post = mixer.blend("blog.Post", author=user)
+    kept = mixer.blend("blog.Comment", post=post, author=user)
+    rendered = []
+    render = live.render_to_string
+
+    def counting_render(template, context):
+        rendered.append(context["comment"].post_id)
+        return render(template, context)
+
+    monkeypatch.setattr(live, "render_to_string", counting_render)
+
+    async def scenario():
+        subscriber = await hub.subscribe(post.id, 0)
+        while hub.cursor is None:
+            await asyncio.sleep(0.01)
+        create = sync_to_async(Comment.objects.create)
+        foreign = await create(text="Чужой", post=other_post, author=user)
+        await sync_to_async(foreign.delete)()
+        new = await create(text="Свой", post=post, author=user)
+        kept_id = kept.id
+        await sync_to_async(kept.delete)()
+        events = await hub_events(subscriber, 2)
+        await asyncio.sleep(0.05)
+        assert subscriber.queue.empty(), (
+            "Подписчик не должен получать события других постов."
+        )
+        hub.unsubscribe(subscriber)
+        return new.id, kept_id, events
+
+    new_id, kept_id, events = async_to_sync(scenario)()
+    assert [(event["action"], event["comment_id"]) for event in events] == [
+        ("upsert", new_id), ("delete", kept_id),
+    ]
+    assert set(rendered) == {post.id}, (
+        "Комментарии постов без подписчиков не должны рендериться."
+    )
+
+
+@override_settings(**LIVE_SETTINGS)
+def test_hub_survives_journal_errors(
+    post_with_published_location, user, monkeypatch
+):
+    post = post_with_published_location
+    load_events = live.load_events
+    failures = []
+
+    def failing_once(*args):
+        if not failures:
+            failures.append(True)
+            raise RuntimeError("База недоступна")
+        return load_events(*args)
+
+    monkeypatch.setattr(live, "load_events", failing_once)
+
+    async def scenario():
+        subscriber = await hub.subscribe(post.id, 0)
+        while hub.cursor is None:
+            await asyncio.sleep(0.01)
+        comment = await sync_to_async(Comment.objects.create)(
+            text="После сбоя", post=post, author=user
+        )
+        events = await hub_events(subscriber, 1)
+        hub.unsubscribe(subscriber)
+        return comment.id, events
+
+    comment_id, events = async_to_sync(scenario)()
+    assert failures, "Чтение журнала должно было упасть."
+    assert events[0]["comment_id"] == comment_id, (
+        "После ошибки чтения журнала хаб должен продолжать работу."
+    )
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+import pytest
+from django.test import override_settings
+
+CONTENT = bytes(range(256)) * 1024
+URL = "/media/posts_images/photo.jpg"
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    (tmp_path / "posts_images").mkdir()
+    (tmp_path / "posts_images" / "photo.jpg").write_bytes(CONTENT)
+    with override_settings(MEDIA_ROOT=tmp_path):
+        yield tmp_path
+
+
+def read(response):
+    return b"".join(response.streaming_content)
+
+
+def test_full_file(client, media_file):
+    response = client.get(URL)
+    assert response.status_code == HTTPStatus.OK
+    assert response["Content-Type"] == "image/jpeg"
+    assert response["Accept-Ranges"] == "bytes"
+    assert read(response) == CONTENT
+
+
+def test_missing_file_and_traversal(client, media_file):
+    assert client.get("/media/posts_images/none.jpg").status_code == 404
+    assert client.get("/media/../settings.py").status_code == 404
+
+
+@pytest.mark.parametrize(
+    ("header", "start", "end"),
+    (
+        ("bytes=0-99", 0, 99),
+        ("bytes=1000-", 1000, len(CONTENT) - 1),
+        ("bytes=-500", len(CONTENT) - 500, len(CONTENT) - 1),
+        ("bytes=10-999999999", 10, len(CONTENT) - 1),
+    ),
+)
+def test_range(client, media_file, header, start, end):
+    response = client.get(URL, HTTP_RANGE=header)
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT
+    assert response["Content-Range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert read(response) == CONTENT[start:end + 1]
+
+
+def test_unsatisfiable_range(client, media_file):
+    response = client.get(URL, HTTP_RANGE=f"bytes={len(CONTENT)}-")
+    assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_range_mismatch_returns_full_file(client, media_file):
+    response = client.get(URL, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+    assert response.status_code == HTTPStatus.OK
+    assert read(response) == CONTENT
+
+
+def test_conditional_requests(client, media_file):
+    response = client.get(URL)
+    etag, last_modified = response["ETag"], response["Last-Modified"]
+    assert client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(
+        URL, HTTP_IF_MODIFIED_SINCE=last_modified
+    ).status_code == 304
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    (
+        ("X-Accel-Redirect", "/protected-media/posts_images/photo.jpg"),
+        ("X-Sendfile", None),
+    ),
+)
+def test_sendfile_offload(client, media_file, header, expected):
+    with override_settings(MEDIA_SENDFILE_HEADER=header):
+        response = client.get(URL)
+    assert response.status_code == HTTPStatus.OK
+    assert response.content == b""
+    expected = expected or str(media_file / "posts_images" / "photo.jpg")
+    assert response[header] == expected
@@ -0,0 +1,69 @@
+import multiprocessing
+
+import pytest
+from django.test import Client, override_settings
+
+from blog.metrics import MmapValues, collect, registry
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def metrics_dir(tmp_path):
+    with override_settings(METRICS_ENABLED=True, METRICS_DIR=tmp_path):
+        registry.pid = None
+        yield tmp_path
+    registry.pid = None
+
+
+def write_in_child(directory):
+    with override_settings(METRICS_DIR=directory):
+        registry.pid = None
+        registry.inc("blogicum_requests_total", {"view": "child"}, 2)
+
+
+def test_mmap_values_survive_reopen(tmp_path):
+    values = MmapValues(tmp_path / "metrics_1.db")
+    for i in range(3000):
+        values.add(f"key-{i}", i)
+    values.add("key-5", 1)
+    reopened = MmapValues(tmp_path / "metrics_1.db")
+    assert len(reopened.positions) == 3000
+    assert collect(tmp_path)["key-5"] == 6
+
+
+def test_values_from_processes_are_summed(metrics_dir):
+    registry.inc("blogicum_requests_total", {"view": "child"}, 1)
+    process = multiprocessing.get_context("fork").Process(
+        target=write_in_child, args=(metrics_dir,)
+    )
+    process.start()
+    process.join()
+    assert len(list(metrics_dir.glob("metrics_*.db"))) == 2
+    totals = collect(metrics_dir)
+    assert totals[
+        '["blogicum_requests_total", "", [["view", "child"]]]'
+    ] == 3
+
+
+def test_metrics_endpoint(metrics_dir, post_with_published_location):
+    client = Client()
+    client.get("/")
+    client.get(f"/posts/{post_with_published_location.id}/")
+    body = client.get("/metrics").content.decode()
+    assert "# TYPE blogicum_request_duration_seconds histogram" in body
+    assert (
+        'blogicum_requests_total{status="2xx",view="blog:index"} 1.0'
+        in body
+    )
+    assert (
+        'blogicum_db_queries_count{view="blog:post_detail"} 1.0' in body
+    )
+    assert (
+        'blogicum_template_render_seconds_bucket{view="blog:index",'
+        'le="+Inf"} 1.0' in body
+    )
+
+
+def test_metrics_disabled(client):
+    assert client.get("/metrics").status_code == 404
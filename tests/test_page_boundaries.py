@@ -0,0 +1,187 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.test import override_settings
+from django.utils import timezone
+
+from blog.invalidation import bus
+from blog.models import PageBoundary, Post
+from blog.paginators import KeysetPaginator
+from blog.queries import feed_posts
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.usefixtures("clear_cache"),
+]
+
+PER_PAGE = 3
+
+
+@pytest.fixture
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def feed(mixer, user):
+    category = mixer.blend("blog.Category", is_published=True)
+    now = timezone.now()
+    for number in range(20):
+        # Пары постов с одинаковой датой проверяют сортировку по id.
+        mixer.blend(
+            "blog.Post",
+            author=user,
+            category=category,
+            location=None,
+            is_published=True,
+            pub_date=now - timedelta(days=1 + number // 2),
+        )
+    return category
+
+
+def page_ids(paginator):
+    return [
+        (paginator.num_pages, [post.pk for post in paginator.page(number)])
+        for number in paginator.page_range
+    ]
+
+
+def assert_pages_match(feed_key="index"):
+    cache.clear()
+    posts = feed_posts(feed_key).order_by("-pub_date", "-id")
+    expected = page_ids(Paginator(posts, PER_PAGE))
+    actual = page_ids(KeysetPaginator(
+        posts,
+        PER_PAGE,
+        feed_key=feed_key,
+        count_queryset=feed_posts(feed_key),
+    ))
+    for number, (page, expected_page) in enumerate(zip(actual, expected)):
+        assert page == expected_page, (
+            f"Страница {number + 1} при поиске по границам должна совпадать "
+            "со страницей, выбранной через OFFSET."
+        )
+    assert len(actual) == len(expected)
+
+
+@override_settings(PAGE_BOUNDARY_STEP=PER_PAGE, PAGE_SEEK_FROM=0)
+def test_seek_matches_offset(feed):
+    assert_pages_match()
+    assert PageBoundary.objects.filter(feed_key="index").exists(), (
+        "Переход на страницу должен достраивать индекс границ."
+    )
+
+
+@override_settings(PAGE_BOUNDARY_STEP=PER_PAGE, PAGE_SEEK_FROM=0)
+def test_boundaries_follow_changes(feed, mixer, user):
+    assert_pages_match()
+    posts = list(Post.objects.order_by("pub_date", "id"))
+    posts[4].delete()
+    assert_pages_match()
+    posts[7].is_published = False
+    posts[7].save()
+    assert_pages_match()
+    posts[10].pub_date = posts[0].pub_date - timedelta(days=1)
+    posts[10].save()
+    assert_pages_match()
+    mixer.blend(
+        "blog.Post",
+        author=user,
+        category=feed,
+        location=None,
+        is_published=True,
+        pub_date=posts[2].pub_date,
+    )
+    assert_pages_match()
+    Post.objects.filter(pk=posts[12].pk).update(is_published=False)
+    assert not PageBoundary.objects.exists(), (
+        "Массовое изменение публикации должно сбрасывать индекс."
+    )
+    assert_pages_match()
+
+
+@override_settings(PAGE_BOUNDARY_STEP=PER_PAGE, PAGE_SEEK_FROM=0)
+def test_rebuild_command(feed, user):
+    call_command("rebuild_page_boundaries")
+    for feed_key in ("index", f"category:{feed.pk}", f"author:{user.pk}"):
+        assert PageBoundary.objects.filter(
+            feed_key=feed_key
+        ).count() == feed_posts(feed_key).count() // PER_PAGE
+    assert_pages_match()
+    assert_pages_match(f"author:{user.pk}:all")
+
+
+@override_settings(PAGE_BOUNDARY_STEP=PER_PAGE, PAGE_SEEK_FROM=0)
+def test_views_use_boundaries(client, feed, user):
+    total = Post.objects.count()
+    last_page = (total + 9) // 10
+    for url in ("/", f"/category/{feed.slug}/", f"/profile/{user.username}/"):
+        response = client.get(url, {"page": last_page})
+        assert response.status_code == 200
+        assert len(response.context["page_obj"]) == total - (
+            last_page - 1
+        ) * 10
+    assert PageBoundary.objects.exists()
+
+
+def profile_page_ids(client, user, page):
+    # Сбросы, накопленные при создании постов вне транзакции запроса.
+    bus.flush()
+    response = client.get(f"/profile/{user.username}/", {"page": page})
+    return [post.pk for post in response.context["page_obj"]]
+
+
+def expected_profile_page_ids(user, page):
+    posts = feed_posts(f"author:{user.pk}").order_by("-pub_date", "-id")
+    return [post.pk for post in Paginator(posts, 10).page(page)]
+
+
+@override_settings(PAGE_BOUNDARY_STEP=PER_PAGE, PAGE_SEEK_FROM=0)
+def test_profile_page_after_category_change(
+    client, feed, mixer, user, django_capture_on_commit_callbacks
+):
+    other = mixer.blend("blog.Category", is_published=True)
+    now = timezone.now()
+    for number in range(3):
+        mixer.blend(
+            "blog.Post", author=user, category=other, location=None,
+            is_published=True,
+            pub_date=now - timedelta(days=1, hours=number * 24 + 12),
+        )
+    assert profile_page_ids(client, user, 3) == expected_profile_page_ids(
+        user, 3
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        other.is_published = False
+        other.save()
+    assert profile_page_ids(client, user, 2) == expected_profile_page_ids(
+        user, 2
+    ), (
+        "После снятия категории с публикации страница профиля должна "
+        "совпадать со страницей, выбранной через OFFSET."
+    )
+
+
+@override_settings(PAGE_BOUNDARY_STEP=PER_PAGE, PAGE_SEEK_FROM=0)
+def test_profile_page_after_bulk_update(
+    client, feed, user, django_capture_on_commit_callbacks
+):
+    assert profile_page_ids(client, user, 2) == expected_profile_page_ids(
+        user, 2
+    )
+    hidden = Post.objects.order_by("pub_date", "id")[10:15]
+    with django_capture_on_commit_callbacks(execute=True):
+        Post.objects.filter(
+            pk__in=[post.pk for post in hidden]
+        ).update(is_published=False)
+    assert profile_page_ids(client, user, 2) == expected_profile_page_ids(
+        user, 2
+    ), (
+        "После массового изменения страница профиля должна совпадать со "
+        "страницей, выбранной через OFFSET."
+    )
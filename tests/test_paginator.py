@@ -0,0 +1,29 @@
+import pytest
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+
+from blog.mixins import get_page_range
+
+
+def render_paginator(items, number):
+    page_obj = Paginator(items, 10).get_page(number)
+    return render_to_string("includes/paginator.html", {
+        "page_obj": page_obj,
+        "page_range": get_page_range(page_obj),
+    })
+
+
+@pytest.mark.parametrize("number", (1, 500, 1000))
+def test_paginator_links_are_elided(number):
+    html = render_paginator(range(10000), number)
+    assert html.count("<li") <= 14, (
+        "Пагинатор должен показывать ограниченное число ссылок на страницы."
+    )
+    assert f"?page={number}" in html or "active" in html
+    assert "…" in html
+
+
+def test_paginator_size_does_not_grow_with_table():
+    small = render_paginator(range(1000), 50)
+    large = render_paginator(range(1000000), 50)
+    assert large.count("<li") == small.count("<li")
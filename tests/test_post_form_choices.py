@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def choice_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return response, [
+        query["sql"] for query in queries
+        if 'FROM "blog_category"' in query["sql"]
+        or 'FROM "blog_location"' in query["sql"]
+    ]
+
+
+def test_choices_are_cached(
+    user_client, published_category, published_locations
+):
+    response, queries = choice_queries(user_client, "/posts/create/")
+    assert f'value="{published_category.pk}"' in response.content.decode()
+    response, queries = choice_queries(user_client, "/posts/create/")
+    assert queries == [], (
+        "Повторный показ формы поста не должен выбирать категории и"
+        " локации из базы."
+    )
+    published_category.title = "Новое название"
+    published_category.save()
+    response, queries = choice_queries(user_client, "/posts/create/")
+    assert "Новое название" in response.content.decode(), (
+        "Изменение категории должно сбрасывать кеш вариантов."
+    )
+
+
+def test_delete_confirmation_has_no_inputs(
+    user_client, post_with_published_location
+):
+    response, queries = choice_queries(
+        user_client, f"/posts/{post_with_published_location.id}/delete/"
+    )
+    content = response.content.decode()
+    assert "<select" not in content
+    assert post_with_published_location.title in content
+    assert not response.context["form"].fields
+
+
+@override_settings(LOCATION_AUTOCOMPLETE_FROM=1)
+def test_location_autocomplete(
+    user_client, client, post_with_published_location, mixer
+):
+    post = post_with_published_location
+    hidden = mixer.blend("blog.Location", name="Скрытая", is_published=False)
+    response = user_client.get(f"/posts/{post.id}/edit/")
+    content = response.content.decode()
+    assert 'data-autocomplete-url="/api/v1/locations/"' in content
+    assert "js/autocomplete.js" in content
+    select = content.split('name="location"')[1].split("</select>")[0]
+    assert select.count("<option") == 2, (
+        "В режиме подсказок в списке должны быть только пустой вариант и"
+        " выбранная локация."
+    )
+    assert user_client.post(f"/posts/{post.id}/edit/", {
+        "title": post.title,
+        "text": post.text,
+        "pub_date": post.pub_date.strftime("%Y-%m-%dT%H:%M"),
+        "category": post.category_id,
+        "location": hidden.id,
+    }).status_code == HTTPStatus.FOUND
+    post.refresh_from_db()
+    assert post.location_id == hidden.id
+
+    names = [
+        item["name"] for item in
+        user_client.get("/api/v1/locations/?q=Скрыт").json()["results"]
+    ]
+    assert names == ["Скрытая"]
+    assert client.get("/api/v1/locations/?q=Скрыт").json()["results"] == []
@@ -0,0 +1,46 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import Client, override_settings
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def profiling_dir(tmp_path):
+    with override_settings(
+        PROFILING_SAMPLE_RATE=1, PROFILING_DIR=tmp_path, PROFILING_MAX_FILES=3
+    ):
+        yield tmp_path
+
+
+def test_blog_views_are_profiled(profiling_dir, post_with_published_location):
+    client = Client()
+    client.get("/")
+    client.get("/pages/about/")
+
+    profiles = [
+        json.loads(path.read_text()) for path in profiling_dir.glob("*.json")
+    ]
+    assert [profile["view"] for profile in profiles] == ["blog:index"]
+    assert profiles[0]["sql"], "В профиль должны попадать SQL-запросы."
+    assert profiles[0]["status"] == 200
+
+
+def test_profiles_are_rotated(profiling_dir):
+    client = Client()
+    for _ in range(5):
+        client.get("/")
+    assert len(list(profiling_dir.glob("*.json"))) == 3
+
+
+def test_flamegraph_command(profiling_dir):
+    client = Client()
+    client.get("/")
+    output = profiling_dir / "out"
+    stdout = StringIO()
+    call_command("profile_flamegraph", output=output, stdout=stdout)
+    assert (output / "blog_index.collapsed").exists()
+    assert "blog:index" in stdout.getvalue()
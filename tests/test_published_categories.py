@@ -0,0 +1,101 @@
+import pytest
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog.invalidation import (
+    DatabaseTransport, InvalidationBus, LocalTransport,
+)
+from blog.models import Category
+from blog.queries import (
+    load_published_category_ids, post_query_default, published_categories,
+)
+from blog.versioned import VersionedCache
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_feed_queries_do_not_join_categories(
+    many_posts_with_published_locations
+):
+    post_query_default(filters=True).count()
+    with CaptureQueriesContext(connection) as queries:
+        count = post_query_default(filters=True).count()
+        list(post_query_default(filters=True, fields="card")[:10])
+    assert count == len(many_posts_with_published_locations)
+    assert len(queries) == 2, (
+        "Список опубликованных категорий должен браться из кеша процесса."
+    )
+    assert "blog_category" not in queries[0]["sql"], (
+        "Подсчёт постов ленты не должен соединяться с таблицей категорий."
+    )
+
+
+def test_category_changes_reset_cache(many_posts_with_published_locations):
+    category = many_posts_with_published_locations[0].category
+    assert post_query_default(filters=True).exists()
+    category.is_published = False
+    category.save()
+    assert not post_query_default(filters=True).exists(), (
+        "Снятие категории с публикации должно сразу скрывать её посты."
+    )
+    Category.objects.filter(pk=category.pk).update(is_published=True)
+    assert post_query_default(filters=True).exists(), (
+        "Массовое изменение категорий должно сбрасывать кеш."
+    )
+
+
+@override_settings(INVALIDATION_POLL_INTERVAL=0)
+def test_other_process_sees_new_version(
+    published_category, django_capture_on_commit_callbacks
+):
+    # Два «процесса»: у каждого свой LocMemCache и своя шина с таблицей
+    # сообщений, общая у них только база.
+    def process(location):
+        return VersionedCache(
+            published_categories.name, load_published_category_ids,
+            cache=LocMemCache(location, {}),
+            bus=InvalidationBus(DatabaseTransport()),
+        )
+
+    this, other = process("this"), process("other")
+    other.bus.poll()
+    assert published_category.pk in other.get()
+    with django_capture_on_commit_callbacks(execute=True):
+        published_category.is_published = False
+        published_category.save()
+        this.invalidate()
+    assert published_category.pk in other.get(), (
+        "До опроса шины процесс пользуется своей копией."
+    )
+    other.bus.poll()
+    assert published_category.pk not in other.get(), (
+        "Снятие категории с публикации в одном процессе должно доходить "
+        "до другого процесса со своим кешем."
+    )
+
+
+@override_settings(VERSIONED_CACHE_MAX_AGE=0)
+def test_value_expires_without_invalidation(published_category):
+    isolated = VersionedCache(
+        published_categories.name, load_published_category_ids,
+        cache=LocMemCache("isolated", {}),
+        bus=InvalidationBus(LocalTransport()),
+    )
+    assert published_category.pk in isolated.get()
+    Category.objects.filter(pk=published_category.pk).update(
+        is_published=False
+    )
+    assert published_category.pk not in isolated.get(), (
+        "Значение должно перечитываться по истечении "
+        "VERSIONED_CACHE_MAX_AGE даже без сообщения о сбросе."
+    )
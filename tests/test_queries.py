@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.db.models import Model
+from django.test.utils import CaptureQueriesContext
+
+from blog.queries import FIELD_PROFILES, post_query_default
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def forbid_deferred_loading(monkeypatch):
+    """Падает, если шаблон обращается к отложенному полю модели."""
+
+    def refresh_from_db(self, using=None, fields=None):
+        raise AssertionError(
+            f"Шаблон обратился к отложенному полю `{fields}` модели"
+            f" `{type(self).__name__}`. Добавьте его в нужный набор полей"
+            " `FIELD_PROFILES` в `blog/queries.py`."
+        )
+
+    monkeypatch.setattr(Model, "refresh_from_db", refresh_from_db)
+
+
+@pytest.mark.parametrize("profile", FIELD_PROFILES)
+def test_field_profiles_build_queries(profile):
+    queryset = post_query_default(filters=True, annotate=True, fields=profile)
+    assert str(queryset.query)
+
+
+@pytest.mark.parametrize(
+    "url_template",
+    (
+        "/",
+        "/category/{post.category.slug}/",
+        "/profile/{post.author.username}/",
+        "/posts/{post.id}/",
+    ),
+    ids=["index", "category", "profile", "detail"],
+)
+def test_pages_do_not_load_deferred_fields(
+    url_template, post_with_published_location, comment_to_a_post,
+    user_client, unlogged_client, forbid_deferred_loading,
+):
+    url = url_template.format(post=post_with_published_location)
+    for client in (user_client, unlogged_client):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f"Убедитесь, что страница `{url}` отображается без ошибок."
+        )
+
+
+def test_detail_query_count_does_not_grow(
+    mixer, post_with_published_location, user_client
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    user_client.get(url)
+    counts = []
+    for _ in range(2):
+        with CaptureQueriesContext(connection) as queries:
+            assert user_client.get(url).status_code == HTTPStatus.OK
+        counts.append(len(queries))
+        mixer.cycle(3).blend("blog.Comment", post=post_with_published_location)
+    assert counts[0] == counts[1], (
+        "Число запросов страницы поста не должно зависеть от числа"
+        " комментариев и их авторов."
+    )
+
+
+def test_detail_without_category(
+    post_with_published_location, user_client, unlogged_client
+):
+    post = post_with_published_location
+    post.category.delete()
+    url = f"/posts/{post.id}/"
+    assert user_client.get(url).status_code == HTTPStatus.OK, (
+        "Автор должен видеть пост, категория которого удалена."
+    )
+    assert unlogged_client.get(url).status_code == HTTPStatus.NOT_FOUND
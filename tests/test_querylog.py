@@ -0,0 +1,52 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import Client, override_settings
+
+from blog.querylog import fingerprint, query_stats
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.mark.parametrize(
+    ("sql", "expected"),
+    (
+        (
+            'SELECT "a" FROM "t" WHERE "id" IN (%s, %s, %s) LIMIT 21',
+            'SELECT "a" FROM "t" WHERE "id" IN (...) LIMIT ?',
+        ),
+        (
+            "SELECT * FROM t WHERE name = 'O''Brien' AND n > 10",
+            "SELECT * FROM t WHERE name = ? AND n > ?",
+        ),
+        (
+            "SELECT *\n  FROM t LIMIT 10 OFFSET 20",
+            "SELECT * FROM t LIMIT ?",
+        ),
+    ),
+)
+def test_fingerprint(sql, expected):
+    assert fingerprint(sql) == expected
+
+
+def test_queries_are_aggregated_per_view(
+    tmp_path, post_with_published_location
+):
+    query_stats.entries.clear()
+    with override_settings(
+        QUERYLOG_ENABLED=True, QUERYLOG_DIR=tmp_path,
+        QUERYLOG_SLOW_THRESHOLD=0,
+    ):
+        client = Client()
+        for _ in range(3):
+            client.get("/")
+        stdout = StringIO()
+        call_command("slow_queries", view="blog:index", stdout=stdout)
+    # Иначе atexit-сброс запишет статистику тестов в QUERYLOG_DIR проекта.
+    query_stats.entries.clear()
+
+    output = stdout.getvalue()
+    assert "blog:index: 3 раз" in output
+    assert '"blog_post"' in output
+    assert list(tmp_path.glob("querylog_*.json"))
@@ -0,0 +1,109 @@
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+TEXT = "<b>раз</b> два\nтри четыре пять шесть семь восемь девять десять один"
+EXCERPT = "&lt;b&gt;раз&lt;/b&gt; два<br>три"
+
+
+def make_post(user, text=TEXT):
+    return Post(
+        title="Заголовок", text=text, author=user, pub_date=timezone.now()
+    )
+
+
+def test_render_text(user):
+    post = make_post(user)
+    post.render_text()
+    assert post.excerpt == (
+        "<b>раз</b> два три четыре пять шесть семь восемь девять десять …"
+    ), "Анонс должен содержать первые слова текста."
+    assert EXCERPT in post.text_html, (
+        "HTML-версия должна экранировать разметку и переносить строки."
+    )
+
+
+def test_save_with_update_fields_renders_text(user):
+    post = make_post(user, text="старый")
+    post.save()
+    post.text = TEXT
+    post.save(update_fields=["text"])
+    post.refresh_from_db()
+    assert EXCERPT in post.text_html, (
+        "Сохранение с update_fields=['text'] должно обновлять HTML-версию."
+    )
+
+
+def test_raw_save_renders_text(user):
+    post = make_post(user)
+    post.created_at = post.updated_at = timezone.now()
+    post.save_base(raw=True)
+    post.refresh_from_db()
+    assert post.excerpt and EXCERPT in post.text_html, (
+        "Загрузка фикстур (raw-сохранение) должна заполнять анонс и HTML."
+    )
+
+
+def test_bulk_create_renders_text(user):
+    Post.objects.bulk_create([make_post(user)])
+    post = Post.objects.get()
+    assert post.excerpt and EXCERPT in post.text_html, (
+        "bulk_create должен заполнять анонс и HTML-версию текста."
+    )
+
+
+def test_bulk_update_renders_text(user):
+    post = make_post(user, text="старый")
+    post.save()
+    post.text = TEXT
+    Post.objects.bulk_update([post], ["text"])
+    post.refresh_from_db()
+    assert EXCERPT in post.text_html, (
+        "bulk_update текста должен обновлять HTML-версию."
+    )
+
+
+def test_update_renders_text(user):
+    make_post(user, text="старый").save()
+    Post.objects.update(text=TEXT)
+    assert EXCERPT in Post.objects.get().text_html, (
+        "QuerySet.update(text=...) должен обновлять HTML-версию."
+    )
+    Post.objects.update(text=Concat(F("text"), Value("\nхвост")))
+    post = Post.objects.get()
+    assert post.text_html.endswith("один<br>хвост"), (
+        "Изменение текста выражением должно обновлять HTML-версию."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_backfill_migration(user):
+    before = [("blog", "0008_alter_category_options")]
+    after = [("blog", "0009_post_excerpt_text_html")]
+    executor = MigrationExecutor(connection)
+    latest = executor.loader.graph.leaf_nodes()
+    try:
+        executor.migrate(before)
+        old_apps = executor.loader.project_state(before).apps
+        OldPost = old_apps.get_model("blog", "Post")
+        OldPost.objects.create(
+            title="Заголовок", text=TEXT, author_id=user.pk,
+            pub_date=timezone.now(),
+        )
+        executor = MigrationExecutor(connection)
+        executor.migrate(after)
+        new_apps = executor.loader.project_state(after).apps
+        post = new_apps.get_model("blog", "Post").objects.get()
+        assert post.excerpt and EXCERPT in post.text_html, (
+            "Миграция должна заполнять анонс и HTML-версию старых постов."
+        )
+    finally:
+        executor = MigrationExecutor(connection)
+        executor.migrate(latest)
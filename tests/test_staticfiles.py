@@ -0,0 +1,124 @@
+import gzip
+
+import pytest
+
+from blogicum.staticfiles import (
+    DEFAULT_CACHE_CONTROL, IMMUTABLE_CACHE_CONTROL, StaticFilesApplication,
+    parse_accept_encoding,
+)
+
+CONTENT = b"console.log('blogicum');\n" * 100
+HASHED = "/static/js/app.0123456789ab.js"
+PLAIN = "/static/js/app.js"
+GZIPPED = gzip.compress(CONTENT, mtime=0)
+
+
+def fallback(environ, start_response):
+    start_response("404 Not Found", [])
+    return [b"django"]
+
+
+@pytest.fixture
+def static_app(tmp_path):
+    directory = tmp_path / "js"
+    directory.mkdir()
+    for name in ("app.js", "app.0123456789ab.js"):
+        (directory / name).write_bytes(CONTENT)
+        (directory / f"{name}.gz").write_bytes(GZIPPED)
+        (directory / f"{name}.br").write_bytes(b"brotli")
+    return StaticFilesApplication(fallback, root=tmp_path, prefix="/static/")
+
+
+def request(app, path, method="GET", **headers):
+    environ = {"PATH_INFO": path, "REQUEST_METHOD": method}
+    environ.update(
+        (f"HTTP_{name.upper()}", value) for name, value in headers.items()
+    )
+    response = {}
+
+    def start_response(status, response_headers):
+        response["status"] = int(status.split()[0])
+        response["headers"] = dict(response_headers)
+
+    body = b"".join(app(environ, start_response))
+    return response["status"], response["headers"], body
+
+
+def test_cache_headers_depend_on_hashed_name(static_app):
+    _, hashed, _ = request(static_app, HASHED)
+    _, plain, _ = request(static_app, PLAIN)
+    assert hashed["Cache-Control"] == IMMUTABLE_CACHE_CONTROL, (
+        "Файлы с хешем в имени должны кешироваться надолго."
+    )
+    assert plain["Cache-Control"] == DEFAULT_CACHE_CONTROL
+
+
+def test_unknown_path_goes_to_django(static_app):
+    assert request(static_app, "/static/none.js")[2] == b"django"
+
+
+@pytest.mark.parametrize(
+    ("accept", "encoding", "body"),
+    (
+        ("", None, CONTENT),
+        ("gzip", "gzip", GZIPPED),
+        ("gzip, br", "br", b"brotli"),
+        ("gzip;q=1, br;q=0.5", "gzip", GZIPPED),
+        ("br;q=0, gzip", "gzip", GZIPPED),
+        ("*", "br", b"brotli"),
+        ("*;q=0, identity", None, CONTENT),
+        ("gzip;q=0", None, CONTENT),
+    ),
+)
+def test_encoding_variant(static_app, accept, encoding, body):
+    status, headers, content = request(
+        static_app, HASHED, ACCEPT_ENCODING=accept
+    )
+    assert status == 200
+    assert headers.get("Content-Encoding") == encoding, (
+        "Вариант ответа должен учитывать q-значения Accept-Encoding."
+    )
+    assert content == body
+    assert headers["Content-Length"] == str(len(body))
+    assert headers["Vary"] == "Accept-Encoding"
+
+
+def test_variants_have_own_etags(static_app):
+    etags = {
+        request(static_app, HASHED, ACCEPT_ENCODING=accept)[1]["ETag"]
+        for accept in ("", "gzip", "br")
+    }
+    assert len(etags) == 3, "У каждого варианта тела должен быть свой ETag."
+
+
+def test_not_modified(static_app):
+    etag = request(static_app, HASHED, ACCEPT_ENCODING="gzip")[1]["ETag"]
+    status, headers, body = request(
+        static_app, HASHED, ACCEPT_ENCODING="gzip", IF_NONE_MATCH=etag
+    )
+    assert status == 304 and body == b""
+    assert headers["ETag"] == etag
+    status, _, _ = request(
+        static_app, HASHED, ACCEPT_ENCODING="br", IF_NONE_MATCH=etag
+    )
+    assert status == 200, (
+        "ETag сжатого gzip тела не должен подходить к ответу brotli."
+    )
+    status, _, _ = request(
+        static_app, HASHED, ACCEPT_ENCODING="gzip",
+        IF_NONE_MATCH=f'"other", W/{etag}',
+    )
+    assert status == 304
+
+
+def test_head_has_headers_without_body(static_app):
+    status, headers, body = request(static_app, PLAIN, method="HEAD")
+    assert status == 200 and body == b""
+    assert headers["Content-Length"] == str(len(CONTENT))
+    assert request(static_app, PLAIN, method="POST")[0] == 405
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip;q=0.5, BR , x;q=bad") == {
+        "gzip": 0.5, "br": 1.0, "x": 0.0,
+    }
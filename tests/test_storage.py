@@ -0,0 +1,98 @@
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import override_settings
+from PIL import Image
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+def make_image(color):
+    img_io = BytesIO()
+    Image.new("RGB", (10, 10), color=color).save(img_io, format="JPEG")
+    return ContentFile(img_io.getvalue(), name="photo.JPG")
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    with override_settings(MEDIA_ROOT=tmp_path):
+        yield tmp_path
+
+
+@pytest.fixture
+def storage():
+    return Post.image.field.storage
+
+
+def test_same_content_is_stored_once(mixer, media_root, storage):
+    first = mixer.blend("blog.Post", image=make_image("red"))
+    second = mixer.blend("blog.Post", image=make_image("red"))
+    other = mixer.blend("blog.Post", image=make_image("blue"))
+    assert first.image.name == second.image.name
+    assert first.image.name != other.image.name
+    assert storage.is_content_name(first.image.name)
+    assert first.image.name.endswith(".jpg")
+    assert len(list(media_root.rglob("*.jpg"))) == 2
+
+
+def test_orphaned_file_is_removed(mixer, media_root, storage):
+    first = mixer.blend("blog.Post", image=make_image("red"))
+    second = mixer.blend("blog.Post", image=make_image("red"))
+    name = first.image.name
+
+    first.delete()
+    assert storage.exists(name), (
+        "Файл, на который ещё ссылается пост, не должен удаляться."
+    )
+
+    second.image = make_image("green")
+    second.save()
+    assert not storage.exists(name)
+
+    new_name = second.image.name
+    second.delete()
+    assert not storage.exists(new_name)
+
+
+def test_reupload_survives_concurrent_cleanup(mixer, media_root, storage):
+    first = mixer.blend("blog.Post", image=make_image("red"))
+    name = first.image.name
+    with transaction.atomic():
+        second = mixer.blend("blog.Post", image=make_image("red"))
+        assert second.image.name == name
+        # Другой запрос удалил последний зафиксированный пост с этим
+        # файлом, пока новый пост ещё не зафиксирован.
+        Post.objects.filter(pk=first.pk).delete()
+        storage.delete_unreferenced(
+            name, Post.objects.filter(image=name).exclude(
+                pk=second.pk
+            ).exists
+        )
+        assert not storage.exists(name)
+    assert storage.exists(name), (
+        "Файл поста, сохранённого повторной загрузкой, должен "
+        "восстанавливаться после фиксации."
+    )
+
+
+def test_dedupe_command(mixer, media_root, storage):
+    legacy_names = ("posts_images/old.jpg", "posts_images/old_copy.jpg")
+    (media_root / "posts_images").mkdir()
+    for name in legacy_names:
+        (media_root / name).write_bytes(make_image("red").read())
+    posts = mixer.cycle(2).blend("blog.Post")
+    for post, name in zip(posts, legacy_names):
+        Post.objects.filter(pk=post.pk).update(image=name)
+
+    call_command("dedupe_post_images", stdout=StringIO())
+
+    names = set(Post.objects.values_list("image", flat=True))
+    assert len(names) == 1
+    assert storage.is_content_name(names.pop())
+    for name in legacy_names:
+        assert not storage.exists(name)
@@ -0,0 +1,89 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Post
+from blog.uploads import reencode_image, reencode_post_image
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+def jpeg_bytes(exif=None, size=(50, 50)):
+    img_io = BytesIO()
+    image = Image.new("RGB", size, color=(10, 20, 30))
+    options = {"exif": exif} if exif is not None else {}
+    image.save(img_io, format="JPEG", **options)
+    return img_io.getvalue()
+
+
+def exif_with_camera():
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    return exif.tobytes()
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    with override_settings(MEDIA_ROOT=tmp_path, POST_IMAGE_REENCODE=False):
+        yield tmp_path
+
+
+def create_post(client, category, image_bytes, name="photo.jpg"):
+    return client.post("/posts/create/", {
+        "title": "Заголовок",
+        "text": "Текст",
+        "pub_date": timezone.now().strftime("%Y-%m-%dT%H:%M"),
+        "category": category.id,
+        "image": SimpleUploadedFile(name, image_bytes, "image/jpeg"),
+    })
+
+
+def test_valid_image_is_accepted(user_client, published_category, media_root):
+    response = create_post(user_client, published_category, jpeg_bytes())
+    assert response.status_code == 302
+    assert Post.objects.get().image
+
+
+def test_oversized_image_is_rejected(
+    user_client, published_category, media_root
+):
+    with override_settings(POST_IMAGE_MAX_SIZE=1024):
+        response = create_post(
+            user_client, published_category,
+            jpeg_bytes(size=(1000, 1000)) + b"\0" * 4096,
+        )
+    assert response.status_code == 200
+    assert "image" in response.context["form"].errors
+    assert not Post.objects.exists()
+
+
+def test_wrong_signature_is_rejected(
+    user_client, published_category, media_root
+):
+    response = create_post(user_client, published_category, b"not an image")
+    assert response.status_code == 200
+    assert "image" in response.context["form"].errors
+    assert not Post.objects.exists()
+
+
+def test_image_without_metadata_is_kept():
+    assert reencode_image(jpeg_bytes()) is None
+
+
+def test_metadata_is_stripped(mixer, media_root):
+    post = mixer.blend("blog.Post", image=SimpleUploadedFile(
+        "photo.jpg", jpeg_bytes(exif=exif_with_camera())
+    ))
+    original = post.image.name
+
+    reencode_post_image(post.pk, original)
+
+    post.refresh_from_db()
+    assert post.image.name != original
+    with Image.open(post.image.path) as image:
+        assert "exif" not in image.info
+    assert not (media_root / original).exists()